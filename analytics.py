@@ -0,0 +1,653 @@
+"""
+Shared SQL-side aggregates for dashboards and chart endpoints.
+
+Views should ask this module for counts and summaries instead of issuing one
+query per status or loading rows into Python.
+"""
+
+import hashlib
+from collections import Counter, defaultdict
+
+import numpy as np
+from sqlalchemy import func, case, and_
+from sqlalchemy.orm import contains_eager, lazyload
+
+from app import db
+from dashboard_cache import dashboard_cache, user_scope, GLOBAL_SCOPE
+from models import LoanApplication, RiskAssessment, ApplicationSummary
+from summary_tables import STATUS_DIMENSION
+
+# Application statuses shown on dashboards, in display order
+APPLICATION_STATUSES = ['Approved', 'Rejected', 'Under Review', 'Pending']
+
+# Cap on the number of points sent to the /predict bubble charts
+MAX_COMPARISON_POINTS = 500
+
+# Cap on the number of points per scatter series on the reports page
+MAX_SCATTER_POINTS = 1000
+
+# Credit score bands on the insights risk-by-credit-score chart: (label, lower, upper)
+# with lower inclusive and upper exclusive, as in summary_tables
+INSIGHTS_CREDIT_SCORE_BANDS = [
+    ('300-500', 300, 501),
+    ('501-600', 501, 601),
+    ('601-700', 601, 701),
+    ('701-800', 701, 801),
+    ('801-850', 801, 851)
+]
+
+# Income brackets on the admin risk-by-income chart
+ADMIN_INCOME_BANDS = [
+    ('Under $25K', 0, 25000),
+    ('$25K-$50K', 25000, 50000),
+    ('$50K-$75K', 50000, 75000),
+    ('$75K-$100K', 75000, 100000),
+    ('Over $100K', 100000, None)
+]
+
+# Bumped when the layout of the insights chart bundle changes, so cached
+# copies are not reused across deployments
+INSIGHTS_BUNDLE_VERSION = 1
+
+# Seconds an approximate listing count may be reused
+APPROXIMATE_COUNT_TTL = 60
+
+# Cap on the number of applications in one comparison request
+MAX_COMPARE_APPLICATIONS = 1000
+
+# PD buckets on the /predict comparison chart: (label, upper bound in percent)
+PD_BUCKETS = [('0-5%', 5), ('5-10%', 10), ('10-15%', 15), ('15-20%', 20), ('20%+', None)]
+
+
+class StatusSummary:
+    """Application counts by status"""
+
+    def __init__(self, counts=None):
+        # Only statuses that actually occur, as returned by the GROUP BY
+        self.counts = dict(counts or {})
+
+    def get(self, status):
+        """Count for one status (0 if absent)"""
+        return self.counts.get(status, 0)
+
+    @property
+    def total(self):
+        return sum(self.counts.values())
+
+    @property
+    def approved(self):
+        return self.get('Approved')
+
+    @property
+    def rejected(self):
+        return self.get('Rejected')
+
+    @property
+    def under_review(self):
+        return self.get('Under Review')
+
+    @property
+    def pending(self):
+        return self.get('Pending')
+
+    def as_list(self, statuses=APPLICATION_STATUSES):
+        """Counts in the given status order, for chart series"""
+        return [self.get(status) for status in statuses]
+
+
+def status_summary(user_id=None):
+    """
+    Count applications by status in a single GROUP BY query
+
+    Parameters:
+    - user_id: Optional user to scope the counts to
+
+    Returns:
+    - summary: StatusSummary
+    """
+    query = db.session.query(LoanApplication.status, func.count(LoanApplication.id))
+
+    if user_id is not None:
+        query = query.filter(LoanApplication.user_id == user_id)
+
+    return StatusSummary(query.group_by(LoanApplication.status).all())
+
+
+def approximate_application_count(status=None, user_id=None):
+    """
+    Application count for listing pages, reused for up to APPROXIMATE_COUNT_TTL seconds
+
+    Served from the dashboard cache, so paging through a listing costs at
+    most one grouped count per TTL (or write) instead of a COUNT(*) per page.
+
+    Parameters:
+    - status: Optional status filter ('all' or None for every status)
+    - user_id: Optional user to scope the count to
+
+    Returns:
+    - count: Number of matching applications
+    """
+    scope = user_scope(user_id) if user_id is not None else GLOBAL_SCOPE
+    counts = dashboard_cache.get_or_set(
+        scope, 'status_counts', lambda: status_summary(user_id).counts, ttl=APPROXIMATE_COUNT_TTL
+    )
+
+    if status is None or status == 'all':
+        return sum(counts.values())
+    return counts.get(status, 0)
+
+
+def global_and_user_status_summary(user_id):
+    """
+    Count applications by status system-wide and for one user in a single query
+
+    Parameters:
+    - user_id: User whose own counts are returned alongside the global ones
+
+    Returns:
+    - (global_summary, user_summary): Tuple of StatusSummary
+    """
+    rows = db.session.query(
+        LoanApplication.status,
+        func.count(LoanApplication.id),
+        func.sum(case((LoanApplication.user_id == user_id, 1), else_=0))
+    ).group_by(LoanApplication.status).all()
+
+    global_counts = {status: total for status, total, _ in rows}
+    user_counts = {status: int(own or 0) for status, _, own in rows if own}
+
+    return StatusSummary(global_counts), StatusSummary(user_counts)
+
+
+def _sample_filter(query, total, max_points):
+    """
+    Thin a query down to roughly max_points rows by taking every nth id
+
+    Deterministic, so the same page shows the same points on reload, and it
+    avoids the full sort ORDER BY random() would need.
+    """
+    if total <= max_points:
+        return query
+    stride = -(-total // max_points)
+    return query.filter(LoanApplication.id % stride == 0)
+
+
+def similar_applications_summary(application, score_window=50, max_points=MAX_COMPARISON_POINTS):
+    """
+    Aggregate applications with a similar credit score for the /predict page
+
+    Averages, PD buckets, risk rating and credit score histograms are computed
+    in SQL; only a capped, sampled set of points is loaded for the bubble charts.
+
+    Parameters:
+    - application: LoanApplication being compared
+    - score_window: Credit score distance that counts as similar
+    - max_points: Maximum number of points per bubble chart
+
+    Returns:
+    - summary: Dictionary of comparison values keyed like the predict.html context
+    """
+    min_score = max(300, application.credit_score - score_window)
+    max_score = min(850, application.credit_score + score_window)
+    similar = (
+        LoanApplication.credit_score.between(min_score, max_score),
+        LoanApplication.id != application.id
+    )
+
+    # Averages and PD buckets over similar applications that have an assessment
+    pd_percent = RiskAssessment.probability_of_default * 100
+    bucket_columns = []
+    lower = None
+    for label, upper in PD_BUCKETS:
+        conditions = []
+        if lower is not None:
+            conditions.append(pd_percent >= lower)
+        if upper is not None:
+            conditions.append(pd_percent < upper)
+        bucket_columns.append(func.sum(case((and_(*conditions), 1), else_=0)))
+        lower = upper
+
+    row = db.session.query(
+        func.count(RiskAssessment.id),
+        func.avg(RiskAssessment.probability_of_default),
+        func.avg(RiskAssessment.loss_given_default),
+        func.avg(RiskAssessment.exposure_at_default),
+        func.avg(RiskAssessment.risk_rating),
+        *bucket_columns
+    ).join(
+        LoanApplication, LoanApplication.id == RiskAssessment.loan_application_id
+    ).filter(*similar).one()
+
+    count = row[0] or 0
+    pd_distribution = {label: int(value or 0) for (label, _), value in zip(PD_BUCKETS, row[5:])}
+
+    risk_rating_distribution = {i: 0 for i in range(1, 11)}
+    for rating, rating_count in db.session.query(
+        RiskAssessment.risk_rating, func.count(RiskAssessment.id)
+    ).join(
+        LoanApplication, LoanApplication.id == RiskAssessment.loan_application_id
+    ).filter(*similar).group_by(RiskAssessment.risk_rating):
+        risk_rating_distribution[rating] = rating_count
+
+    # Credit score bins of 50 over all similar applications
+    score_bin = (LoanApplication.credit_score // 50) * 50
+    credit_score_distribution = {
+        f"{int(bin_start)}-{int(bin_start) + 49}": bin_count
+        for bin_start, bin_count in db.session.query(
+            score_bin, func.count(LoanApplication.id)
+        ).filter(*similar).group_by(score_bin).order_by(score_bin)
+    }
+    total_similar = sum(credit_score_distribution.values())
+
+    # Sampled points for the bubble charts
+    points_query = db.session.query(
+        LoanApplication.loan_amount,
+        LoanApplication.credit_score,
+        LoanApplication.annual_income,
+        LoanApplication.monthly_expenses,
+        LoanApplication.status
+    ).filter(*similar)
+    points = _sample_filter(points_query, total_similar, max_points).limit(max_points).all()
+
+    amount_distribution = [
+        {'x': loan_amount, 'y': credit_score, 'r': 5, 'status': status}
+        for loan_amount, credit_score, _, _, status in points
+    ]
+    income_expenses_data = [
+        {'x': annual_income / 12, 'y': monthly_expenses, 'r': 5, 'status': status}
+        for _, _, annual_income, monthly_expenses, status in points
+    ]
+
+    return {
+        'avg_pd': float(row[1] or 0),
+        'avg_lgd': float(row[2] or 0),
+        'avg_ead': float(row[3] or 0),
+        'avg_risk_rating': float(row[4] or 0),
+        'credit_score_distribution': credit_score_distribution,
+        'pd_distribution': pd_distribution,
+        'risk_rating_distribution': risk_rating_distribution,
+        'amount_distribution': amount_distribution,
+        'income_expenses_data': income_expenses_data,
+        'similar_count': count,
+        'similar_total': total_similar
+    }
+
+
+class SummarySnapshot:
+    """Bucket totals read from the application_summary table"""
+
+    def __init__(self, rows):
+        # {dimension: {(band, status): [applications, assessed, risk_rating_sum, loan_amount_sum, credit_score_sum]}}
+        self.buckets = defaultdict(dict)
+        for dimension, band, status, *counters in rows:
+            self.buckets[dimension][(band, status)] = [value or 0 for value in counters]
+
+    def band_counts(self, dimension, status=None):
+        """
+        Application count per band, in the dimension's band order
+
+        Parameters:
+        - dimension: SummaryDimension to read
+        - status: Optional status to restrict the counts to
+        """
+        counts = dict.fromkeys(dimension.labels, 0)
+        for (band, band_status), counters in self.buckets[dimension.name].items():
+            if band in counts and (status is None or band_status == status):
+                counts[band] += counters[0]
+        return counts
+
+    @property
+    def status_counts(self):
+        """Application count per status (only statuses that occur)"""
+        return {
+            status: counters[0]
+            for (_, status), counters in self.buckets[STATUS_DIMENSION.name].items()
+            if counters[0]
+        }
+
+    @property
+    def total(self):
+        return sum(self.status_counts.values())
+
+    def _status_sum(self, index):
+        return sum(counters[index] for counters in self.buckets[STATUS_DIMENSION.name].values())
+
+    @property
+    def avg_loan_amount(self):
+        return self._status_sum(3) / self.total if self.total else 0
+
+    @property
+    def avg_credit_score(self):
+        return self._status_sum(4) / self.total if self.total else 0
+
+
+def summary_snapshot(user_id=None, dimensions=None):
+    """
+    Load pre-aggregated bucket totals for the dashboards
+
+    Reads O(number of buckets) rows from application_summary rather than the
+    applications themselves.
+
+    Parameters:
+    - user_id: Optional user to scope the totals to
+    - dimensions: Optional list of SummaryDimension to load (default: all)
+
+    Returns:
+    - snapshot: SummarySnapshot
+    """
+    query = db.session.query(
+        ApplicationSummary.dimension,
+        ApplicationSummary.band,
+        ApplicationSummary.status,
+        func.sum(ApplicationSummary.application_count),
+        func.sum(ApplicationSummary.assessed_count),
+        func.sum(ApplicationSummary.risk_rating_sum),
+        func.sum(ApplicationSummary.loan_amount_sum),
+        func.sum(ApplicationSummary.credit_score_sum)
+    )
+
+    if user_id is not None:
+        query = query.filter(ApplicationSummary.user_id == user_id)
+    if dimensions is not None:
+        query = query.filter(ApplicationSummary.dimension.in_([dimension.name for dimension in dimensions]))
+
+    return SummarySnapshot(query.group_by(
+        ApplicationSummary.dimension, ApplicationSummary.band, ApplicationSummary.status
+    ).all())
+
+
+def monthly_status_counts(since, user_id=None):
+    """
+    Application counts per month and status from the summary table
+
+    Parameters:
+    - since: datetime; months are counted from this day onwards
+    - user_id: Optional user to scope the counts to
+
+    Returns:
+    - months: List of ('YYYY-MM', {status: count}) in month order
+    """
+    query = db.session.query(
+        ApplicationSummary.day,
+        ApplicationSummary.status,
+        func.sum(ApplicationSummary.application_count)
+    ).filter(
+        ApplicationSummary.dimension == STATUS_DIMENSION.name,
+        ApplicationSummary.day >= since.date()
+    )
+
+    if user_id is not None:
+        query = query.filter(ApplicationSummary.user_id == user_id)
+
+    months = defaultdict(lambda: defaultdict(int))
+    for day, status, count in query.group_by(ApplicationSummary.day, ApplicationSummary.status):
+        months[day.strftime('%Y-%m')][status] += count or 0
+
+    return [(month, dict(months[month])) for month in sorted(months) if sum(months[month].values())]
+
+
+def _downsample_indices(n, max_points):
+    """Evenly spaced row indices keeping at most max_points of n rows"""
+    if n <= max_points:
+        return np.arange(n)
+    return np.unique(np.linspace(0, n - 1, max_points).round().astype(int))
+
+
+def _ratio_percent(numerator, denominator):
+    """numerator / denominator * 100, rounded to 2 places; 0 where the denominator is not positive"""
+    ratio = np.zeros_like(numerator)
+    np.divide(numerator, denominator, out=ratio, where=denominator > 0)
+    return np.round(ratio * 100, 2)
+
+
+def report_scatter_series(user_id, statuses=('Approved', 'Rejected'), max_points=MAX_SCATTER_POINTS):
+    """
+    Build the reports page scatter series from one columnar fetch
+
+    Ratios are computed with NumPy over whole columns, and each series is
+    downsampled to evenly spaced points (in id order) when it has more than
+    max_points.
+
+    Parameters:
+    - user_id: Owner of the applications
+    - statuses: Statuses that get their own series
+    - max_points: Maximum number of points per series
+
+    Returns:
+    - series: {'dti': {status: [...]}, 'loan_to_income': {status: [...]}} with
+      Chart.js {'x', 'y'} points
+    """
+    rows = db.session.query(
+        LoanApplication.status,
+        LoanApplication.credit_score,
+        LoanApplication.annual_income,
+        LoanApplication.existing_debt,
+        LoanApplication.loan_amount
+    ).filter(
+        LoanApplication.user_id == user_id,
+        LoanApplication.status.in_(statuses)
+    ).order_by(LoanApplication.id).all()
+
+    series = {'dti': {}, 'loan_to_income': {}}
+    if rows:
+        status, credit_score, annual_income, existing_debt, loan_amount = zip(*rows)
+        status = np.asarray(status)
+        credit_score = np.asarray(credit_score, dtype=float)
+        annual_income = np.asarray(annual_income, dtype=float)
+        existing_debt = np.asarray(existing_debt, dtype=float)
+        loan_amount = np.asarray(loan_amount, dtype=float)
+
+        dti_ratio = _ratio_percent(existing_debt, annual_income)
+        lti_ratio = _ratio_percent(loan_amount, annual_income)
+
+    for name in statuses:
+        if not rows:
+            series['dti'][name] = []
+            series['loan_to_income'][name] = []
+            continue
+
+        selected = np.flatnonzero(status == name)
+        selected = selected[_downsample_indices(len(selected), max_points)]
+
+        series['dti'][name] = [
+            {'x': x, 'y': int(y)} for x, y in zip(dti_ratio[selected].tolist(), credit_score[selected].tolist())
+        ]
+        series['loan_to_income'][name] = [
+            {'x': x, 'y': y} for x, y in zip(lti_ratio[selected].tolist(), existing_debt[selected].tolist())
+        ]
+
+    return series
+
+
+def band_case(column, bands):
+    """
+    SQL CASE expression mapping a column to band labels
+
+    Parameters:
+    - column: Column to bucket
+    - bands: List of (label, lower, upper); lower inclusive, upper exclusive,
+      None for an open side
+
+    Returns:
+    - expression: CASE yielding the label, or NULL outside every band
+    """
+    whens = []
+    for label, lower, upper in bands:
+        conditions = []
+        if lower is not None:
+            conditions.append(column >= lower)
+        if upper is not None:
+            conditions.append(column < upper)
+        whens.append((and_(*conditions), label))
+    return case(*whens, else_=None)
+
+
+def average_risk_by_band(column, bands, user_id=None):
+    """
+    Average risk rating and assessed application count per band in one query
+
+    Parameters:
+    - column: LoanApplication column to bucket on
+    - bands: List of (label, lower, upper) as for band_case
+    - user_id: Optional user to scope the applications to
+
+    Returns:
+    - averages: Dictionary label -> (average risk rating, count), in band order;
+      (0, 0) for empty bands
+    """
+    band = band_case(column, bands).label('band')
+
+    query = db.session.query(
+        band,
+        func.avg(RiskAssessment.risk_rating),
+        func.count(RiskAssessment.id)
+    ).join(
+        RiskAssessment, LoanApplication.id == RiskAssessment.loan_application_id
+    )
+
+    if user_id is not None:
+        query = query.filter(LoanApplication.user_id == user_id)
+
+    averages = {label: (0, 0) for label, _, _ in bands}
+    for label, avg_rating, count in query.group_by(band):
+        if label is not None:
+            averages[label] = (float(avg_rating or 0), count)
+
+    return averages
+
+
+def insights_bundle_version(user_id):
+    """
+    Cheap validator for a user's insights chart bundle
+
+    One aggregate query over the user's applications and assessments; the
+    bundle only changes when one of them is added, removed or updated.
+
+    Returns:
+    - (etag, last_modified): Opaque ETag string and naive UTC datetime
+      (None if the user has no applications)
+    """
+    count, application_updated, assessment_created = db.session.query(
+        func.count(LoanApplication.id),
+        func.max(LoanApplication.updated_at),
+        func.max(RiskAssessment.created_at)
+    ).outerjoin(
+        RiskAssessment, LoanApplication.id == RiskAssessment.loan_application_id
+    ).filter(
+        LoanApplication.user_id == user_id
+    ).one()
+
+    last_modified = max((stamp for stamp in (application_updated, assessment_created) if stamp), default=None)
+    stamp = last_modified.isoformat() if last_modified else ''
+    etag = hashlib.sha1(f"{INSIGHTS_BUNDLE_VERSION}:{user_id}:{count}:{stamp}".encode()).hexdigest()
+
+    return etag, last_modified
+
+
+def insights_chart_bundle(user_id):
+    """
+    Build every insights page chart payload from one columnar fetch
+
+    Parameters:
+    - user_id: Owner of the applications
+
+    Returns:
+    - bundle: Dictionary with 'approval_stats', 'risk_by_income' and
+      'risk_by_credit_score' payloads, shaped like the individual endpoints
+    """
+    rows = db.session.query(
+        LoanApplication.status,
+        LoanApplication.annual_income,
+        LoanApplication.credit_score,
+        RiskAssessment.risk_rating
+    ).outerjoin(
+        RiskAssessment, LoanApplication.id == RiskAssessment.loan_application_id
+    ).filter(
+        LoanApplication.user_id == user_id
+    ).order_by(LoanApplication.id).all()
+
+    # Status distribution
+    status_counts = Counter(status for status, _, _, _ in rows)
+
+    # Risk rating vs income scatter, assessed applications only
+    assessed = [(income, score, rating) for _, income, score, rating in rows if rating is not None]
+    risk_by_income = [{'income': income, 'risk_rating': rating} for income, _, rating in assessed]
+
+    # Average risk per credit score band; the bands are contiguous, so bin with digitize
+    labels = [label for label, _, _ in INSIGHTS_CREDIT_SCORE_BANDS]
+    edges = [lower for _, lower, _ in INSIGHTS_CREDIT_SCORE_BANDS] + [INSIGHTS_CREDIT_SCORE_BANDS[-1][2]]
+    scores = np.array([score for _, score, _ in assessed], dtype=float)
+    ratings = np.array([rating for _, _, rating in assessed], dtype=float)
+
+    band_index = np.digitize(scores, edges) - 1
+    in_range = (band_index >= 0) & (band_index < len(labels))
+    counts = np.bincount(band_index[in_range], minlength=len(labels))
+    totals = np.bincount(band_index[in_range], weights=ratings[in_range], minlength=len(labels))
+    averages = np.divide(totals, counts, out=np.zeros(len(labels)), where=counts > 0)
+
+    return {
+        'approval_stats': {
+            'labels': APPLICATION_STATUSES,
+            'data': [status_counts.get(status, 0) for status in APPLICATION_STATUSES]
+        },
+        'risk_by_income': risk_by_income,
+        'risk_by_credit_score': {
+            'labels': labels,
+            'data': averages.tolist(),
+            'counts': counts.tolist()
+        }
+    }
+
+
+def prediction_comparison(application_ids, user_id=None):
+    """
+    Load the assessed applications of a comparison in one query
+
+    The ids are fetched with a single IN query, inner-joined to their risk
+    assessments and loaded through that join, so no per-application query
+    is issued. Unassessed, unknown and (for non-staff callers) other users'
+    applications are left out.
+
+    Parameters:
+    - application_ids: Ids of the applications to compare
+    - user_id: Restrict to this owner's applications (None for staff)
+
+    Returns:
+    - comparison: List of comparison dictionaries, sorted by risk rating
+      (ascending) then date (descending)
+    """
+    ids = set(application_ids)
+    if not ids:
+        return []
+
+    query = LoanApplication.query\
+        .join(LoanApplication.risk_assessment)\
+        .options(contains_eager(LoanApplication.risk_assessment), lazyload(LoanApplication.handled_by))\
+        .filter(LoanApplication.id.in_(ids))
+    if user_id is not None:
+        query = query.filter(LoanApplication.user_id == user_id)
+
+    comparison = []
+    for app in query:
+        assessment = app.risk_assessment
+        comparison.append({
+            'id': app.id,
+            'date': app.created_at,
+            'loan_amount': app.loan_amount,
+            'loan_term': app.loan_term,
+            'loan_purpose': app.loan_purpose,
+            'status': app.status,
+            'credit_score': app.credit_score,
+            'annual_income': app.annual_income,
+            'monthly_expenses': app.monthly_expenses,
+            'debt_to_income_ratio': round((app.existing_debt / app.annual_income * 100) if app.annual_income > 0 else 0, 2),
+            'loan_to_income_ratio': round((app.loan_amount / app.annual_income * 100) if app.annual_income > 0 else 0, 2),
+            'risk_rating': assessment.risk_rating,
+            'probability_of_default': assessment.probability_of_default,
+            'loss_given_default': assessment.loss_given_default,
+            'expected_loss': assessment.expected_loss,
+            'recommendation': assessment.recommendation
+        })
+
+    comparison.sort(key=lambda x: (x['risk_rating'], -int(x['date'].timestamp())))
+    return comparison
@@ -39,6 +39,9 @@ if db_url and 'postgres' in db_url:
         print(f"PostgreSQL connection failed: {e}")
         print(f"Falling back to SQLite database")
         app.config["SQLALCHEMY_DATABASE_URI"] = sqlite_url
+elif db_url and db_url.startswith('sqlite'):
+    print(f"Using SQLite database from DATABASE_URL")
+    app.config["SQLALCHEMY_DATABASE_URI"] = db_url
 else:
     print(f"No valid DATABASE_URL found. Using SQLite database")
     app.config["SQLALCHEMY_DATABASE_URI"] = sqlite_url
@@ -61,7 +64,7 @@ login_manager.login_message_category = "info"
 # Create all tables
 with app.app_context():
     # Import models to ensure tables are created
-    from models import User, LoanApplication, RiskAssessment
+    from models import User, LoanApplication, RiskAssessment, BatchJob, ApplicationSummary
     db.create_all()
 
 # Import the user loader function
@@ -0,0 +1,254 @@
+"""
+Memoized risk assessments.
+
+Scoring is deterministic (see risk_engine.RNG_STRATEGY), so an application
+with the same seven scoring inputs always gets the same assessment.
+Re-submissions, CSV re-uploads of overlapping portfolios and seed runs score
+many such repeats. This cache sits in front of CreditRiskEngine and serves
+them without recomputation.
+
+Entries are keyed by risk_engine.assessment_keys: a 128-bit hash of the
+inputs plus ENGINE_VERSION, the scoring table version and the noise strategy,
+so a scoring change never serves stale results. Lookups go through two tiers:
+- memory: an in-process LRU dictionary (ASSESSMENT_CACHE_MAX_ENTRIES)
+- persistent (optional): a local SQLite file shared by every process on the
+  host and surviving restarts, enabled by setting ASSESSMENT_CACHE_PATH
+
+Single assessments (the application form, seed runs) always go through
+the cache. Bulk scoring only does with ASSESSMENT_CACHE_BULK=on: the
+vectorized engine scores a row in about a microsecond, less than a per-row
+key and lookup cost, so for uploads the cache mainly pays off when the
+persistent tier is shared with hosts that already scored the same rows.
+
+Set ASSESSMENT_CACHE=off to always score directly. Calls that ask for a
+seeded Generator bypass the cache, since their noise is not a function of
+the inputs.
+"""
+
+import logging
+import os
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from cache_backends import CacheStats, MemoryCacheBackend, SQLiteCacheBackend
+from risk_engine import CreditRiskEngine, assessment_keys, NOISE_INPUT_COLUMNS
+from scoring_tables import get_scoring_table
+
+logger = logging.getLogger(__name__)
+
+# on or off
+CACHE_ENABLED = os.environ.get('ASSESSMENT_CACHE', 'on').lower() != 'off'
+
+# Whether CSV uploads and portfolio scoring consult the cache too
+BULK_ENABLED = os.environ.get('ASSESSMENT_CACHE_BULK', 'off').lower() == 'on'
+
+# Entries kept in process memory
+MAX_ENTRIES = int(os.environ.get('ASSESSMENT_CACHE_MAX_ENTRIES', 50000))
+
+# Optional SQLite file for the persistent tier
+PERSISTENT_PATH = os.environ.get('ASSESSMENT_CACHE_PATH')
+
+# Entries kept in the persistent tier
+PERSISTENT_MAX_ENTRIES = int(os.environ.get('ASSESSMENT_CACHE_PERSISTENT_MAX_ENTRIES', 1000000))
+
+# Seconds an assessment is reused; keys already change with the engine version
+DEFAULT_TTL = int(os.environ.get('ASSESSMENT_CACHE_TTL', 7 * 24 * 3600))
+
+# Score columns stored per entry, in score_batch's column order
+SCORE_FIELDS = [
+    'probability_of_default', 'loss_given_default', 'exposure_at_default', 'expected_loss',
+    'risk_rating', 'recommendation', 'reasons', 'debt_to_income_ratio'
+]
+
+
+class AssessmentCacheStats(CacheStats):
+    """Hit/miss counters, split by tier"""
+
+    FIELDS = CacheStats.FIELDS + ('memory_hits', 'persistent_hits', 'batch_duplicates')
+
+
+class AssessmentCache:
+    """Two-tier LRU/TTL cache of risk assessments"""
+
+    def __init__(self, memory, persistent=None, ttl=DEFAULT_TTL, bulk=BULK_ENABLED):
+        self.memory = memory
+        self.persistent = persistent
+        self.ttl = ttl
+        self.bulk = bulk
+        self.stats = AssessmentCacheStats()
+
+    @property
+    def enabled(self):
+        return self.memory is not None or self.persistent is not None
+
+    def _lookup(self, keys):
+        """Return {key: entry} for the keys found in either tier, promoting persistent hits"""
+        found = {}
+        if self.memory is not None:
+            found = self.memory.get_many(keys)
+            self.stats.incr('memory_hits', len(found))
+
+        if self.persistent is not None and len(found) < len(keys):
+            missing = [key for key in keys if key not in found]
+            try:
+                promoted = self.persistent.get_many(missing)
+            except Exception as e:
+                logger.warning(f"Persistent assessment cache read failed: {str(e)}")
+                promoted = {}
+            if promoted:
+                self.stats.incr('persistent_hits', len(promoted))
+                if self.memory is not None:
+                    self.stats.incr('evictions', self.memory.set_many(promoted, self.ttl))
+                found.update(promoted)
+
+        self.stats.incr('hits', len(found))
+        self.stats.incr('misses', len(keys) - len(found))
+        return found
+
+    def _store(self, entries):
+        """Write freshly scored entries to both tiers"""
+        if not entries:
+            return
+        if self.memory is not None:
+            self.stats.incr('evictions', self.memory.set_many(entries, self.ttl))
+        if self.persistent is not None:
+            try:
+                self.persistent.set_many(entries, self.ttl)
+            except Exception as e:
+                logger.warning(f"Persistent assessment cache write failed: {str(e)}")
+        self.stats.incr('sets', len(entries))
+
+    def assess(self, application_data):
+        """
+        Cached equivalent of CreditRiskEngine.assess_loan_application
+
+        Parameters:
+        - application_data: Dict containing loan application data
+
+        Returns:
+        - assessment: Dict containing all risk metrics and recommendation
+        """
+        if not self.enabled:
+            return CreditRiskEngine.assess_loan_application(application_data)
+
+        # Key and score with the same table even if it is swapped meanwhile
+        table = get_scoring_table()
+        key = assessment_keys(*([application_data[column]] for column in NOISE_INPUT_COLUMNS),
+                              [application_data['employment_status']], table=table)[0]
+        entry = self._lookup([key]).get(key)
+
+        if entry is None:
+            assessment = CreditRiskEngine.assess_loan_application(application_data, table=table)
+            monthly_income = application_data['annual_income'] / 12
+            debt_to_income_ratio = (
+                application_data['existing_debt'] / 12 + application_data['monthly_expenses']
+            ) / monthly_income
+            entry = tuple(
+                tuple(assessment[field]) if field == 'reasons' else assessment[field]
+                for field in SCORE_FIELDS[:-1]
+            ) + (debt_to_income_ratio,)
+            self._store({key: entry})
+            return assessment
+
+        assessment = dict(zip(SCORE_FIELDS[:-1], entry))
+        assessment['reasons'] = list(assessment['reasons'])
+        assessment['timestamp'] = datetime.utcnow()
+        return assessment
+
+    def score_batch(self, df, workers=None):
+        """
+        Cached equivalent of CreditRiskEngine.score_batch_parallel without a seed
+
+        Rows are reduced to their distinct keys first, so repeats within the
+        frame are scored once too; only keys missing from both tiers are
+        scored, in one vectorized pass. Scores directly unless the cache was
+        created with bulk=True (ASSESSMENT_CACHE_BULK=on).
+
+        Parameters:
+        - df: Validated DataFrame with the application columns
+        - workers: Number of scoring processes for the missing rows
+
+        Returns:
+        - scores: DataFrame of risk metrics aligned with df's index
+        """
+        if not (self.enabled and self.bulk) or len(df) == 0:
+            return CreditRiskEngine.score_batch_parallel(df, workers=workers)
+
+        table = get_scoring_table()
+        keys = assessment_keys(
+            *(df[column].to_numpy() for column in NOISE_INPUT_COLUMNS),
+            df['employment_status'].to_numpy(),
+            table=table
+        )
+        codes, unique_keys = pd.factorize(np.asarray(keys, dtype=object))
+        unique_keys = list(unique_keys)
+        self.stats.incr('batch_duplicates', len(keys) - len(unique_keys))
+
+        entries = self._lookup(unique_keys)
+        missing = [i for i, key in enumerate(unique_keys) if key not in entries]
+
+        if missing:
+            # factorize numbers keys in order of first appearance
+            first_rows = np.unique(codes, return_index=True)[1]
+            scored = CreditRiskEngine.score_batch_parallel(
+                df.iloc[first_rows[missing]], workers=workers, table=table
+            )
+            columns = [scored[field].tolist() for field in SCORE_FIELDS]
+            columns[6] = [tuple(reasons) for reasons in columns[6]]
+            fresh = {unique_keys[i]: entry for i, entry in zip(missing, zip(*columns))}
+            self._store(fresh)
+            entries.update(fresh)
+
+        ordered = [entries[key] for key in unique_keys]
+        scores = {}
+        for position, field in enumerate(SCORE_FIELDS):
+            values = [entry[position] for entry in ordered]
+            if field == 'reasons':
+                # Give each row its own list so callers can mutate them safely
+                scores[field] = [list(values[code]) for code in codes]
+            else:
+                scores[field] = np.asarray(values, dtype=object if field == 'recommendation' else None)[codes]
+
+        return pd.DataFrame(scores, index=df.index)
+
+    def clear(self):
+        """Drop every entry from both tiers"""
+        for tier in (self.memory, self.persistent):
+            if tier is not None:
+                tier.clear()
+        self.stats.incr('invalidations')
+
+    def stats_snapshot(self):
+        """Counters plus tier sizes, for the stats endpoint"""
+        stats = self.stats.snapshot()
+        stats['enabled'] = self.enabled
+        stats['bulk'] = self.bulk
+        stats['memory_entries'] = len(self.memory) if self.memory is not None else 0
+        try:
+            stats['persistent_entries'] = len(self.persistent) if self.persistent is not None else None
+        except Exception:
+            stats['persistent_entries'] = None
+        stats['max_entries'] = MAX_ENTRIES
+        stats['ttl'] = self.ttl
+        return stats
+
+
+def _create_cache():
+    """Build the configured tiers; the persistent tier is skipped if it cannot be opened"""
+    if not CACHE_ENABLED:
+        return AssessmentCache(None)
+
+    persistent = None
+    if PERSISTENT_PATH:
+        try:
+            persistent = SQLiteCacheBackend(PERSISTENT_PATH, PERSISTENT_MAX_ENTRIES)
+        except Exception as e:
+            logger.warning(f"Persistent assessment cache unavailable ({str(e)}); using memory only")
+
+    return AssessmentCache(MemoryCacheBackend(MAX_ENTRIES) if MAX_ENTRIES > 0 else None, persistent)
+
+
+# Process-wide cache used by the web app, uploads and scripts
+assessment_cache = _create_cache()
@@ -0,0 +1,336 @@
+"""
+Local background job subsystem for batch CSV uploads.
+
+The batch_job table doubles as the queue, so no external broker is needed:
+the upload view stores the file and inserts a 'queued' row, and a small
+in-process thread pool claims queued rows with an atomic UPDATE and runs the
+upload pipeline. Progress is written back to the row as the pipeline moves
+through its stages, and the final results page context is stored as JSON.
+
+Each claim stores a worker token on the row, and a heartbeat thread keeps the
+row's updated_at fresh while the job runs, including the long scoring and
+analysis stages. A running job whose heartbeat stops was orphaned by a worker
+that exited. It is requeued only if it had not reached the 'saving' stage,
+i.e. none of its rows were committed; otherwise rerunning it would insert
+them twice, so it is marked failed instead.
+
+run_batch_worker.py runs the same claim loop as a standalone process, which
+also picks up jobs left behind by a restarted web worker.
+"""
+
+import json
+import logging
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import pandas as pd
+from sqlalchemy import update
+
+from app import app, db
+from models import BatchJob
+from risk_engine import CreditRiskEngine, CSV_REQUIRED_COLUMNS
+from upload_pipeline import run_upload_pipeline
+
+logger = logging.getLogger(__name__)
+
+# Where uploaded files wait until their job has run
+UPLOAD_DIR = os.environ.get('BATCH_UPLOAD_DIR', os.path.join(app.instance_path, 'uploads'))
+
+# Number of jobs processed concurrently per web worker
+MAX_WORKERS = int(os.environ.get('BATCH_JOB_WORKERS', 2))
+
+# Seconds between heartbeat updates of a running job
+HEARTBEAT_SECONDS = int(os.environ.get('BATCH_JOB_HEARTBEAT_SECONDS', 30))
+
+# Running jobs without a heartbeat for this long are assumed orphaned
+STALE_JOB_MINUTES = int(os.environ.get('BATCH_JOB_STALE_MINUTES', 5))
+
+# Stages before any rows are committed, from which an orphaned job can be rerun
+REQUEUE_STAGES = ('parsing', 'scoring')
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    """Return the process-wide worker pool, creating it on first use"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix='batch-job')
+            # Pick up anything queued before this process started
+            _executor.submit(_in_app_context, drain_queue)
+    return _executor
+
+
+def _in_app_context(func, *args):
+    """Run func inside an application context with a thread-local session"""
+    with app.app_context():
+        try:
+            return func(*args)
+        except Exception:
+            logger.exception(f"Batch job worker error in {func.__name__}")
+        finally:
+            db.session.remove()
+
+
+def _update_job(job_id, worker_id=None, **values):
+    """
+    Write job fields directly and commit, bypassing the ORM identity map
+
+    Parameters:
+    - job_id: Job to update
+    - worker_id: If given, only update the job while this worker still owns it
+
+    Returns:
+    - updated: True if the row was updated
+    """
+    values['updated_at'] = datetime.utcnow()
+    statement = update(BatchJob).where(BatchJob.id == job_id)
+    if worker_id is not None:
+        statement = statement.where(BatchJob.worker_id == worker_id)
+    result = db.session.execute(statement.values(**values))
+    db.session.commit()
+    return result.rowcount == 1
+
+
+def _heartbeat(job_id, worker_id, stop):
+    """Refresh a running job's updated_at until stop is set or ownership is lost"""
+    with app.app_context():
+        try:
+            while not stop.wait(HEARTBEAT_SECONDS):
+                try:
+                    if not _update_job(job_id, worker_id):
+                        logger.warning(f"Batch job {job_id} is no longer owned by worker {worker_id}")
+                        return
+                except Exception as e:
+                    # e.g. a locked SQLite database; try again on the next beat
+                    db.session.rollback()
+                    logger.warning(f"Batch job {job_id} heartbeat failed: {str(e)}")
+        finally:
+            db.session.remove()
+
+
+def _start_heartbeat(job_id, worker_id):
+    """Start a heartbeat thread for a claimed job; set the returned event to stop it"""
+    stop = threading.Event()
+    threading.Thread(
+        target=_heartbeat, args=(job_id, worker_id, stop),
+        name=f'batch-job-{job_id}-heartbeat', daemon=True
+    ).start()
+    return stop
+
+
+def _json_default(value):
+    """Serialize NumPy scalars and other stragglers in the results context"""
+    if hasattr(value, 'item'):
+        return value.item()
+    return str(value)
+
+
+def check_csv_header(file_path):
+    """
+    Check that a CSV file has the required columns without parsing its rows
+
+    Raises:
+    - ValueError: If required columns are missing
+    """
+    columns = pd.read_csv(file_path, nrows=0).columns
+    missing_columns = [col for col in CSV_REQUIRED_COLUMNS if col not in columns]
+    if missing_columns:
+        raise ValueError(f"Missing required columns: {', '.join(missing_columns)}")
+
+
+def enqueue_upload(user_id, uploaded_file):
+    """
+    Store an uploaded CSV file and queue it for background processing
+
+    Parameters:
+    - user_id: Owner of the job and of the applications it creates
+    - uploaded_file: werkzeug FileStorage from the upload form
+
+    Returns:
+    - job: The queued BatchJob
+
+    Raises:
+    - ValueError: If the file is not a CSV with the required columns
+    """
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    file_path = os.path.join(UPLOAD_DIR, f"{uuid.uuid4().hex}.csv")
+    uploaded_file.save(file_path)
+
+    try:
+        check_csv_header(file_path)
+    except Exception as e:
+        os.unlink(file_path)
+        raise ValueError(str(e))
+
+    job = BatchJob(
+        user_id=user_id,
+        filename=uploaded_file.filename,
+        file_path=file_path,
+        status='queued'
+    )
+    db.session.add(job)
+    db.session.commit()
+
+    _get_executor().submit(_in_app_context, run_job, job.id)
+
+    return job
+
+
+def claim_job(job_id):
+    """
+    Atomically move a queued job to running
+
+    Returns:
+    - worker_id: Token identifying this claim, or None if another worker
+      claimed the job first
+    """
+    now = datetime.utcnow()
+    worker_id = uuid.uuid4().hex
+    result = db.session.execute(
+        update(BatchJob)
+        .where(BatchJob.id == job_id, BatchJob.status == 'queued')
+        .values(status='running', stage='parsing', worker_id=worker_id, started_at=now, updated_at=now)
+    )
+    db.session.commit()
+    return worker_id if result.rowcount == 1 else None
+
+
+def claim_next_job():
+    """
+    Claim the oldest queued job
+
+    Returns:
+    - claim: (job_id, worker_id) of the claimed job, or None if the queue is empty
+    """
+    while True:
+        job_id = db.session.query(BatchJob.id)\
+            .filter(BatchJob.status == 'queued')\
+            .order_by(BatchJob.created_at, BatchJob.id)\
+            .limit(1).scalar()
+        if job_id is None:
+            return None
+        worker_id = claim_job(job_id)
+        if worker_id is not None:
+            return job_id, worker_id
+        # Another worker claimed it first; try the next one
+
+
+def process_job(job_id, worker_id):
+    """Run the upload pipeline for a job this worker has claimed as worker_id"""
+    job = db.session.get(BatchJob, job_id)
+    file_path = job.file_path
+    finished = False
+
+    def on_progress(stage, processed, total):
+        _update_job(job_id, worker_id, stage=stage, rows_processed=processed, rows_total=total)
+
+    stop_heartbeat = _start_heartbeat(job_id, worker_id)
+    try:
+        df = CreditRiskEngine.read_csv(file_path)
+        _update_job(job_id, worker_id, rows_total=len(df))
+
+        context = run_upload_pipeline(df, job.user_id, job.filename, on_progress=on_progress)
+
+        finished = _update_job(
+            job_id,
+            worker_id,
+            status='completed',
+            stage=None,
+            rows_processed=len(df),
+            result=json.dumps(context, default=_json_default),
+            finished_at=datetime.utcnow()
+        )
+        logger.info(f"Batch job {job_id} completed: {context['total']} applications processed")
+    except Exception as e:
+        db.session.rollback()
+        logger.exception(f"Batch job {job_id} failed")
+        finished = _update_job(job_id, worker_id, status='failed', error=str(e), finished_at=datetime.utcnow())
+    finally:
+        stop_heartbeat.set()
+        # A job taken over by another worker still needs its file
+        if finished and file_path and os.path.exists(file_path):
+            os.unlink(file_path)
+
+
+def run_job(job_id):
+    """Claim and run one specific job; does nothing if it was already claimed"""
+    worker_id = claim_job(job_id)
+    if worker_id is not None:
+        process_job(job_id, worker_id)
+
+
+def drain_queue():
+    """
+    Process queued jobs until the queue is empty
+
+    Returns:
+    - processed: Number of jobs run
+    """
+    processed = 0
+    requeue_stale_jobs()
+    while True:
+        claim = claim_next_job()
+        if claim is None:
+            return processed
+        process_job(*claim)
+        processed += 1
+
+
+def requeue_stale_jobs(max_age_minutes=STALE_JOB_MINUTES):
+    """
+    Requeue or fail orphaned running jobs
+
+    A running job whose heartbeat has not updated its row for max_age_minutes
+    was owned by a worker that has since exited. Jobs that had not started
+    saving are returned to the queue; jobs that had may have committed some
+    of their rows, so they are marked failed rather than rerun.
+
+    Returns:
+    - count: Number of jobs requeued
+    """
+    cutoff = datetime.utcnow() - timedelta(minutes=max_age_minutes)
+    stale = db.session.query(BatchJob.id, BatchJob.stage, BatchJob.rows_processed, BatchJob.file_path)\
+        .filter(BatchJob.status == 'running', BatchJob.updated_at < cutoff)\
+        .all()
+
+    requeued = 0
+    for job_id, stage, rows_processed, file_path in stale:
+        # Re-check staleness so a job whose heartbeat just resumed is left alone
+        statement = update(BatchJob).where(
+            BatchJob.id == job_id, BatchJob.status == 'running', BatchJob.updated_at < cutoff
+        )
+        now = datetime.utcnow()
+        if stage in REQUEUE_STAGES:
+            values = dict(status='queued', stage=None, worker_id=None, rows_processed=0, updated_at=now)
+        else:
+            values = dict(
+                status='failed', worker_id=None, finished_at=now, updated_at=now,
+                error=f"Worker stopped while {stage or 'running'}; {rows_processed or 0} row(s) may already have been saved"
+            )
+        result = db.session.execute(statement.values(**values))
+        db.session.commit()
+        if result.rowcount != 1:
+            continue
+
+        if values['status'] == 'queued':
+            requeued += 1
+            logger.warning(f"Requeued stale batch job {job_id}")
+        else:
+            logger.warning(f"Marked stale batch job {job_id} failed during {stage}")
+            if file_path and os.path.exists(file_path):
+                os.unlink(file_path)
+
+    return requeued
+
+
+def load_job_result(job):
+    """Decode the stored results page context of a completed job"""
+    if not job.result:
+        return None
+    return json.loads(job.result)
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Benchmark the LoanApplication/RiskAssessment indexes.
+
+Seeds a scratch database with synthetic applications (1M by default), then
+runs the dashboard's hot queries with and without the indexes declared in
+models.py, printing each query plan and its timing.
+
+Usage:
+    python benchmark_indexes.py [--rows 1000000] [--database-url sqlite:////tmp/bench.db]
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import create_engine, text
+
+from app import db
+from models import User, LoanApplication, RiskAssessment
+
+STATUSES = ['Approved', 'Rejected', 'Under Review', 'Pending']
+EMPLOYMENT_STATUSES = ['full_time', 'part_time', 'self_employed', 'retired', 'unemployed']
+RECOMMENDATIONS = {'Approved': 'Approve', 'Rejected': 'Reject', 'Under Review': 'Review', 'Pending': 'Review'}
+
+NUM_USERS = 1000
+SEED_BATCH_SIZE = 50000
+
+# Representative dashboard queries: (description, SQL)
+QUERIES = [
+    ("Status counts for one user (loan.index, insights)",
+     "SELECT status, COUNT(*) FROM loan_application WHERE user_id = 42 GROUP BY status"),
+    ("Staff list filtered by status, newest first (loan.index, admin.all_applications)",
+     "SELECT id FROM loan_application WHERE status = 'Pending' ORDER BY created_at DESC LIMIT 15"),
+    ("All applications, newest first (admin.dashboard)",
+     "SELECT id FROM loan_application ORDER BY created_at DESC LIMIT 10"),
+    ("All applications by loan amount (loan.index sort)",
+     "SELECT id FROM loan_application ORDER BY loan_amount DESC LIMIT 15"),
+    ("Similar credit scores (loan.predict)",
+     "SELECT COUNT(*) FROM loan_application WHERE credit_score BETWEEN 650 AND 750"),
+    ("User history with assessments (loan.history, loan.reports)",
+     "SELECT la.id, ra.risk_rating FROM loan_application la "
+     "JOIN risk_assessment ra ON ra.loan_application_id = la.id "
+     "WHERE la.user_id = 42 ORDER BY la.created_at DESC"),
+]
+
+
+def seed(engine, rows):
+    """Insert NUM_USERS users and `rows` applications with one assessment each"""
+    rng = np.random.default_rng(42)
+    now = datetime.utcnow()
+
+    with engine.begin() as conn:
+        conn.execute(User.__table__.insert(), [
+            {'id': i, 'username': f'user{i}', 'email': f'user{i}@example.com', 'password_hash': 'x'}
+            for i in range(1, NUM_USERS + 1)
+        ])
+
+    for start in range(0, rows, SEED_BATCH_SIZE):
+        n = min(SEED_BATCH_SIZE, rows - start)
+        ids = np.arange(start + 1, start + n + 1)
+        statuses = rng.choice(STATUSES, n)
+        created = rng.integers(0, 365 * 24 * 3600, n)
+
+        applications = [
+            {
+                'id': int(ids[i]),
+                'user_id': int(user_id),
+                'loan_amount': float(loan_amount),
+                'loan_purpose': 'business',
+                'loan_term': 36,
+                'age': 40,
+                'annual_income': float(income),
+                'monthly_expenses': 2000.0,
+                'credit_score': int(score),
+                'existing_debt': 10000.0,
+                'employment_status': EMPLOYMENT_STATUSES[i % 5],
+                'status': status,
+                'created_at': now - timedelta(seconds=int(created[i]))
+            }
+            for i, (user_id, loan_amount, income, score, status) in enumerate(zip(
+                rng.integers(1, NUM_USERS + 1, n), rng.integers(1000, 100000, n),
+                rng.integers(20000, 200000, n), rng.integers(300, 851, n), statuses
+            ))
+        ]
+        assessments = [
+            {
+                'loan_application_id': int(ids[i]),
+                'probability_of_default': 0.1,
+                'loss_given_default': 0.4,
+                'exposure_at_default': 1000.0,
+                'expected_loss': 40.0,
+                'risk_rating': int(i % 10) + 1,
+                'recommendation': RECOMMENDATIONS[statuses[i]]
+            }
+            for i in range(n)
+        ]
+
+        with engine.begin() as conn:
+            conn.execute(LoanApplication.__table__.insert(), applications)
+            conn.execute(RiskAssessment.__table__.insert(), assessments)
+
+        print(f"  seeded {start + n:,} / {rows:,} applications")
+
+
+def explain(conn, sql):
+    """Return the query plan as a list of lines"""
+    if conn.dialect.name == 'sqlite':
+        return [row[-1] for row in conn.execute(text(f"EXPLAIN QUERY PLAN {sql}"))]
+    return [row[0] for row in conn.execute(text(f"EXPLAIN {sql}"))]
+
+
+def time_query(conn, sql, repeat=3):
+    """Best-of-N wall time in milliseconds"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        conn.execute(text(sql)).fetchall()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def run_queries(engine, label):
+    """Print plan and timing of every benchmark query"""
+    print(f"\n{'=' * 70}\n{label}\n{'=' * 70}")
+    timings = []
+    with engine.connect() as conn:
+        for description, sql in QUERIES:
+            elapsed = time_query(conn, sql)
+            timings.append(elapsed)
+            print(f"\n{description}: {elapsed:.1f} ms")
+            for line in explain(conn, sql):
+                print(f"    {line}")
+    return timings
+
+
+def main():
+    """Seed a scratch database and compare query plans before and after indexing"""
+    parser = argparse.ArgumentParser(description='Benchmark dashboard query plans with and without indexes')
+    parser.add_argument('--rows', type=int, default=1000000, help='Number of applications to seed')
+    parser.add_argument('--database-url', help='Scratch database URL (default: temporary SQLite file)')
+    args = parser.parse_args()
+
+    database_url = args.database_url
+    scratch_file = None
+    if not database_url:
+        fd, scratch_file = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        database_url = f"sqlite:///{scratch_file}"
+
+    engine = create_engine(database_url)
+    tables = [db.metadata.tables[model.__tablename__] for model in (User, LoanApplication, RiskAssessment)]
+    indexes = [index for table in tables[1:] for index in table.indexes]
+
+    try:
+        for table in reversed(tables):
+            table.drop(engine, checkfirst=True)
+        for table in tables:
+            table.create(engine)
+        # Start from the pre-index schema
+        for index in indexes:
+            index.drop(engine)
+
+        print(f"Seeding {args.rows:,} applications into {database_url}")
+        seed(engine, args.rows)
+        if engine.dialect.name == 'postgresql':
+            with engine.begin() as conn:
+                conn.execute(text("ANALYZE"))
+
+        before = run_queries(engine, "BEFORE: no secondary indexes")
+
+        start = time.perf_counter()
+        for index in indexes:
+            index.create(engine)
+        with engine.begin() as conn:
+            conn.execute(text("ANALYZE"))
+        print(f"\nCreated {len(indexes)} indexes in {time.perf_counter() - start:.1f} s")
+
+        after = run_queries(engine, "AFTER: indexes from models.py")
+
+        print(f"\n{'=' * 70}\nSUMMARY ({args.rows:,} rows)\n{'=' * 70}")
+        for (description, _), b, a in zip(QUERIES, before, after):
+            print(f"{b:10.1f} ms -> {a:8.1f} ms  ({b / max(a, 1e-3):7.1f}x)  {description}")
+    finally:
+        engine.dispose()
+        if scratch_file:
+            os.unlink(scratch_file)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+Benchmark the compiled scoring tables against the hand-written ladders.
+
+Scores synthetic applications (1M by default) with the if/elif ladders the
+risk engine used before scoring_tables.py, and with the active ScoringTable,
+on both the scalar and the vectorized path. Prints the timings, the largest
+difference in PD, LGD and rating, and how often the two give the same
+recommendation for the same noise draws.
+
+Usage:
+    python benchmark_scoring_tables.py [--rows 1000000] [--scalar-rows 100000] [--table config/scoring_table_v1.json]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from risk_engine import CreditRiskEngine, application_noise
+from scoring_tables import get_scoring_table, load_scoring_table
+
+EMPLOYMENT_STATUSES = ['full_time', 'part_time', 'self_employed', 'retired', 'unemployed']
+LOAN_TERMS = [12, 24, 36, 48, 60]
+
+
+def ladder_probability_of_default(credit_score, income, expenses, debt, loan_amount, loan_term, random_variation):
+    """calculate_probability_of_default as it was written before scoring tables"""
+    if credit_score >= 740:
+        base_pd = 0.08 * (1 - ((credit_score - 740) / 110))
+    elif credit_score >= 670:
+        base_pd = 0.15 * (1 - ((credit_score - 670) / 70)) + 0.05
+    elif credit_score >= 580:
+        base_pd = 0.3 * (1 - ((credit_score - 580) / 90)) + 0.15
+    else:
+        base_pd = 0.5 * (1 - ((credit_score - 300) / 280)) + 0.3
+
+    debt_to_income = (debt / 12 + expenses) / (income / 12)
+    if debt_to_income <= 0.28:
+        dti_factor = debt_to_income * 0.6
+    elif debt_to_income <= 0.36:
+        dti_factor = 0.17 + ((debt_to_income - 0.28) * 1.25)
+    elif debt_to_income <= 0.43:
+        dti_factor = 0.27 + ((debt_to_income - 0.36) * 1.5)
+    else:
+        dti_factor = 0.37 + ((debt_to_income - 0.43) * 1.8)
+    dti_factor = min(dti_factor, 0.7)
+
+    loan_to_income = loan_amount / income
+    if loan_to_income <= 0.5:
+        lti_factor = loan_to_income * 0.4
+    elif loan_to_income <= 1.0:
+        lti_factor = 0.2 + ((loan_to_income - 0.5) * 0.6)
+    elif loan_to_income <= 2.0:
+        lti_factor = 0.5 + ((loan_to_income - 1.0) * 0.4)
+    else:
+        lti_factor = 0.9 + ((loan_to_income - 2.0) * 0.2)
+    lti_factor = min(lti_factor, 0.7)
+
+    weighted_pd = (base_pd * 0.55) + (dti_factor * 0.25) + (lti_factor * 0.2)
+
+    if loan_term <= 12:
+        term_factor = loan_term / 48
+    elif loan_term <= 24:
+        term_factor = 0.25 + ((loan_term - 12) / 60)
+    else:
+        term_factor = 0.45 + ((loan_term - 24) / 72)
+    term_factor = min(term_factor, 0.85)
+
+    final_pd = weighted_pd * (1 + (term_factor * 0.2)) * random_variation
+    return min(max(final_pd, 0.01), 0.99)
+
+
+def ladder_loss_given_default(loan_amount, credit_score, employment_status):
+    """calculate_loss_given_default as it was written before scoring tables"""
+    if credit_score >= 750:
+        base_lgd = 0.3
+    elif credit_score >= 650:
+        base_lgd = 0.4
+    elif credit_score >= 550:
+        base_lgd = 0.5
+    else:
+        base_lgd = 0.6
+
+    if loan_amount <= 25000:
+        amount_factor = 0.1
+    elif loan_amount <= 50000:
+        amount_factor = 0.08
+    elif loan_amount <= 75000:
+        amount_factor = 0.05
+    else:
+        amount_factor = 0.03
+
+    employment_multiplier = {
+        'full_time': 0.8, 'self_employed': 0.85, 'part_time': 0.9, 'retired': 0.95
+    }.get(employment_status, 1.0)
+
+    return min(max((base_lgd + amount_factor) * employment_multiplier, 0), 1)
+
+
+def ladder_risk_rating(pd, lgd, expected_loss, loan_amount):
+    """calculate_risk_rating as it was written before scoring tables"""
+    if pd < 0.2:
+        pd_component = pd * 7
+    elif pd < 0.4:
+        pd_component = 1.4 + ((pd - 0.2) * 9)
+    else:
+        pd_component = 3.2 + ((pd - 0.4) * 13)
+
+    if lgd < 0.3:
+        lgd_component = lgd * 3
+    elif lgd < 0.5:
+        lgd_component = 0.9 + ((lgd - 0.3) * 4)
+    else:
+        lgd_component = 1.7 + ((lgd - 0.5) * 5)
+
+    el_percentage = min(expected_loss / loan_amount, 1)
+    if el_percentage < 0.05:
+        el_component = el_percentage * 40
+    elif el_percentage < 0.15:
+        el_component = 2 + ((el_percentage - 0.05) * 50)
+    else:
+        el_component = 7 + ((el_percentage - 0.15) * 20)
+
+    risk_rating = (pd_component * 0.4) + (lgd_component * 0.3) + (el_component * 0.3)
+    return max(min(round(risk_rating), 10), 1)
+
+
+def ladder_batch(columns, random_variation):
+    """The pre-table np.select ladders over whole columns; returns (pd, lgd, rating)"""
+    credit_score, income, expenses, debt, loan_amount, loan_term, employment_status = columns
+
+    base_pd = np.select(
+        [credit_score >= 740, credit_score >= 670, credit_score >= 580],
+        [
+            0.08 * (1 - ((credit_score - 740) / 110)),
+            0.15 * (1 - ((credit_score - 670) / 70)) + 0.05,
+            0.3 * (1 - ((credit_score - 580) / 90)) + 0.15
+        ],
+        default=0.5 * (1 - ((credit_score - 300) / 280)) + 0.3
+    )
+    debt_to_income = (debt / 12 + expenses) / (income / 12)
+    dti_factor = np.minimum(np.select(
+        [debt_to_income <= 0.28, debt_to_income <= 0.36, debt_to_income <= 0.43],
+        [
+            debt_to_income * 0.6,
+            0.17 + ((debt_to_income - 0.28) * 1.25),
+            0.27 + ((debt_to_income - 0.36) * 1.5)
+        ],
+        default=0.37 + ((debt_to_income - 0.43) * 1.8)
+    ), 0.7)
+    loan_to_income = loan_amount / income
+    lti_factor = np.minimum(np.select(
+        [loan_to_income <= 0.5, loan_to_income <= 1.0, loan_to_income <= 2.0],
+        [
+            loan_to_income * 0.4,
+            0.2 + ((loan_to_income - 0.5) * 0.6),
+            0.5 + ((loan_to_income - 1.0) * 0.4)
+        ],
+        default=0.9 + ((loan_to_income - 2.0) * 0.2)
+    ), 0.7)
+    weighted_pd = (base_pd * 0.55) + (dti_factor * 0.25) + (lti_factor * 0.2)
+    term_factor = np.minimum(np.select(
+        [loan_term <= 12, loan_term <= 24],
+        [loan_term / 48, 0.25 + ((loan_term - 12) / 60)],
+        default=0.45 + ((loan_term - 24) / 72)
+    ), 0.85)
+    pd = np.minimum(np.maximum(weighted_pd * (1 + (term_factor * 0.2)) * random_variation, 0.01), 0.99)
+
+    base_lgd = np.select([credit_score >= 750, credit_score >= 650, credit_score >= 550], [0.3, 0.4, 0.5], default=0.6)
+    amount_factor = np.select(
+        [loan_amount <= 25000, loan_amount <= 50000, loan_amount <= 75000], [0.1, 0.08, 0.05], default=0.03
+    )
+    employment_multiplier = np.select(
+        [employment_status == status for status in ('full_time', 'self_employed', 'part_time', 'retired')],
+        [0.8, 0.85, 0.9, 0.95],
+        default=1.0
+    )
+    lgd = np.minimum(np.maximum((base_lgd + amount_factor) * employment_multiplier, 0), 1)
+
+    expected_loss = pd * lgd * (loan_amount * (1 - 1 / 3))
+    pd_component = np.select([pd < 0.2, pd < 0.4], [pd * 7, 1.4 + ((pd - 0.2) * 9)], default=3.2 + ((pd - 0.4) * 13))
+    lgd_component = np.select(
+        [lgd < 0.3, lgd < 0.5], [lgd * 3, 0.9 + ((lgd - 0.3) * 4)], default=1.7 + ((lgd - 0.5) * 5)
+    )
+    el_percentage = np.minimum(expected_loss / loan_amount, 1)
+    el_component = np.select(
+        [el_percentage < 0.05, el_percentage < 0.15],
+        [el_percentage * 40, 2 + ((el_percentage - 0.05) * 50)],
+        default=7 + ((el_percentage - 0.15) * 20)
+    )
+    risk_rating = (pd_component * 0.4) + (lgd_component * 0.3) + (el_component * 0.3)
+    return pd, lgd, np.maximum(np.minimum(np.round(risk_rating), 10), 1).astype(int)
+
+
+def table_batch(columns, random_variation, table):
+    """The engine's table-driven batch helpers; returns (pd, lgd, rating)"""
+    credit_score, income, expenses, debt, loan_amount, loan_term, employment_status = columns
+    pd = CreditRiskEngine._probability_of_default_batch(
+        credit_score, income, expenses, debt, loan_amount, loan_term, random_variation, table
+    )
+    lgd = CreditRiskEngine._loss_given_default_batch(loan_amount, credit_score, employment_status, table)
+    expected_loss = pd * lgd * (loan_amount * (1 - 1 / 3))
+    return pd, lgd, CreditRiskEngine._risk_rating_batch(pd, lgd, expected_loss, loan_amount, table)
+
+
+def ladder_scalar(rows, random_variation):
+    """Score rows one at a time with the ladders"""
+    results = []
+    for (credit_score, income, expenses, debt, loan_amount, loan_term, employment_status), variation in zip(
+            rows, random_variation):
+        pd = ladder_probability_of_default(credit_score, income, expenses, debt, loan_amount, loan_term, variation)
+        lgd = ladder_loss_given_default(loan_amount, credit_score, employment_status)
+        expected_loss = pd * lgd * (loan_amount * (1 - 1 / 3))
+        results.append((pd, lgd, ladder_risk_rating(pd, lgd, expected_loss, loan_amount)))
+    return results
+
+
+def table_scalar(rows, random_variation, table):
+    """Score rows one at a time with the engine's table-driven methods"""
+    results = []
+    for (credit_score, income, expenses, debt, loan_amount, loan_term, employment_status), variation in zip(
+            rows, random_variation):
+        pd = CreditRiskEngine.calculate_probability_of_default(
+            credit_score, income, expenses, debt, loan_amount, loan_term,
+            random_variation=variation, table=table
+        )
+        lgd = CreditRiskEngine.calculate_loss_given_default(loan_amount, credit_score, employment_status, table=table)
+        expected_loss = pd * lgd * (loan_amount * (1 - 1 / 3))
+        results.append((pd, lgd, CreditRiskEngine.calculate_risk_rating(pd, lgd, expected_loss, loan_amount,
+                                                                         table=table)))
+    return results
+
+
+def synthetic_columns(rows):
+    """Application columns in the order the scoring helpers take them"""
+    rng = np.random.default_rng(42)
+    return (
+        rng.integers(300, 851, rows),
+        rng.integers(20000, 250000, rows).astype(float),
+        rng.integers(500, 8000, rows).astype(float),
+        rng.integers(0, 80000, rows).astype(float),
+        rng.integers(1000, 150000, rows).astype(float),
+        rng.choice(LOAN_TERMS, rows),
+        rng.choice(EMPLOYMENT_STATUSES, rows).astype(object)
+    )
+
+
+def timed(function, *args, repeat=3):
+    """Best-of-N wall time in seconds and the last result"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def compare(label, ladder, tabled, dti, random_factor):
+    """Print the largest differences and the recommendation agreement of two (pd, lgd, rating) results"""
+    pd_a, lgd_a, rating_a = ladder
+    pd_b, lgd_b, rating_b = tabled
+    decisions_a = CreditRiskEngine._recommendation_batch(rating_a, pd_a, dti, random_factor)[0]
+    decisions_b = CreditRiskEngine._recommendation_batch(rating_b, pd_b, dti, random_factor)[0]
+    print(f"\n{label}")
+    print(f"    max |PD difference|:     {np.max(np.abs(pd_a - pd_b)):.3g}")
+    print(f"    max |LGD difference|:    {np.max(np.abs(lgd_a - lgd_b)):.3g}")
+    print(f"    rating mismatches:       {int(np.count_nonzero(rating_a != rating_b)):,}")
+    print(f"    recommendation agreement: {np.mean(decisions_a == decisions_b):.6%}")
+
+
+def main():
+    """Time and compare ladder and table scoring on synthetic applications"""
+    parser = argparse.ArgumentParser(description='Benchmark compiled scoring tables against the if/elif ladders')
+    parser.add_argument('--rows', type=int, default=1000000, help='Applications scored on the vectorized path')
+    parser.add_argument('--scalar-rows', type=int, default=100000, help='Applications scored one at a time')
+    parser.add_argument('--table', help='Scoring table file (default: the active table)')
+    args = parser.parse_args()
+
+    table = load_scoring_table(args.table) if args.table else get_scoring_table()
+    print(f"Scoring table {table.version} from {table.source}")
+
+    columns = synthetic_columns(args.rows)
+    credit_score, income, expenses, debt, loan_amount, loan_term, employment_status = columns
+    random_variation, random_factor = application_noise(
+        loan_amount, loan_term, credit_score, income, expenses, debt, employment_status
+    )
+    dti = (debt / 12 + expenses) / (income / 12)
+
+    ladder_time, ladder = timed(ladder_batch, columns, random_variation)
+    table_time, tabled = timed(table_batch, columns, random_variation, table)
+    print(f"\nVectorized, {args.rows:,} rows")
+    print(f"    ladders: {ladder_time * 1000:9.1f} ms  ({ladder_time / args.rows * 1e9:6.1f} ns/row)")
+    print(f"    table:   {table_time * 1000:9.1f} ms  ({table_time / args.rows * 1e9:6.1f} ns/row)")
+    compare(f"Vectorized differences ({args.rows:,} rows)", ladder, tabled, dti, random_factor)
+
+    n = min(args.scalar_rows, args.rows)
+    rows = list(zip(*(column[:n].tolist() for column in columns)))
+    variations = random_variation[:n].tolist()
+    ladder_time, ladder = timed(ladder_scalar, rows, variations, repeat=1)
+    table_time, tabled = timed(table_scalar, rows, variations, table, repeat=1)
+    print(f"\nScalar, {n:,} rows")
+    print(f"    ladders: {ladder_time * 1000:9.1f} ms  ({ladder_time / n * 1e6:6.2f} us/row)")
+    print(f"    table:   {table_time * 1000:9.1f} ms  ({table_time / n * 1e6:6.2f} us/row)")
+    compare(f"Scalar differences ({n:,} rows)", tuple(np.array(part) for part in zip(*ladder)),
+            tuple(np.array(part) for part in zip(*tabled)), dti[:n], random_factor[:n])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+"""
+Bulk persistence for scored loan applications.
+
+Uploaded portfolios are written in batches: each batch inserts all of its
+LoanApplication rows in one statement (using INSERT ... RETURNING id where the
+database supports it, e.g. PostgreSQL and SQLite >= 3.35), then all matching
+RiskAssessment rows in a second executemany, adds the batch to the dashboard
+summary tables, and commits once. If a batch fails it is retried row by row
+so that individual failures can be reported without losing the rest of the
+upload.
+"""
+
+import logging
+from datetime import datetime
+
+from sqlalchemy import insert
+
+from app import db
+from models import LoanApplication, RiskAssessment
+from risk_engine import CreditRiskEngine
+from summary_tables import record_application_rows
+from dashboard_cache import dashboard_cache
+
+logger = logging.getLogger(__name__)
+
+# Number of applications written per transaction
+DEFAULT_BATCH_SIZE = 1000
+
+# Application status implied by each risk engine recommendation
+STATUS_BY_RECOMMENDATION = {
+    'Approve': 'Approved',
+    'Reject': 'Rejected',
+    'Review': 'Under Review'
+}
+
+
+def status_for_recommendation(recommendation):
+    """Map a risk engine recommendation to a LoanApplication status"""
+    return STATUS_BY_RECOMMENDATION.get(recommendation, 'Under Review')
+
+
+def _application_row(user_id, assessment, timestamp):
+    """Build the LoanApplication column values for one scored CSV row"""
+    app_data = assessment['application_data']
+    return {
+        'user_id': user_id,
+        'loan_amount': app_data['loan_amount'],
+        'loan_term': app_data['loan_term'],
+        'loan_purpose': app_data.get('loan_purpose', 'business'),  # Set a default if not provided
+        'age': 30,  # Default value, not in CSV
+        'annual_income': app_data['annual_income'],
+        'monthly_expenses': app_data['monthly_expenses'],
+        'credit_score': app_data['credit_score'],
+        'existing_debt': app_data['existing_debt'],
+        'employment_status': app_data['employment_status'],
+        'employment_length': 0,  # Default value, not in CSV
+        'home_ownership': 'rent',  # Default value, not in CSV
+        'status': status_for_recommendation(assessment['recommendation']),
+        'created_at': timestamp,
+        'updated_at': timestamp
+    }
+
+
+def _assessment_row(application_id, assessment, timestamp):
+    """Build the RiskAssessment column values for one scored CSV row"""
+    return {
+        'loan_application_id': application_id,
+        'probability_of_default': float(assessment['probability_of_default']),
+        'loss_given_default': float(assessment['loss_given_default']),
+        'exposure_at_default': float(assessment['exposure_at_default']),
+        'expected_loss': float(assessment['expected_loss']),
+        'risk_rating': int(assessment['risk_rating']),
+        'recommendation': assessment['recommendation'],
+        'reasons': ', '.join(assessment['reasons']),
+        'created_at': timestamp
+    }
+
+
+def _summary(application_row, assessment, application_id=None, error=None):
+    """Build the per-row summary shown on the dataset analysis page"""
+    return {
+        'id': application_id,
+        'loan_amount': application_row['loan_amount'],
+        'credit_score': application_row['credit_score'],
+        'status': application_row['status'],
+        'risk_rating': int(assessment['risk_rating']),
+        'probability_of_default': float(assessment['probability_of_default']),
+        'recommendation': assessment['recommendation'],
+        'error': error
+    }
+
+
+def _insert_applications(application_rows):
+    """
+    Insert a batch of applications and return their ids in input order.
+
+    Uses a single INSERT ... RETURNING when the dialect can return ids for
+    executemany in parameter order, otherwise falls back to flushing rows
+    one at a time inside the current transaction.
+    """
+    dialect = db.session.get_bind().dialect
+
+    if getattr(dialect, 'insert_executemany_returning_sort_by_parameter_order', False):
+        result = db.session.execute(
+            insert(LoanApplication).returning(LoanApplication.id, sort_by_parameter_order=True),
+            application_rows
+        )
+        return list(result.scalars())
+
+    ids = []
+    for row in application_rows:
+        application = LoanApplication(**row)
+        db.session.add(application)
+        db.session.flush()
+        ids.append(application.id)
+    return ids
+
+
+def _persist_batch(application_rows, assessments, timestamp):
+    """Write one batch in a single transaction; raises on any failure"""
+    application_ids = _insert_applications(application_rows)
+
+    db.session.execute(
+        insert(RiskAssessment),
+        [
+            _assessment_row(application_id, assessment, timestamp)
+            for application_id, assessment in zip(application_ids, assessments)
+        ]
+    )
+    record_application_rows(application_rows, [int(assessment['risk_rating']) for assessment in assessments])
+    db.session.commit()
+
+    return application_ids
+
+
+def _persist_rows_individually(application_rows, assessments, timestamp):
+    """Retry a failed batch row by row, recording the error for each failing row"""
+    summaries = []
+
+    for row, assessment in zip(application_rows, assessments):
+        try:
+            application = LoanApplication(**row)
+            db.session.add(application)
+            db.session.flush()  # Just to get the ID without committing
+            db.session.add(RiskAssessment(**_assessment_row(application.id, assessment, timestamp)))
+            record_application_rows([row], [int(assessment['risk_rating'])])
+            db.session.commit()
+            summaries.append(_summary(row, assessment, application_id=application.id))
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Error saving application to database: {str(e)}")
+            summaries.append(_summary(row, assessment, error=str(e)))
+
+    return summaries
+
+
+def _record_batch(result, summaries, start, max_summaries):
+    """Fold one batch's row summaries into the running persist_assessments result"""
+    for offset, summary in enumerate(summaries):
+        if summary['error'] is not None:
+            result['failures'].append({'row': start + offset + 1, 'error': summary['error']})
+        else:
+            result['saved'] += 1
+            result['status_counts'][summary['status']] = result['status_counts'].get(summary['status'], 0) + 1
+
+        if max_summaries is None or len(result['summaries']) < max_summaries:
+            result['summaries'].append(summary)
+
+    result['processed'] += len(summaries)
+
+
+def persist_assessments(user_id, assessments, batch_size=DEFAULT_BATCH_SIZE, on_batch=None, max_summaries=None):
+    """
+    Persist scored CSV rows as LoanApplication/RiskAssessment pairs in batches.
+
+    Only counts, failures and the first max_summaries row summaries are kept
+    across batches, so memory does not grow with the size of the upload.
+
+    Parameters:
+    - user_id: Owner of the created applications
+    - assessments: List of assessment dicts from CreditRiskEngine.process_dataframe
+    - batch_size: Number of applications written per transaction
+    - on_batch: Optional callable receiving the number of rows processed so far
+      after each batch
+    - max_summaries: Number of per-row summaries to keep (default: all)
+
+    Returns:
+    - result: Dict with
+      - processed: Number of rows attempted
+      - saved: Number of rows written
+      - status_counts: Saved rows per LoanApplication status
+      - failures: {'row', 'error'} for each row that could not be saved,
+        numbered from 1 in input order
+      - summaries: Per-row dicts for the first max_summaries rows in input
+        order; rows that could not be saved have 'id' set to None and the
+        database error in 'error'
+    """
+    result = {'processed': 0, 'saved': 0, 'status_counts': {}, 'failures': [], 'summaries': []}
+
+    for start in range(0, len(assessments), batch_size):
+        batch = assessments[start:start + batch_size]
+        timestamp = datetime.utcnow()
+        application_rows = [_application_row(user_id, assessment, timestamp) for assessment in batch]
+
+        try:
+            application_ids = _persist_batch(application_rows, batch, timestamp)
+        except Exception as e:
+            db.session.rollback()
+            logger.warning(f"Bulk insert of rows {start}-{start + len(batch) - 1} failed ({str(e)}); retrying row by row")
+            summaries = _persist_rows_individually(application_rows, batch, timestamp)
+        else:
+            summaries = [
+                _summary(row, assessment, application_id=application_id)
+                for row, assessment, application_id in zip(application_rows, batch, application_ids)
+            ]
+
+        _record_batch(result, summaries, start, max_summaries)
+
+        if on_batch is not None:
+            on_batch(result['processed'])
+
+    if assessments:
+        dashboard_cache.invalidate_user(user_id)
+
+    return result
+
+
+class ChunkPersister:
+    """
+    Chunk handler for CreditRiskEngine.stream_csv_data that writes each scored
+    chunk to the database with persist_assessments.
+
+    Only failures are kept between chunks (up to max_failures of them), so
+    memory stays flat regardless of file size.
+    """
+
+    def __init__(self, user_id, batch_size=DEFAULT_BATCH_SIZE, max_failures=100):
+        self.user_id = user_id
+        self.batch_size = batch_size
+        self.max_failures = max_failures
+        self.rows_seen = 0
+        self.failures = []
+
+    def __call__(self, chunk, scores):
+        assessments = CreditRiskEngine.assessments_from_scores(chunk, scores)
+        result = persist_assessments(self.user_id, assessments, self.batch_size, max_summaries=0)
+
+        for failure in result['failures'][:self.max_failures - len(self.failures)]:
+            self.failures.append({'row': self.rows_seen + failure['row'], 'error': failure['error']})
+
+        self.rows_seen += result['processed']
+        return len(result['failures'])
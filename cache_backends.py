@@ -0,0 +1,241 @@
+"""
+Key/value cache backends shared by the dashboard and assessment caches.
+
+Both backends store (expiry, value) per string key, evict least recently used
+entries beyond max_entries and drop entries by key prefix:
+- MemoryCacheBackend: an in-process LRU dictionary
+- SQLiteCacheBackend: a local SQLite file shared by every process on the host
+
+Neither depends on the Flask app, so offline scripts can use them too.
+"""
+
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class CacheStats:
+    """Per-process hit/miss counters"""
+
+    FIELDS = ('hits', 'misses', 'sets', 'evictions', 'invalidations')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.counts = dict.fromkeys(self.FIELDS, 0)
+
+    def incr(self, field, amount=1):
+        with self._lock:
+            self.counts[field] += amount
+
+    def snapshot(self):
+        with self._lock:
+            counts = dict(self.counts)
+        lookups = counts['hits'] + counts['misses']
+        counts['hit_rate'] = counts['hits'] / lookups if lookups else 0.0
+        return counts
+
+
+class MemoryCacheBackend:
+    """In-process LRU cache with per-entry expiry"""
+
+    name = 'memory'
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return (found, value)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+            expires_at, value = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                return False, None
+            self._entries.move_to_end(key)
+            return True, value
+
+    def set(self, key, value, ttl):
+        """Store a value; returns the number of entries evicted to make room"""
+        with self._lock:
+            self._entries[key] = (time.time() + ttl, value)
+            self._entries.move_to_end(key)
+            evicted = 0
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                evicted += 1
+            return evicted
+
+    def get_many(self, keys):
+        """Return {key: value} for the keys that are present and fresh"""
+        now = time.time()
+        found = {}
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is None:
+                    continue
+                if entry[0] <= now:
+                    del self._entries[key]
+                    continue
+                self._entries.move_to_end(key)
+                found[key] = entry[1]
+        return found
+
+    def set_many(self, items, ttl):
+        """Store {key: value}; returns the number of entries evicted to make room"""
+        expires_at = time.time() + ttl
+        with self._lock:
+            for key, value in items.items():
+                self._entries[key] = (expires_at, value)
+                self._entries.move_to_end(key)
+            evicted = 0
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                evicted += 1
+            return evicted
+
+    def delete_prefix(self, prefix):
+        """Drop every key starting with prefix; returns the number dropped"""
+        with self._lock:
+            keys = [key for key in self._entries if key.startswith(prefix)]
+            for key in keys:
+                del self._entries[key]
+            return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteCacheBackend:
+    """
+    LRU cache in a local SQLite file
+
+    Shared by every process on the host, so an invalidation in one web worker
+    is seen by the others. Values are pickled; the file must only be writable
+    by the application.
+    """
+
+    name = 'sqlite'
+
+    # Keys per SELECT in get_many, below SQLite's bound parameter limit
+    LOOKUP_BATCH_SIZE = 500
+
+    def __init__(self, path, max_entries):
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache_entry ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, "
+                "expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_cache_entry_accessed_at ON cache_entry (accessed_at)")
+
+    def _connect(self):
+        """One connection per thread; sqlite3 connections are not thread-safe"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        conn = self._connect()
+        now = time.time()
+        row = conn.execute("SELECT value, expires_at FROM cache_entry WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return False, None
+        value, expires_at = row
+        with conn:
+            if expires_at <= now:
+                conn.execute("DELETE FROM cache_entry WHERE key = ?", (key,))
+                return False, None
+            conn.execute("UPDATE cache_entry SET accessed_at = ? WHERE key = ?", (now, key))
+        return True, pickle.loads(value)
+
+    def set(self, key, value, ttl):
+        conn = self._connect()
+        now = time.time()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache_entry (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), now + ttl, now)
+            )
+            return self._evict(conn, now)
+
+    def get_many(self, keys):
+        conn = self._connect()
+        now = time.time()
+        found = {}
+        keys = list(keys)
+        for start in range(0, len(keys), self.LOOKUP_BATCH_SIZE):
+            batch = keys[start:start + self.LOOKUP_BATCH_SIZE]
+            rows = conn.execute(
+                f"SELECT key, value FROM cache_entry WHERE expires_at > ? AND key IN ({','.join('?' * len(batch))})",
+                [now] + batch
+            ).fetchall()
+            for key, value in rows:
+                found[key] = pickle.loads(value)
+        if found:
+            with conn:
+                conn.executemany("UPDATE cache_entry SET accessed_at = ? WHERE key = ?", [(now, key) for key in found])
+        return found
+
+    def set_many(self, items, ttl):
+        conn = self._connect()
+        now = time.time()
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO cache_entry (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                [
+                    (key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), now + ttl, now)
+                    for key, value in items.items()
+                ]
+            )
+            return self._evict(conn, now)
+
+    def _evict(self, conn, now):
+        """Drop expired entries, then the least recently used beyond max_entries"""
+        conn.execute("DELETE FROM cache_entry WHERE expires_at <= ?", (now,))
+        excess = conn.execute("SELECT COUNT(*) FROM cache_entry").fetchone()[0] - self.max_entries
+        if excess > 0:
+            conn.execute(
+                "DELETE FROM cache_entry WHERE key IN "
+                "(SELECT key FROM cache_entry ORDER BY accessed_at LIMIT ?)",
+                (excess,)
+            )
+            return excess
+        return 0
+
+    def delete_prefix(self, prefix):
+        conn = self._connect()
+        escaped = prefix.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        with conn:
+            result = conn.execute("DELETE FROM cache_entry WHERE key LIKE ? ESCAPE '\\'", (escaped + '%',))
+        return result.rowcount
+
+    def clear(self):
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM cache_entry")
+
+    def __len__(self):
+        return self._connect().execute("SELECT COUNT(*) FROM cache_entry").fetchone()[0]
@@ -0,0 +1,156 @@
+"""
+Data cache for read-heavy dashboard pages.
+
+The reports, insights, admin insights and model comparison pages are viewed
+far more often than the applications behind them change. Their template
+data is cached here, per user or globally, with a TTL and LRU eviction, and
+the write paths (apply, uploads, staff decisions, seeding) invalidate the
+affected keys.
+
+The backend is selected with DASHBOARD_CACHE_BACKEND:
+- memory: an in-process LRU dictionary
+- sqlite: a local SQLite file shared by all worker processes on the host
+  (DASHBOARD_CACHE_PATH, default instance/dashboard_cache.db)
+- none: disables caching
+
+When it is unset, sqlite is used if WEB_CONCURRENCY (gunicorn's worker count)
+is above 1 and memory otherwise. Invalidation only reaches the process that
+handled the write, so with the memory backend and several workers the other
+workers keep serving their entries for up to DASHBOARD_CACHE_TTL seconds.
+
+Keys are namespaced as 'user:<id>:<name>' or 'global:<name>', so a write by
+one user only drops that user's entries plus the global ones.
+"""
+
+import logging
+import os
+
+from app import app
+from cache_backends import CacheStats, MemoryCacheBackend, SQLiteCacheBackend
+
+logger = logging.getLogger(__name__)
+
+# Number of web worker processes, as configured for gunicorn
+WEB_CONCURRENCY = int(os.environ.get('WEB_CONCURRENCY', 1))
+
+# Backend: memory, sqlite or none. Writes only invalidate the memory backend
+# of the worker that handled them, so the default is the shared sqlite file
+# whenever more than one worker runs
+CACHE_BACKEND = os.environ.get('DASHBOARD_CACHE_BACKEND', 'sqlite' if WEB_CONCURRENCY > 1 else 'memory')
+
+# SQLite backend file
+CACHE_PATH = os.environ.get('DASHBOARD_CACHE_PATH', os.path.join(app.instance_path, 'dashboard_cache.db'))
+
+# Seconds an entry stays valid without an invalidating write; also how long
+# other workers may serve stale data after a write with the memory backend
+DEFAULT_TTL = int(os.environ.get('DASHBOARD_CACHE_TTL', 300))
+
+# Maximum number of entries before least recently used ones are evicted
+MAX_ENTRIES = int(os.environ.get('DASHBOARD_CACHE_MAX_ENTRIES', 1024))
+
+GLOBAL_SCOPE = 'global'
+
+
+def user_scope(user_id):
+    """Key prefix for entries holding one user's data"""
+    return f"user:{user_id}"
+
+
+class DashboardCache:
+    """TTL/LRU data cache with scope-based invalidation and hit/miss counters"""
+
+    def __init__(self, backend, default_ttl=DEFAULT_TTL):
+        self.backend = backend
+        self.default_ttl = default_ttl
+        self.stats = CacheStats()
+
+    def get_or_set(self, scope, name, builder, ttl=None):
+        """
+        Return the cached value for scope/name, building and storing it on a miss
+
+        Parameters:
+        - scope: user_scope(user_id) or GLOBAL_SCOPE
+        - name: Entry name within the scope, including any parameters
+        - builder: Zero-argument callable producing the value
+        - ttl: Optional lifetime in seconds (default: DASHBOARD_CACHE_TTL)
+
+        Returns:
+        - value: Cached or freshly built value
+        """
+        if self.backend is None:
+            return builder()
+
+        key = f"{scope}:{name}"
+        try:
+            found, value = self.backend.get(key)
+        except Exception as e:
+            logger.warning(f"Dashboard cache read failed for {key}: {str(e)}")
+            found = False
+
+        if found:
+            self.stats.incr('hits')
+            return value
+
+        self.stats.incr('misses')
+        value = builder()
+
+        try:
+            evicted = self.backend.set(key, value, self.default_ttl if ttl is None else ttl)
+            self.stats.incr('sets')
+            if evicted:
+                self.stats.incr('evictions', evicted)
+        except Exception as e:
+            logger.warning(f"Dashboard cache write failed for {key}: {str(e)}")
+
+        return value
+
+    def invalidate_user(self, user_id):
+        """Drop a user's entries and the global ones their data feeds into"""
+        self._delete_prefix(f"{user_scope(user_id)}:")
+        self._delete_prefix(f"{GLOBAL_SCOPE}:")
+
+    def invalidate_all(self):
+        """Drop every entry"""
+        if self.backend is None:
+            return
+        try:
+            self.backend.clear()
+            self.stats.incr('invalidations')
+        except Exception as e:
+            logger.warning(f"Dashboard cache clear failed: {str(e)}")
+
+    def _delete_prefix(self, prefix):
+        if self.backend is None:
+            return
+        try:
+            self.stats.incr('invalidations', self.backend.delete_prefix(prefix))
+        except Exception as e:
+            logger.warning(f"Dashboard cache invalidation failed for {prefix}: {str(e)}")
+
+    def stats_snapshot(self):
+        """Counters plus backend details, for the stats endpoint"""
+        stats = self.stats.snapshot()
+        stats['backend'] = self.backend.name if self.backend is not None else 'none'
+        try:
+            stats['entries'] = len(self.backend) if self.backend is not None else 0
+        except Exception:
+            stats['entries'] = None
+        stats['max_entries'] = getattr(self.backend, 'max_entries', 0)
+        stats['default_ttl'] = self.default_ttl
+        return stats
+
+
+def _create_backend(name):
+    """Instantiate the configured backend, falling back to memory on errors"""
+    if name == 'none':
+        return None
+    if name == 'sqlite':
+        try:
+            return SQLiteCacheBackend(CACHE_PATH, MAX_ENTRIES)
+        except Exception as e:
+            logger.warning(f"SQLite dashboard cache unavailable ({str(e)}); using in-process cache")
+    return MemoryCacheBackend(MAX_ENTRIES)
+
+
+# Process-wide cache used by the dashboard views
+dashboard_cache = DashboardCache(_create_backend(CACHE_BACKEND))
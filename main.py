@@ -1,6 +1,6 @@
 # Main application entry point
 from app import app
-from routes import auth, loan, profile, insights, admin
+from routes import auth, loan, profile, insights, admin, jobs
 import logging
 
 # Configure logging
@@ -18,6 +18,7 @@ app.register_blueprint(loan.bp)
 app.register_blueprint(profile.bp)
 app.register_blueprint(insights.bp)
 app.register_blueprint(admin.bp)
+app.register_blueprint(jobs.bp)
 
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=5000, debug=True)
@@ -0,0 +1,127 @@
+"""
+Process-wide registry of the current anomaly detection models.
+
+Loading the scaler, Isolation Forest, PCA and KMeans means listing the model
+directory and unpickling four joblib files. The registry does that once per
+worker process and hands the same read-only ModelBundle to every request.
+A retrain publishes its bundle with a single reference swap, so requests
+in flight keep the bundle they started with and new ones see the new models.
+
+Other worker processes notice a retrain when the CURRENT pointer of the
+model directory is replaced (see model_store): one stat() call per lookup
+instead of a listing and four loads.
+"""
+
+import logging
+import os
+import threading
+
+from cache_backends import CacheStats
+from model_store import load_current_bundle, pointer_stamp
+from unsupervised_models import AnomalyDetector
+
+logger = logging.getLogger(__name__)
+
+# Directory the anomaly models are saved to and loaded from
+MODEL_DIR = os.environ.get('ANOMALY_MODEL_DIR', './models')
+
+# Pointer stamp before the first load, distinct from None (no directory)
+_NOT_LOADED = object()
+
+
+class RegistryStats(CacheStats):
+    """Lookup, load and publish counters"""
+
+    FIELDS = ('lookups', 'loads', 'publishes', 'load_errors')
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.counts)
+
+
+class ModelRegistry:
+    """Holds the current ModelBundle of one model directory"""
+
+    def __init__(self, model_dir=MODEL_DIR):
+        self.model_dir = model_dir
+        self.stats = RegistryStats()
+        self._bundle = None
+        self._stamp = _NOT_LOADED
+        self._lock = threading.Lock()
+
+    def current(self):
+        """
+        The current models, loading them from disk only when they changed
+
+        Returns:
+        - bundle: ModelBundle, or None if no models have been trained yet
+        """
+        self.stats.incr('lookups')
+        stamp = pointer_stamp(self.model_dir)
+        bundle = self._bundle
+        if stamp == self._stamp:
+            return bundle
+
+        with self._lock:
+            # Another thread may have loaded it while we waited
+            if stamp == self._stamp:
+                return self._bundle
+            try:
+                loaded = load_current_bundle(self.model_dir)
+            except Exception as e:
+                logger.error(f"Error loading anomaly models: {str(e)}")
+                self.stats.incr('load_errors')
+                return self._bundle
+            self.stats.incr('loads')
+            if loaded is not None:
+                self._bundle = loaded
+            self._stamp = stamp
+            return self._bundle
+
+    def publish(self, bundle):
+        """Make a freshly trained bundle current without reloading it from disk"""
+        with self._lock:
+            self._bundle = bundle
+            self._stamp = pointer_stamp(self.model_dir)
+        self.stats.incr('publishes')
+        logger.info(f"Published anomaly models {bundle.version}")
+
+    def detector(self, n_jobs=None):
+        """An AnomalyDetector using the current models (untrained if there are none)"""
+        return AnomalyDetector(model_dir=self.model_dir, n_jobs=n_jobs, bundle=self.current())
+
+    def train(self, df, n_jobs=None):
+        """
+        Train new models on df and publish them
+
+        Parameters:
+        - df: DataFrame with loan application data
+        - n_jobs: Number of parallel jobs for Isolation Forest fitting
+
+        Returns:
+        - (detector, training_info): The trained AnomalyDetector and its
+          training results (None if df was too small to train on)
+        """
+        detector = AnomalyDetector(model_dir=self.model_dir, n_jobs=n_jobs)
+        training_info = detector.train(df)
+        if training_info is not None:
+            self.publish(detector.bundle)
+        return detector, training_info
+
+    def clear(self):
+        """Forget the loaded models; the next lookup reads them from disk"""
+        with self._lock:
+            self._bundle = None
+            self._stamp = _NOT_LOADED
+
+    def stats_snapshot(self):
+        """Counters plus the current version, for the stats endpoint"""
+        stats = self.stats.snapshot()
+        bundle = self._bundle
+        stats['model_dir'] = self.model_dir
+        stats['version'] = bundle.version if bundle is not None else None
+        return stats
+
+
+# Process-wide registry used by uploads and scoring
+model_registry = ModelRegistry()
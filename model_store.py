@@ -0,0 +1,293 @@
+"""
+Versioned on-disk format for the anomaly detection models.
+
+Every training run is saved as one bundle directory, <model_dir>/<version>/,
+holding the scaler, Isolation Forest, PCA and KMeans joblib files and a
+manifest.json recording the features, training row count, a hash of the
+training data and the training metrics. Bundles are written under a
+temporary name and renamed into place, so a bundle directory is always
+complete.
+
+The CURRENT file names the version in use. It is replaced with os.replace,
+so readers see either the previous or the new version, never a mix of
+components from different runs. After each save, bundles beyond the newest
+ANOMALY_MODEL_RETENTION are deleted, as are the timestamped files of the
+older flat layout (<component>_<YYYYmmdd_HHMMSS>.joblib), which is still
+read when no CURRENT pointer exists.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import secrets
+import shutil
+import time
+from datetime import datetime
+
+import numpy as np
+import sklearn
+from joblib import dump, load
+
+logger = logging.getLogger(__name__)
+
+# Components of a bundle, each saved as <component>.joblib
+MODEL_COMPONENTS = ('scaler', 'isolation_forest', 'pca', 'kmeans')
+
+# Version of the bundle layout written to manifests
+BUNDLE_FORMAT = 1
+
+MANIFEST_NAME = 'manifest.json'
+CURRENT_POINTER = 'CURRENT'
+TEMP_PREFIX = '.tmp-'
+
+# Bundles kept on disk, including the current one
+MODEL_RETENTION = int(os.environ.get('ANOMALY_MODEL_RETENTION', 5))
+
+# Seconds after which an unfinished temporary bundle is considered abandoned
+STALE_TEMP_SECONDS = 3600
+
+# Components are loaded with their NumPy arrays memory-mapped read-only from
+# the (uncompressed) joblib files, so workers share those pages through the
+# OS page cache instead of each holding a private copy. Set
+# ANOMALY_MODEL_MMAP=0 to read them into process memory instead.
+MMAP_MODE = 'r' if os.environ.get('ANOMALY_MODEL_MMAP', '1') != '0' else None
+
+
+class ModelBundle:
+    """
+    The fitted scaler, Isolation Forest, PCA and KMeans of one training run.
+    Bundles are read-only once built, so one can be shared by every request.
+    """
+
+    def __init__(self, scaler, isolation_forest, pca, kmeans, version=None, manifest=None):
+        self.scaler = scaler
+        self.isolation_forest = isolation_forest
+        self.pca = pca
+        self.kmeans = kmeans
+        self.version = version
+        self.manifest = manifest or {}
+
+    def __repr__(self):
+        return f"<ModelBundle {self.version}>"
+
+
+def new_version():
+    """A version name that sorts by creation time; the suffix keeps concurrent trainings apart"""
+    return f"{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}_{secrets.token_hex(2)}"
+
+
+def data_hash(X):
+    """SHA-256 of a feature frame's column names and float64 values"""
+    digest = hashlib.sha256(json.dumps(list(X.columns)).encode())
+    digest.update(np.ascontiguousarray(X.to_numpy(dtype=np.float64)).tobytes())
+    return digest.hexdigest()
+
+
+def build_manifest(version, feature_names, training_rows, training_data_hash, metrics):
+    """Manifest contents for a bundle"""
+    return {
+        'format': BUNDLE_FORMAT,
+        'version': version,
+        'created_at': datetime.utcnow().isoformat(),
+        'components': {component: f'{component}.joblib' for component in MODEL_COMPONENTS},
+        'features': list(feature_names),
+        'training_rows': int(training_rows),
+        'data_hash': training_data_hash,
+        'metrics': metrics,
+        'sklearn_version': sklearn.__version__
+    }
+
+
+def _write_pointer(model_dir, version):
+    """Point CURRENT at version atomically"""
+    temp_path = os.path.join(model_dir, f'{TEMP_PREFIX}{CURRENT_POINTER}-{secrets.token_hex(4)}')
+    with open(temp_path, 'w') as pointer:
+        pointer.write(version)
+        pointer.flush()
+        os.fsync(pointer.fileno())
+    os.replace(temp_path, os.path.join(model_dir, CURRENT_POINTER))
+
+
+def save_bundle(model_dir, bundle, manifest, retention=MODEL_RETENTION):
+    """
+    Write a bundle directory, make it current and collect old versions
+
+    Parameters:
+    - model_dir: Model directory
+    - bundle: ModelBundle to save; bundle.version names the directory
+    - manifest: Manifest dictionary (see build_manifest)
+    - retention: Number of bundles to keep
+
+    Returns:
+    - path: Directory of the saved bundle
+    """
+    os.makedirs(model_dir, exist_ok=True)
+    final_path = os.path.join(model_dir, bundle.version)
+    temp_path = os.path.join(model_dir, f'{TEMP_PREFIX}{bundle.version}')
+    os.makedirs(temp_path)
+
+    try:
+        for component in MODEL_COMPONENTS:
+            # Uncompressed: compressed joblib files cannot be memory-mapped
+            dump(getattr(bundle, component), os.path.join(temp_path, manifest['components'][component]), compress=0)
+        with open(os.path.join(temp_path, MANIFEST_NAME), 'w') as manifest_file:
+            json.dump(manifest, manifest_file, indent=2)
+        os.rename(temp_path, final_path)
+    except Exception:
+        shutil.rmtree(temp_path, ignore_errors=True)
+        raise
+
+    _write_pointer(model_dir, bundle.version)
+    bundle.manifest = manifest
+    logger.info(f"Saved model bundle {bundle.version}")
+
+    try:
+        collect_garbage(model_dir, retention)
+    except OSError as e:
+        logger.warning(f"Model garbage collection failed: {str(e)}")
+
+    return final_path
+
+
+def current_version(model_dir):
+    """Version named by CURRENT, or None"""
+    try:
+        with open(os.path.join(model_dir, CURRENT_POINTER)) as pointer:
+            return pointer.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def pointer_stamp(model_dir):
+    """
+    Cheap validator for the current models: changes whenever CURRENT is
+    replaced, or, for the flat layout, whenever files are added
+    """
+    try:
+        stat = os.stat(os.path.join(model_dir, CURRENT_POINTER))
+        return stat.st_ino, stat.st_mtime_ns
+    except FileNotFoundError:
+        pass
+    try:
+        return os.stat(model_dir).st_mtime_ns
+    except OSError:
+        return None
+
+
+def load_bundle(model_dir, version):
+    """
+    Load one bundle directory
+
+    Raises:
+    - ValueError: If the manifest is missing, unreadable or of an unknown format
+    """
+    path = os.path.join(model_dir, version)
+    try:
+        with open(os.path.join(path, MANIFEST_NAME)) as manifest_file:
+            manifest = json.load(manifest_file)
+    except (OSError, json.JSONDecodeError) as e:
+        raise ValueError(f"Cannot read manifest of model bundle {version}: {str(e)}")
+    if manifest.get('format') != BUNDLE_FORMAT:
+        raise ValueError(f"Model bundle {version} has unsupported format {manifest.get('format')}")
+
+    components = {
+        component: load(os.path.join(path, manifest['components'][component]), mmap_mode=MMAP_MODE)
+        for component in MODEL_COMPONENTS
+    }
+    logger.info(f"Loaded model bundle {version}")
+    return ModelBundle(version=version, manifest=manifest, **components)
+
+
+def _legacy_files(model_dir):
+    """Timestamped files of the flat layout, by component"""
+    files = {component: [] for component in MODEL_COMPONENTS}
+    for name in os.listdir(model_dir):
+        for component in MODEL_COMPONENTS:
+            if name.startswith(f'{component}_') and name.endswith('.joblib'):
+                files[component].append(name)
+                break
+    return files
+
+
+def load_legacy_bundle(model_dir):
+    """Newest file of each component in the flat layout, or None"""
+    files = _legacy_files(model_dir)
+    if not all(files.values()):
+        return None
+
+    latest = {component: max(names) for component, names in files.items()}
+    components = {
+        component: load(os.path.join(model_dir, latest[component]), mmap_mode=MMAP_MODE)
+        for component in MODEL_COMPONENTS
+    }
+    # Files are named <component>_<timestamp>.joblib
+    version = latest['isolation_forest'][len('isolation_forest_'):-len('.joblib')]
+    logger.info(f"Loaded models: {', '.join(latest[component] for component in MODEL_COMPONENTS)}")
+    return ModelBundle(version=version, **components)
+
+
+def load_current_bundle(model_dir):
+    """
+    Load the models in use
+
+    Returns:
+    - bundle: The bundle named by CURRENT, else the newest flat-layout files,
+      else None
+    """
+    if not os.path.isdir(model_dir):
+        return None
+    version = current_version(model_dir)
+    if version is not None:
+        return load_bundle(model_dir, version)
+    return load_legacy_bundle(model_dir)
+
+
+def list_versions(model_dir):
+    """Bundle versions on disk, oldest first"""
+    return sorted(
+        name for name in os.listdir(model_dir)
+        if not name.startswith(TEMP_PREFIX) and os.path.isfile(os.path.join(model_dir, name, MANIFEST_NAME))
+    )
+
+
+def collect_garbage(model_dir, retention=MODEL_RETENTION):
+    """
+    Delete bundles beyond the newest `retention`, abandoned temporary
+    bundles and, once a bundle is current, flat-layout files
+
+    The current bundle is always kept. Processes that already loaded a
+    deleted bundle keep using their in-memory copy.
+
+    Returns:
+    - removed: Names of the deleted files and directories
+    """
+    current = current_version(model_dir)
+    versions = list_versions(model_dir)
+    keep = set(versions[-retention:]) if retention > 0 else set()
+    if current is not None:
+        keep.add(current)
+
+    removed = [version for version in versions if version not in keep]
+    for version in removed:
+        shutil.rmtree(os.path.join(model_dir, version), ignore_errors=True)
+
+    now = time.time()
+    for name in os.listdir(model_dir):
+        path = os.path.join(model_dir, name)
+        if name.startswith(TEMP_PREFIX) and now - os.path.getmtime(path) > STALE_TEMP_SECONDS:
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                os.remove(path)
+            removed.append(name)
+
+    if current is not None:
+        for names in _legacy_files(model_dir).values():
+            for name in names:
+                os.remove(os.path.join(model_dir, name))
+                removed.append(name)
+
+    if removed:
+        logger.info(f"Removed {len(removed)} old model files and bundles from {model_dir}")
+    return removed
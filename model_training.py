@@ -0,0 +1,335 @@
+"""
+Anomaly model training, kept out of the upload path.
+
+Uploads are scored against the models held by model_registry and only train
+while no models exist yet; ANOMALY_UPLOAD_MODE=train restores training on
+every upload. Each scored upload is compared with the data the current
+models were trained on, using statistics the bundle already carries (the
+fitted scaler's mean_ and scale_, and the manifest's anomaly percentage):
+
+- mean shift: distance of each feature mean from its training mean, in
+  training standard deviations
+- spread: ratio of each feature's standard deviation to its training one,
+  in either direction
+- anomaly rate: share of the upload flagged as anomalous against the share
+  flagged in the training data, beyond binomial noise
+
+An upload crossing a threshold schedules a retrain on the most recent
+applications in a background thread. run_model_training.py runs the same
+check on a schedule, and admins can force a retrain through
+/admin/api/model-registry/retrain.
+"""
+
+import logging
+import math
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from app import app, db
+from models import LoanApplication
+from model_registry import model_registry
+from unsupervised_models import AnomalyDetector
+
+logger = logging.getLogger(__name__)
+
+# 'score' uploads against the registered models, or 'train' new models on every upload
+UPLOAD_MODE = os.environ.get('ANOMALY_UPLOAD_MODE', 'score')
+
+# Schedule a retrain from the web process when an upload has drifted;
+# with 0 drift is only recorded and left to run_model_training.py
+AUTO_RETRAIN = os.environ.get('ANOMALY_AUTO_RETRAIN', '1') != '0'
+
+# Most recent applications a retrain learns from
+TRAINING_ROWS = int(os.environ.get('ANOMALY_TRAINING_ROWS', 50000))
+
+# Fewest rows AnomalyDetector.train accepts
+MIN_TRAINING_ROWS = 5
+
+# Drift thresholds; samples smaller than DRIFT_MIN_ROWS are too noisy to judge
+DRIFT_MIN_ROWS = int(os.environ.get('ANOMALY_DRIFT_MIN_ROWS', 30))
+DRIFT_MEAN_SHIFT = float(os.environ.get('ANOMALY_DRIFT_MEAN_SHIFT', 0.5))
+DRIFT_STD_RATIO = float(os.environ.get('ANOMALY_DRIFT_STD_RATIO', 1.5))
+DRIFT_ANOMALY_RATE_RATIO = float(os.environ.get('ANOMALY_DRIFT_RATE_RATIO', 2.0))
+
+# Models younger than this are not retrained unless forced
+RETRAIN_MIN_INTERVAL_MINUTES = int(os.environ.get('ANOMALY_RETRAIN_MIN_MINUTES', 60))
+
+# Application fields the anomaly models are trained on
+TRAINING_FIELDS = (
+    'loan_amount', 'loan_term', 'credit_score',
+    'annual_income', 'monthly_expenses', 'existing_debt'
+)
+
+_executor = None
+_status = {'pending': False, 'last_drift': None, 'last_retrain': None}
+_status_lock = threading.Lock()
+
+
+def _expected_anomaly_percentage(bundle):
+    """Percentage of the training data the models flagged as anomalous"""
+    metrics = bundle.manifest.get('metrics', {})
+    if 'anomaly_percentage' in metrics:
+        return float(metrics['anomaly_percentage'])
+    # Bundles of the flat layout have no manifest
+    contamination = getattr(bundle.isolation_forest, 'contamination', 'auto')
+    if isinstance(contamination, (int, float)):
+        return float(contamination) * 100
+    return None
+
+
+def measure_drift(bundle, X, anomaly_percentage):
+    """
+    Compare data with the data a bundle's models were trained on
+
+    Parameters:
+    - bundle: ModelBundle the data was scored with
+    - X: Feature frame from AnomalyDetector.preprocess_data
+    - anomaly_percentage: Percentage of X the models flagged as anomalous
+
+    Returns:
+    - drift: Dict with per-feature mean shifts and spread ratios, the observed
+      and expected anomaly percentages, 'drifted' and the reasons for it
+    """
+    features = bundle.manifest.get('features') or list(getattr(bundle.scaler, 'feature_names_in_', X.columns))
+    drift = {
+        'version': bundle.version,
+        'rows': len(X),
+        'checked_at': datetime.utcnow().isoformat(),
+        'features': {},
+        'anomaly_percentage': float(anomaly_percentage),
+        'expected_anomaly_percentage': _expected_anomaly_percentage(bundle),
+        'drifted': False,
+        'reasons': []
+    }
+
+    if list(X.columns) != list(features):
+        drift['drifted'] = True
+        drift['reasons'].append(f"Features {list(X.columns)} differ from the trained features {list(features)}")
+        return drift
+    if len(X) < DRIFT_MIN_ROWS:
+        drift['reasons'].append(f"Too few rows to measure drift ({len(X)} < {DRIFT_MIN_ROWS})")
+        return drift
+
+    values = X.to_numpy(dtype=np.float64)
+    scale = bundle.scaler.scale_
+    mean_shift = np.abs(values.mean(axis=0) - bundle.scaler.mean_) / scale
+    std_ratio = values.std(axis=0) / scale
+
+    for i, feature in enumerate(features):
+        drift['features'][feature] = {'mean_shift': float(mean_shift[i]), 'std_ratio': float(std_ratio[i])}
+        if mean_shift[i] > DRIFT_MEAN_SHIFT:
+            drift['reasons'].append(f"{feature} mean moved {mean_shift[i]:.2f} training standard deviations")
+        if std_ratio[i] > DRIFT_STD_RATIO or std_ratio[i] < 1 / DRIFT_STD_RATIO:
+            drift['reasons'].append(f"{feature} spread is {std_ratio[i]:.2f}x its training spread")
+
+    expected = drift['expected_anomaly_percentage']
+    if expected is not None:
+        # Only flag rates well beyond what sampling alone would produce
+        n = len(X)
+        p = expected / 100
+        excess = (anomaly_percentage / 100 - p) * n
+        if anomaly_percentage > expected * DRIFT_ANOMALY_RATE_RATIO and excess > 3 * math.sqrt(n * p * (1 - p)):
+            drift['reasons'].append(
+                f"{anomaly_percentage:.1f}% of rows are anomalous against {expected:.1f}% in training"
+            )
+
+    drift['drifted'] = bool(drift['reasons'])
+    return drift
+
+
+def check_drift(detector, X, anomaly_results):
+    """
+    Measure drift of scored application data against the detector's models
+
+    Parameters:
+    - detector: AnomalyDetector holding the current models
+    - X: Feature frame from detector.preprocess_data, as passed to detect_anomalies
+    - anomaly_results: detect_anomalies output for the same data
+
+    Returns:
+    - drift: See measure_drift
+    """
+    drift = measure_drift(detector.bundle, X, anomaly_results.get('anomaly_percentage', 0.0))
+    with _status_lock:
+        _status['last_drift'] = drift
+    if drift['drifted']:
+        logger.warning(f"Drift from anomaly models {drift['version']}: {'; '.join(drift['reasons'])}")
+    return drift
+
+
+def _scoring_summary(detector, anomaly_results, feature_names):
+    """
+    Feature importance and cluster statistics of a scored upload, shaped like
+    AnomalyDetector.train's results (None if detection failed)
+    """
+    if 'clusters' not in anomaly_results:
+        return None
+    return {
+        'version': detector.version,
+        'dataset_size': anomaly_results['total_records'],
+        'features_used': feature_names,
+        'anomaly_count': anomaly_results['anomaly_count'],
+        'anomaly_percentage': anomaly_results['anomaly_percentage'],
+        'feature_importance': anomaly_results['feature_importance'],
+        'clusters': anomaly_results['clusters'],
+        'variance_explained': anomaly_results['pca_explained_variance']
+    }
+
+
+def score_upload(df, n_jobs=None):
+    """
+    Find anomalies in an uploaded dataset
+
+    Scores against the registered models, checks the upload for drift and
+    schedules a retrain when it has drifted. Trains on the upload instead
+    when no models exist yet or UPLOAD_MODE is 'train'.
+
+    Parameters:
+    - df: Validated application DataFrame
+    - n_jobs: Number of parallel jobs for anomaly detection
+
+    Returns:
+    - (unsupervised_results, anomaly_results, anomaly_model): Feature
+      importance and cluster statistics (from training when the upload was
+      trained on, else from scoring it), detect_anomalies output and a dict
+      describing the models used, the drift and any scheduled retrain
+    """
+    detector = model_registry.detector(n_jobs=n_jobs)
+    trained = UPLOAD_MODE == 'train' or detector.bundle is None
+    drift = None
+    retrain_scheduled = False
+
+    if trained:
+        # Train new models and make them the current ones for every request
+        detector, unsupervised_results = model_registry.train(df, n_jobs=n_jobs)
+        anomaly_results = detector.detect_anomalies(df)
+    else:
+        X, feature_names = detector.preprocess_data(df)
+        anomaly_results = detector.detect_anomalies(df, preprocessed=(X, feature_names))
+        unsupervised_results = _scoring_summary(detector, anomaly_results, feature_names)
+        drift = check_drift(detector, X, anomaly_results)
+        if drift['drifted'] and AUTO_RETRAIN:
+            retrain_scheduled = schedule_retrain('; '.join(drift['reasons']), check=False)
+
+    anomaly_model = {
+        'version': detector.version,
+        'trained': trained and unsupervised_results is not None,
+        'drift': drift,
+        'retrain_scheduled': retrain_scheduled
+    }
+    return unsupervised_results, anomaly_results, anomaly_model
+
+
+def load_training_frame(limit=TRAINING_ROWS):
+    """Numeric fields of the most recent applications, named as in upload CSVs"""
+    rows = db.session.query(*[getattr(LoanApplication, field) for field in TRAINING_FIELDS])\
+        .order_by(LoanApplication.id.desc())\
+        .limit(limit).all()
+    return pd.DataFrame(rows, columns=list(TRAINING_FIELDS))
+
+
+def _trained_recently(bundle):
+    """Whether a bundle is younger than RETRAIN_MIN_INTERVAL_MINUTES"""
+    created_at = bundle.manifest.get('created_at')
+    if not created_at:
+        return False
+    age = datetime.utcnow() - datetime.fromisoformat(created_at)
+    return age < timedelta(minutes=RETRAIN_MIN_INTERVAL_MINUTES)
+
+
+def _record_retrain(outcome):
+    """Store a retrain outcome as the last one of this process"""
+    outcome['finished_at'] = datetime.utcnow().isoformat()
+    with _status_lock:
+        _status['last_retrain'] = outcome
+    logger.info(f"Anomaly model retrain {outcome['status']}: {outcome['reason']}")
+    return outcome
+
+
+def retrain_models(force=False, check=True, reason=None, n_jobs=None):
+    """
+    Retrain the anomaly models on the most recent applications
+
+    Parameters:
+    - force: Retrain even if the current models are recent or have not drifted
+    - check: Retrain only if the recent applications drifted from the
+      current models' training data
+    - reason: Why the retrain was requested, for the log and status
+    - n_jobs: Number of parallel jobs for Isolation Forest fitting
+
+    Returns:
+    - outcome: Dict with 'status' ('trained' or 'skipped'), 'reason', the new
+      'version' and the 'drift' measured on the recent applications
+    """
+    df = load_training_frame()
+    bundle = model_registry.current()
+    outcome = {'status': 'skipped', 'reason': reason, 'version': None, 'drift': None, 'rows': len(df)}
+
+    if len(df) < MIN_TRAINING_ROWS:
+        outcome['reason'] = f"Only {len(df)} applications to train on"
+        return _record_retrain(outcome)
+
+    if bundle is not None and not force:
+        if _trained_recently(bundle):
+            outcome['reason'] = f"Models {bundle.version} are less than {RETRAIN_MIN_INTERVAL_MINUTES} minutes old"
+            return _record_retrain(outcome)
+        if check:
+            detector = AnomalyDetector(model_dir=model_registry.model_dir, n_jobs=n_jobs, bundle=bundle)
+            X, feature_names = detector.preprocess_data(df)
+            anomaly_results = detector.detect_anomalies(df, preprocessed=(X, feature_names))
+            outcome['drift'] = check_drift(detector, X, anomaly_results)
+            if not outcome['drift']['drifted']:
+                outcome['reason'] = f"Recent applications match models {bundle.version}"
+                return _record_retrain(outcome)
+            outcome['reason'] = reason or '; '.join(outcome['drift']['reasons'])
+
+    if bundle is None:
+        outcome['reason'] = reason or 'No models trained yet'
+    logger.info(f"Retraining anomaly models on {len(df)} applications: {outcome['reason']}")
+    detector, training_info = model_registry.train(df, n_jobs=n_jobs)
+    if training_info is not None:
+        outcome['status'] = 'trained'
+        outcome['version'] = detector.version
+    return _record_retrain(outcome)
+
+
+def _retrain_in_background(force, check, reason):
+    """Run retrain_models inside an application context and clear the pending flag"""
+    with app.app_context():
+        try:
+            retrain_models(force=force, check=check, reason=reason)
+        except Exception:
+            logger.exception("Anomaly model retrain failed")
+        finally:
+            db.session.remove()
+            with _status_lock:
+                _status['pending'] = False
+
+
+def schedule_retrain(reason, force=False, check=True):
+    """
+    Retrain in a background thread of this process
+
+    Returns:
+    - scheduled: False if a retrain is already pending in this process
+    """
+    global _executor
+    with _status_lock:
+        if _status['pending']:
+            return False
+        _status['pending'] = True
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='model-training')
+    _executor.submit(_retrain_in_background, force, check, reason)
+    return True
+
+
+def training_status():
+    """Pending flag, last drift check and last retrain of this process"""
+    with _status_lock:
+        return dict(_status)
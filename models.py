@@ -60,6 +60,17 @@ class User(UserMixin, db.Model):
 
 class LoanApplication(db.Model):
     """Loan application model to store user loan requests"""
+    # Indexes backing the dashboard filters and sorts; update_schema.py creates
+    # them on databases that predate these definitions
+    __table_args__ = (
+        db.Index('ix_loan_application_user_id_status', 'user_id', 'status'),
+        db.Index('ix_loan_application_user_id_created_at', 'user_id', 'created_at'),
+        db.Index('ix_loan_application_status_created_at', 'status', 'created_at'),
+        db.Index('ix_loan_application_created_at', 'created_at'),
+        db.Index('ix_loan_application_credit_score', 'credit_score'),
+        db.Index('ix_loan_application_loan_amount', 'loan_amount'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     
@@ -98,6 +109,11 @@ class LoanApplication(db.Model):
 
 class RiskAssessment(db.Model):
     """Risk assessment model to store credit risk calculations"""
+    # One assessment per application; also serves the join from LoanApplication
+    __table_args__ = (
+        db.Index('uq_risk_assessment_loan_application_id', 'loan_application_id', unique=True),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     loan_application_id = db.Column(db.Integer, db.ForeignKey('loan_application.id'), nullable=False)
     
@@ -118,3 +134,93 @@ class RiskAssessment(db.Model):
     
     def __repr__(self):
         return f'<RiskAssessment {self.id} - {self.recommendation} - Risk Rating: {self.risk_rating}>'
+
+
+class ApplicationSummary(db.Model):
+    """
+    Pre-aggregated application counts for dashboard charts
+    
+    One row per user, creation day, summary dimension, band and status.
+    summary_tables.py keeps the counters up to date as applications are
+    written, and rebuild_summaries.py recomputes them from scratch.
+    """
+    __tablename__ = 'application_summary'
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'day', 'dimension', 'band', 'status', name='uq_application_summary_key'),
+        db.Index('ix_application_summary_dimension_day', 'dimension', 'day'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    day = db.Column(db.Date, nullable=False)
+    dimension = db.Column(db.String(40), nullable=False)  # e.g. income, risk_category
+    band = db.Column(db.String(40), nullable=False)  # Bucket label within the dimension
+    status = db.Column(db.String(50), nullable=False)
+    
+    # Counters and sums for averages
+    application_count = db.Column(db.Integer, nullable=False, default=0)
+    assessed_count = db.Column(db.Integer, nullable=False, default=0)  # Applications with a risk assessment
+    risk_rating_sum = db.Column(db.Integer, nullable=False, default=0)
+    loan_amount_sum = db.Column(db.Float, nullable=False, default=0.0)
+    credit_score_sum = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<ApplicationSummary {self.dimension}/{self.band} {self.status} x{self.application_count}>'
+
+
+class BatchJob(db.Model):
+    """Queued background job for processing an uploaded CSV file"""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    job_type = db.Column(db.String(50), nullable=False, default='csv_upload')
+    
+    # Uploaded file, kept on disk until the job finishes
+    filename = db.Column(db.String(255))
+    file_path = db.Column(db.String(512))
+    
+    # Job state: queued, running, completed, failed
+    status = db.Column(db.String(20), nullable=False, default='queued', index=True)
+    stage = db.Column(db.String(50))  # Current pipeline stage while running
+    rows_total = db.Column(db.Integer, default=0)
+    rows_processed = db.Column(db.Integer, default=0)
+    
+    # Token of the worker that claimed the job; its heartbeat keeps updated_at fresh
+    worker_id = db.Column(db.String(32))
+    
+    # JSON-encoded results page context, set when the job completes
+    result = db.Column(db.Text)
+    error = db.Column(db.Text)
+    
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    user = db.relationship('User', backref=db.backref('batch_jobs', lazy='dynamic'))
+    
+    @property
+    def percent_complete(self):
+        """Approximate completion percentage for progress bars"""
+        if self.status == 'completed':
+            return 100.0
+        if not self.rows_total:
+            return 0.0
+        return min(self.rows_processed / self.rows_total * 100, 100.0)
+    
+    def to_progress_dict(self):
+        """Serializable progress snapshot for the polling endpoint"""
+        return {
+            'id': self.id,
+            'status': self.status,
+            'stage': self.stage,
+            'rows_total': self.rows_total,
+            'rows_processed': self.rows_processed,
+            'percent_complete': round(self.percent_complete, 1),
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+    
+    def __repr__(self):
+        return f'<BatchJob {self.id} - {self.status}>'
@@ -0,0 +1,143 @@
+"""
+Keyset (cursor) pagination for application listings.
+
+OFFSET pagination makes the database walk and discard every row before the
+requested page, and Flask-SQLAlchemy's paginate() adds a COUNT(*) on top, so
+deep pages of a large table get linearly slower. Keyset pagination instead
+remembers the sort key of the last row shown, (created_at, id) or
+(loan_amount, id), and asks for the rows after it, which the indexes on
+those columns answer directly whatever the depth.
+
+Cursors are opaque URL-safe strings; the id tiebreaker keeps the order total
+so rows sharing a timestamp or amount are never skipped or repeated.
+"""
+
+import base64
+import json
+from datetime import datetime
+
+from sqlalchemy import tuple_
+
+from models import LoanApplication
+
+# Sort options of the listing pages mapped to their keyset column
+SORT_COLUMNS = {
+    'created_at': LoanApplication.created_at,
+    'loan_amount': LoanApplication.loan_amount
+}
+
+
+class InvalidCursor(ValueError):
+    """Raised when a pagination cursor cannot be decoded"""
+
+
+def encode_cursor(value, row_id):
+    """Encode a (sort value, id) position as an opaque URL-safe string"""
+    if isinstance(value, datetime):
+        value = {'dt': value.isoformat()}
+    payload = json.dumps([value, row_id], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Decode a cursor produced by encode_cursor
+
+    Raises:
+    - InvalidCursor: If the cursor is malformed
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        value, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if isinstance(value, dict):
+            value = datetime.fromisoformat(value['dt'])
+        return value, int(row_id)
+    except Exception as e:
+        raise InvalidCursor(f"Invalid pagination cursor: {str(e)}")
+
+
+class KeysetPage:
+    """One page of keyset-paginated results"""
+
+    def __init__(self, items, per_page, next_cursor=None, prev_cursor=None, approximate_total=None):
+        self.items = items
+        self.per_page = per_page
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.approximate_total = approximate_total
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+def keyset_paginate(query, sort_by='created_at', order='desc', after=None, before=None,
+                    per_page=20, approximate_total=None):
+    """
+    Fetch one page of a LoanApplication query by keyset
+
+    Parameters:
+    - query: Filtered LoanApplication query without ORDER BY
+    - sort_by: Key of SORT_COLUMNS; unknown values fall back to created_at
+    - order: 'asc' or 'desc'
+    - after: Cursor of the last row of the previous page (next page)
+    - before: Cursor of the first row of the following page (previous page)
+    - per_page: Rows per page
+    - approximate_total: Optional row count estimate to show alongside the page
+
+    Returns:
+    - page: KeysetPage
+
+    Raises:
+    - InvalidCursor: If after or before cannot be decoded
+    """
+    column = SORT_COLUMNS.get(sort_by, LoanApplication.created_at)
+    descending = order == 'desc'
+    key = tuple_(column, LoanApplication.id)
+
+    # Walking backwards means reading in the opposite order and flipping the result
+    backwards = before is not None and after is None
+    read_descending = descending != backwards
+
+    if after is not None:
+        position = decode_cursor(after)
+        query = query.filter(key < position if descending else key > position)
+    elif before is not None:
+        position = decode_cursor(before)
+        query = query.filter(key > position if descending else key < position)
+
+    if read_descending:
+        query = query.order_by(column.desc(), LoanApplication.id.desc())
+    else:
+        query = query.order_by(column.asc(), LoanApplication.id.asc())
+
+    # One extra row tells us whether there is more in the reading direction
+    rows = query.limit(per_page + 1).all()
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backwards:
+        rows.reverse()
+
+    def cursor_for(row):
+        return encode_cursor(getattr(row, column.key), row.id)
+
+    next_cursor = prev_cursor = None
+    if rows:
+        if backwards:
+            next_cursor = cursor_for(rows[-1])
+            prev_cursor = cursor_for(rows[0]) if has_more else None
+        else:
+            next_cursor = cursor_for(rows[-1]) if has_more else None
+            prev_cursor = cursor_for(rows[0]) if after is not None else None
+
+    return KeysetPage(rows, per_page, next_cursor, prev_cursor, approximate_total)
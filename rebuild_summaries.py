@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+Rebuild the pre-aggregated dashboard summary tables.
+
+The counters in application_summary are maintained incrementally as
+applications are written; run this after upgrading a database that predates
+the table, or after changing application rows outside the web app.
+
+Usage:
+    python rebuild_summaries.py [--chunk-size 10000]
+"""
+import argparse
+import logging
+import time
+
+from app import app
+from summary_tables import rebuild_summaries, REBUILD_CHUNK_SIZE
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def main():
+    """Recompute application_summary from the loan_application table"""
+    parser = argparse.ArgumentParser(description='Rebuild the dashboard summary tables')
+    parser.add_argument('--chunk-size', type=int, default=REBUILD_CHUNK_SIZE, help='Applications read per round trip')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    with app.app_context():
+        count = rebuild_summaries(chunk_size=args.chunk_size)
+    logger.info(f"Summarized {count} applications in {time.perf_counter() - start:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
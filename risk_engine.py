@@ -1,160 +1,428 @@
+import hashlib
+import os
+import struct
 import numpy as np
 import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from multiprocessing import get_context
+
+from scoring_tables import get_scoring_table
+
+# Outcomes of get_recommendation's decision tree, in branch order:
+# (recommendation, leading reasons, first optional reason, second optional reason, trailing reasons)
+_RECOMMENDATION_BRANCHES = [
+    ("Approve", ["Excellent risk profile"], None, None, []),
+    ("Approve", ["Good risk profile"], None, None, []),
+    ("Approve", ["Acceptable risk profile with good factors"],
+     "Consider slightly lower loan amount for better terms", None, []),
+    ("Approve", ["Conditionally approved with acceptable risk factors",
+                 "Recommend lower loan amount or shorter term"], None, None, []),
+    ("Review", [], "Moderate probability of default", "Elevated debt-to-income ratio",
+     ["Risk factors require additional review"]),
+    ("Review", ["High risk profile requiring detailed manual assessment",
+                "Potential for approval with significant conditions"], None, None, []),
+    ("Reject", [], "High probability of default", "Excessive debt-to-income ratio",
+     ["Overall risk rating exceeds acceptable threshold"]),
+    ("Review", ["Borderline risk profile",
+                "May qualify with additional conditions or guarantees",
+                "High risk factors requiring detailed evaluation"],
+     "Elevated probability of default", "High debt-to-income ratio", []),
+    ("Reject", ["Multiple risk factors above acceptable thresholds"],
+     "Elevated probability of default", "High debt-to-income ratio", []),
+]
+
+# Columns every uploaded application CSV must provide
+CSV_REQUIRED_COLUMNS = [
+    'loan_amount', 'loan_term', 'loan_purpose', 'credit_score', 'annual_income',
+    'monthly_expenses', 'existing_debt', 'employment_status'
+]
+
+CSV_NUMERIC_COLUMNS = [
+    'loan_amount', 'loan_term', 'credit_score',
+    'annual_income', 'monthly_expenses', 'existing_debt'
+]
+
+# Columns the risk metrics divide by; zero or negative values cannot be scored
+CSV_POSITIVE_COLUMNS = ['loan_amount', 'loan_term', 'annual_income']
+
+# Text columns parsed as categoricals by CreditRiskEngine.read_csv
+CSV_CATEGORICAL_DTYPES = {
+    'loan_purpose': 'category',
+    'employment_status': 'category'
+}
+
+VALID_EMPLOYMENT_STATUSES = ['full_time', 'part_time', 'self_employed', 'unemployed', 'retired']
+
+# Rows per chunk for CreditRiskEngine.stream_csv_data
+DEFAULT_CHUNK_SIZE = 50000
+
+# Default number of processes used by CreditRiskEngine.score_batch_parallel
+SCORING_WORKERS = int(os.environ.get('SCORING_WORKERS', 1))
+
+# Frames smaller than this are scored in-process; pool startup would dominate
+PARALLEL_MIN_ROWS = 20000
+
+# Columns shipped to worker processes for scoring
+SCORING_COLUMNS = [
+    'loan_amount', 'loan_term', 'credit_score', 'annual_income',
+    'monthly_expenses', 'existing_debt', 'employment_status'
+]
+
+
+# How the engine's noise draws are made when the caller supplies none:
+# - hashed (default): derived from a hash of the application's inputs, so an
+#   application gets the same draws whether scored alone, in a batch or on
+#   another worker
+# - none: no noise; PD is left unscaled and decisions use NO_NOISE_FACTOR
+RNG_STRATEGY = os.environ.get('RISK_ENGINE_RNG', 'hashed')
+
+RNG_STRATEGIES = ['hashed', 'none']
+
+# Salt mixed into the input hash; changing it re-rolls every application's draws
+RNG_SEED = int(os.environ.get('RISK_ENGINE_SEED', 0))
+
+# Draws used by the 'none' strategy: PD unchanged and the median decision draw
+NO_NOISE_VARIATION = 1.0
+NO_NOISE_FACTOR = 0.5
+
+# Range of the PD noise multiplier
+VARIATION_LOW, VARIATION_HIGH = 0.92, 1.08
+
+# Version of the scoring code; bump whenever a code change alters any
+# assessment so cached assessments (see assessment_keys) are not reused.
+# Curve changes are versioned by the scoring table itself.
+ENGINE_VERSION = '2'
+
+# Numeric inputs hashed by application_noise, in hashing order
+NOISE_INPUT_COLUMNS = [
+    'loan_amount', 'loan_term', 'credit_score', 'annual_income',
+    'monthly_expenses', 'existing_debt'
+]
+
+# SplitMix64 constants
+_MASK64 = 0xFFFFFFFFFFFFFFFF
+_GOLDEN_GAMMA = 0x9E3779B97F4A7C15
+_MIX_MULTIPLIERS = (0xBF58476D1CE4E5B9, 0x94D049BB133111EB)
+
+# Employment status codes used when hashing inputs; unknown statuses hash as -1
+_STATUS_CODES = {status: code for code, status in enumerate(VALID_EMPLOYMENT_STATUSES)}
+
+# Byte layout hashed into an assessment key: six float64 inputs and the status code
+_KEY_RECORD = struct.Struct('<6dq')
+_KEY_RECORD_DTYPE = np.dtype([(column, '<f8') for column in NOISE_INPUT_COLUMNS] + [('employment_status', '<i8')])
+
+# Inputs of up to this many rows are hashed in plain Python, where NumPy's
+# per-call overhead would dominate (single web-form assessments)
+_SMALL_HASH_ROWS = 16
+
+
+def _splitmix64(x):
+    """SplitMix64 finalizer over a uint64 array (wrapping arithmetic)"""
+    with np.errstate(over='ignore'):
+        x = x + np.uint64(_GOLDEN_GAMMA)
+        x = (x ^ (x >> np.uint64(30))) * np.uint64(_MIX_MULTIPLIERS[0])
+        x = (x ^ (x >> np.uint64(27))) * np.uint64(_MIX_MULTIPLIERS[1])
+        return x ^ (x >> np.uint64(31))
+
+
+def _splitmix64_int(x):
+    """SplitMix64 finalizer over one Python int; matches _splitmix64 bit for bit"""
+    x = (x + _GOLDEN_GAMMA) & _MASK64
+    x = ((x ^ (x >> 30)) * _MIX_MULTIPLIERS[0]) & _MASK64
+    x = ((x ^ (x >> 27)) * _MIX_MULTIPLIERS[1]) & _MASK64
+    return x ^ (x >> 31)
+
+
+def _unit_interval(h):
+    """Map uint64 hashes to floats in [0, 1) using their top 53 bits"""
+    return (h >> np.uint64(11)).astype(float) * (1.0 / (1 << 53))
+
+
+def _unit_interval_int(h):
+    """_unit_interval for one Python int"""
+    return (h >> 11) * (1.0 / (1 << 53))
+
+
+def _input_hash(columns, employment_status, seed):
+    """
+    Hash each application's scoring inputs into a uint64
+    
+    Numeric inputs are hashed by their float64 value, so 700 and 700.0 hash
+    alike, and the employment status by its position in
+    VALID_EMPLOYMENT_STATUSES.
+    
+    Parameters:
+    - columns: The six numeric input columns, in NOISE_INPUT_COLUMNS order
+    - employment_status: Array-like of employment status strings
+    - seed: Integer salt
+    
+    Returns:
+    - hashes: uint64 array
+    """
+    status_codes = pd.Categorical(
+        np.asarray(employment_status, dtype=object), categories=VALID_EMPLOYMENT_STATUSES
+    ).codes
+    
+    h = np.full(len(status_codes), np.uint64(seed & _MASK64), dtype=np.uint64)
+    for column in columns:
+        # + 0.0 folds -0.0 into 0.0 before taking the bit pattern
+        bits = (np.asarray(column, dtype=np.float64) + 0.0).view(np.uint64)
+        h = _splitmix64(h ^ bits)
+    return _splitmix64(h ^ status_codes.astype(np.int64).view(np.uint64))
+
+
+def _row_hashes(columns, employment_status, seed):
+    """Plain-Python _input_hash for a few rows; returns a list of ints"""
+    hashes = []
+    for *values, status in zip(*columns, employment_status):
+        h = seed & _MASK64
+        for value in values:
+            h = _splitmix64_int(h ^ struct.unpack('<Q', struct.pack('<d', float(value) + 0.0))[0])
+        hashes.append(_splitmix64_int(h ^ (_STATUS_CODES.get(status, -1) & _MASK64)))
+    return hashes
+
+
+def application_noise(loan_amount, loan_term, credit_score, annual_income,
+                      monthly_expenses, existing_debt, employment_status, seed=None):
+    """
+    Derive each application's noise draws from a hash of its inputs
+    
+    The result depends only on the row itself and the seed, never on the
+    other rows of the batch.
+    
+    Parameters:
+    - loan_amount, loan_term, credit_score, annual_income, monthly_expenses,
+      existing_debt: Array-likes of equal length
+    - employment_status: Array-like of employment status strings
+    - seed: Salt for the hash; defaults to RNG_SEED
+    
+    Returns:
+    - random_variation: Array of PD noise multipliers in [0.92, 1.08)
+    - random_factor: Array of decision draws in [0, 1)
+    """
+    columns = (loan_amount, loan_term, credit_score, annual_income, monthly_expenses, existing_debt)
+    if seed is None:
+        seed = RNG_SEED
+    
+    if len(employment_status) <= _SMALL_HASH_ROWS:
+        hashes = _row_hashes(columns, employment_status, seed)
+        variation_draw = np.array([_unit_interval_int(_splitmix64_int(h ^ 1)) for h in hashes])
+        random_factor = np.array([_unit_interval_int(_splitmix64_int(h ^ 2)) for h in hashes])
+    else:
+        hashes = _input_hash(columns, employment_status, seed)
+        variation_draw = _unit_interval(_splitmix64(hashes ^ np.uint64(1)))
+        random_factor = _unit_interval(_splitmix64(hashes ^ np.uint64(2)))
+    
+    random_variation = VARIATION_LOW + (VARIATION_HIGH - VARIATION_LOW) * variation_draw
+    return random_variation, random_factor
+
+
+def assessment_keys(loan_amount, loan_term, credit_score, annual_income,
+                    monthly_expenses, existing_debt, employment_status, strategy=None, table=None):
+    """
+    Canonical cache keys for the assessments of a set of applications
+    
+    Two applications get the same key exactly when the engine gives them the
+    same assessment: the key is a 128-bit BLAKE2b digest of the seven scoring
+    inputs (numbers as float64, the employment status by its code), prefixed
+    with ENGINE_VERSION, the scoring table version and the noise strategy
+    and seed.
+    
+    Parameters:
+    - loan_amount, loan_term, credit_score, annual_income, monthly_expenses,
+      existing_debt: Array-likes of equal length
+    - employment_status: Array-like of employment status strings
+    - strategy: Noise strategy the assessments use; defaults to RNG_STRATEGY
+    - table: ScoringTable the assessments use; defaults to the active one
+    
+    Returns:
+    - keys: List of key strings, one per application
+    """
+    columns = (loan_amount, loan_term, credit_score, annual_income, monthly_expenses, existing_debt)
+    table_version = (table or get_scoring_table()).version
+    prefix = f"{ENGINE_VERSION}:{table_version}:{strategy or RNG_STRATEGY}:{RNG_SEED}:"
+    
+    if len(employment_status) <= _SMALL_HASH_ROWS:
+        records = [
+            _KEY_RECORD.pack(*(float(value) + 0.0 for value in values), _STATUS_CODES.get(status, -1))
+            for *values, status in zip(*columns, employment_status)
+        ]
+    else:
+        packed = np.empty(len(employment_status), dtype=_KEY_RECORD_DTYPE)
+        for name, column in zip(NOISE_INPUT_COLUMNS, columns):
+            packed[name] = np.asarray(column, dtype=np.float64) + 0.0
+        packed['employment_status'] = pd.Categorical(
+            np.asarray(employment_status, dtype=object), categories=VALID_EMPLOYMENT_STATUSES
+        ).codes
+        records = packed.view(f'V{_KEY_RECORD.size}').tolist()
+    
+    return [prefix + hashlib.blake2b(record, digest_size=16).hexdigest() for record in records]
+
+
+class ScoringProgress:
+    """
+    Progress counters for a streaming scoring run.
+    
+    Counters are updated after every chunk; an optional callback receives the
+    progress object each time so callers can report or persist it.
+    """
+    
+    def __init__(self, callback=None):
+        self.callback = callback
+        self.total_bytes = 0
+        self.bytes_read = 0
+        self.chunks = 0
+        self.rows_read = 0
+        self.rows_scored = 0
+        self.rows_failed = 0
+        self.recommendation_counts = {'Approve': 0, 'Review': 0, 'Reject': 0}
+        self.finished = False
+    
+    @property
+    def percent_complete(self):
+        """Approximate completion based on bytes consumed from the input file"""
+        if self.finished:
+            return 100.0
+        if not self.total_bytes:
+            return 0.0
+        return min(self.bytes_read / self.total_bytes * 100, 100.0)
+    
+    def record_chunk(self, recommendations, failed=0):
+        """Add one scored chunk's recommendations and write failures to the counters"""
+        self.chunks += 1
+        self.rows_scored += len(recommendations)
+        self.rows_failed += failed
+        for recommendation, count in pd.Series(recommendations).value_counts().items():
+            self.recommendation_counts[recommendation] = self.recommendation_counts.get(recommendation, 0) + int(count)
+    
+    def notify(self):
+        """Invoke the progress callback, if any"""
+        if self.callback is not None:
+            self.callback(self)
+    
+    def to_dict(self):
+        """Serializable snapshot of the counters"""
+        return {
+            'chunks': self.chunks,
+            'rows_read': self.rows_read,
+            'rows_scored': self.rows_scored,
+            'rows_failed': self.rows_failed,
+            'recommendation_counts': dict(self.recommendation_counts),
+            'percent_complete': round(self.percent_complete, 1),
+            'finished': self.finished
+        }
+
+
+class ScoredCSVWriter:
+    """
+    Chunk handler for stream_csv_data that appends scored rows to an output CSV.
+    
+    The header is written with the first chunk; later chunks are appended.
+    """
+    
+    def __init__(self, output_path):
+        self.output_path = output_path
+        self._header_written = False
+    
+    def __call__(self, chunk, scores):
+        output = chunk.copy()
+        for column in ['probability_of_default', 'loss_given_default', 'exposure_at_default',
+                       'expected_loss', 'risk_rating', 'recommendation']:
+            output[column] = scores[column].to_numpy()
+        output['reasons'] = [', '.join(reasons) for reasons in scores['reasons']]
+        
+        output.to_csv(
+            self.output_path,
+            mode='a' if self._header_written else 'w',
+            header=not self._header_written,
+            index=False
+        )
+        self._header_written = True
+        return 0
+
 
 class CreditRiskEngine:
     """Engine for credit risk modeling and loan decision making"""
     
     @staticmethod
-    def calculate_probability_of_default(credit_score, income, expenses, debt, loan_amount, loan_term):
+    def calculate_probability_of_default(credit_score, income, expenses, debt, loan_amount, loan_term,
+                                         random_variation=None, table=None):
         """
         Calculate Probability of Default (PD)
         
         PD is the likelihood that a borrower will default on a loan.
         Formula is a simplified model based on credit score, income-to-debt ratio,
-        and loan amount relative to income.
+        and loan amount relative to income. The curves and weights come from
+        the scoring table (see scoring_tables).
+        
+        Parameters:
+        - random_variation: Optional noise multiplier in [0.92, 1.08); no noise when omitted
+        - table: ScoringTable to use; defaults to the active one
         
         Returns a value between 0 and 1
         
         Note: Model adjusted to provide more realistic spread of approvals and rejections
         """
+        if table is None:
+            table = get_scoring_table()
+        
         # Base PD derived from credit score (higher score = lower PD)
-        # Credit scores typically range from 300-850
-        # More responsive to credit score changes - steeper curve with increased rejection rate
-        if credit_score >= 740:  # Excellent
-            # Excellent credit scores get significantly lower base PD
-            base_pd = 0.08 * (1 - ((credit_score - 740) / 110))
-        elif credit_score >= 670:  # Good
-            # Good credit scores get moderate base PD
-            base_pd = 0.15 * (1 - ((credit_score - 670) / 70)) + 0.05
-        elif credit_score >= 580:  # Fair
-            # Fair credit scores get higher base PD
-            base_pd = 0.3 * (1 - ((credit_score - 580) / 90)) + 0.15
-        else:  # Poor
-            # Poor credit scores have much higher PD - increased rejection likelihood
-            base_pd = 0.5 * (1 - ((credit_score - 300) / 280)) + 0.3
+        base_pd = table.pd_base.scalar(credit_score)
         
         # Debt-to-income ratio (higher ratio = higher risk)
         monthly_income = income / 12
         monthly_debt = debt / 12
         debt_to_income = (monthly_debt + expenses) / monthly_income
-        
-        # More realistic DTI curve with stricter thresholds for higher rejection rate
-        if debt_to_income <= 0.28:  # Conservative DTI threshold used by many lenders
-            # Low DTI is very good
-            dti_factor = debt_to_income * 0.6
-        elif debt_to_income <= 0.36:  # Standard benchmark for many lenders
-            # Moderate DTI is acceptable
-            dti_factor = 0.17 + ((debt_to_income - 0.28) * 1.25)
-        elif debt_to_income <= 0.43:  # Max for many qualified mortgages
-            # Higher DTI is riskier
-            dti_factor = 0.27 + ((debt_to_income - 0.36) * 1.5)
-        else:
-            # Very high DTI has significant penalties
-            dti_factor = 0.37 + ((debt_to_income - 0.43) * 1.8)
-        
-        # Cap at a reasonable maximum but higher than before
-        dti_factor = min(dti_factor, 0.7)
+        dti_factor = table.pd_debt_to_income.scalar(debt_to_income)
         
         # Loan amount to income ratio (higher ratio = higher risk)
         loan_to_income = loan_amount / income
+        lti_factor = table.pd_loan_to_income.scalar(loan_to_income)
         
-        # More aggressive loan-to-income assessment
-        if loan_to_income <= 0.5:
-            # Small loans relative to income are low risk
-            lti_factor = loan_to_income * 0.4
-        elif loan_to_income <= 1.0:
-            # Moderate loans are reasonable
-            lti_factor = 0.2 + ((loan_to_income - 0.5) * 0.6)
-        elif loan_to_income <= 2.0:
-            # Larger loans have higher risk
-            lti_factor = 0.5 + ((loan_to_income - 1.0) * 0.4)
-        else:
-            # Very large loans have significant risk
-            lti_factor = 0.9 + ((loan_to_income - 2.0) * 0.2)
-        
-        # Cap at a higher maximum to allow more rejections
-        lti_factor = min(lti_factor, 0.7)
-        
-        # Weight factors and calculate final PD - adjusted to make credit score more influential
-        weighted_pd = (base_pd * 0.55) + (dti_factor * 0.25) + (lti_factor * 0.2)
+        # Weight factors and calculate final PD
+        base_weight, dti_weight, lti_weight = table.pd_weights
+        weighted_pd = (base_pd * base_weight) + (dti_factor * dti_weight) + (lti_factor * lti_weight)
         
         # Apply loan term adjustment (longer loans = higher risk)
-        # More aggressive term penalty
-        if loan_term <= 12:  # Very short term
-            term_factor = loan_term / 48
-        elif loan_term <= 24:  # Short term
-            term_factor = 0.25 + ((loan_term - 12) / 60)
-        else:  # Longer terms
-            term_factor = 0.45 + ((loan_term - 24) / 72)
-        
-        term_factor = min(term_factor, 0.85)  # Higher cap for term factor
-        
-        final_pd = weighted_pd * (1 + (term_factor * 0.2))
+        term_factor = table.pd_loan_term.scalar(loan_term)
+        final_pd = weighted_pd * (1 + (term_factor * table.pd_term_weight))
         
         # Add small random variation to create more natural spread
         # This simulates unmeasured factors that affect default probability
-        random_variation = np.random.uniform(0.92, 1.08)
+        if random_variation is None:
+            random_variation = NO_NOISE_VARIATION
         final_pd = final_pd * random_variation
         
         # Ensure PD is between 0 and 1
-        return min(max(final_pd, 0.01), 0.99)
+        return min(max(final_pd, table.pd_min), table.pd_max)
     
     @staticmethod
-    def calculate_loss_given_default(loan_amount, credit_score, employment_status):
+    def calculate_loss_given_default(loan_amount, credit_score, employment_status, table=None):
         """
         Calculate Loss Given Default (LGD)
         
         LGD is the amount of money a bank or lender loses when a borrower defaults,
         after taking into account recovery costs.
         
+        Parameters:
+        - table: ScoringTable to use; defaults to the active one
+        
         Returns a value between 0 and 1
         """
-        # More responsive base LGD based on credit score tiers
-        if credit_score >= 750:
-            # Excellent credit indicates strong recovery potential
-            base_lgd = 0.3
-        elif credit_score >= 650:
-            # Good credit indicates reasonable recovery potential
-            base_lgd = 0.4
-        elif credit_score >= 550:
-            # Fair credit indicates moderate recovery challenges
-            base_lgd = 0.5
-        else:
-            # Poor credit indicates significant recovery challenges
-            base_lgd = 0.6
-        
-        # Adjust based on loan amount with tiered approach
-        if loan_amount <= 25000:
-            # Small loans - higher proportional recovery costs
-            amount_factor = 0.1
-        elif loan_amount <= 50000:
-            # Medium loans - moderate recovery efficiency
-            amount_factor = 0.08
-        elif loan_amount <= 75000:
-            # Larger loans - better recovery efficiency
-            amount_factor = 0.05
-        else:
-            # Very large loans - best recovery efforts
-            amount_factor = 0.03
-        
-        # Employment status impact (employed borrowers have better recovery prospects)
-        if employment_status == 'full_time':
-            employment_multiplier = 0.8  # Strong income stability
-        elif employment_status == 'self_employed':
-            employment_multiplier = 0.85  # Good but variable income
-        elif employment_status == 'part_time':
-            employment_multiplier = 0.9  # Moderate income stability
-        elif employment_status == 'retired':
-            employment_multiplier = 0.95  # Fixed income but limited growth
-        else:  # Unemployed
-            employment_multiplier = 1.0  # Higher recovery challenge
-        
-        # Calculate final LGD with more responsive formula
+        if table is None:
+            table = get_scoring_table()
+        
+        # Base LGD by credit score tier plus a recovery cost add-on by loan size,
+        # scaled by employment status (employed borrowers have better recovery prospects)
+        base_lgd = table.lgd_base.scalar(credit_score)
+        amount_factor = table.lgd_loan_amount.scalar(loan_amount)
+        employment_multiplier = table.lgd_employment.scalar(employment_status)
+        
         lgd = (base_lgd + amount_factor) * employment_multiplier
         
         # Ensure LGD is between 0 and 1
-        return min(max(lgd, 0), 1)
+        return min(max(lgd, table.lgd_min), table.lgd_max)
     
     @staticmethod
     def calculate_exposure_at_default(loan_amount, loan_term):
@@ -190,55 +458,41 @@ class CreditRiskEngine:
         return pd * lgd * ead
     
     @staticmethod
-    def calculate_risk_rating(pd, lgd, expected_loss, loan_amount):
+    def calculate_risk_rating(pd, lgd, expected_loss, loan_amount, table=None):
         """
         Calculate a risk rating on a scale of 1-10
         
         1 = lowest risk, 10 = highest risk
+        
+        Parameters:
+        - table: ScoringTable to use; defaults to the active one
         """
-        # More balanced PD component (less aggressive scaling for moderate PDs)
-        if pd < 0.2:
-            pd_component = pd * 7  # Low PD is rewarded significantly
-        elif pd < 0.4:
-            pd_component = 1.4 + ((pd - 0.2) * 9)  # Moderate PD scales moderately
-        else:
-            pd_component = 3.2 + ((pd - 0.4) * 13)  # High PD is penalized
-            
-        # More balanced LGD component (more granular scaling)
-        if lgd < 0.3:
-            lgd_component = lgd * 3  # Low LGD is favorable
-        elif lgd < 0.5:
-            lgd_component = 0.9 + ((lgd - 0.3) * 4)  # Moderate LGD
-        else:
-            lgd_component = 1.7 + ((lgd - 0.5) * 5)  # Higher LGD
+        if table is None:
+            table = get_scoring_table()
         
-        # Expected loss as percentage of loan amount with tiered evaluation
-        el_percentage = min(expected_loss / loan_amount, 1)
+        pd_component = table.rating_pd.scalar(pd)
+        lgd_component = table.rating_lgd.scalar(lgd)
         
-        if el_percentage < 0.05:
-            # Very low expected loss (< 5% of loan)
-            el_component = el_percentage * 40  # Scales to max of 2
-        elif el_percentage < 0.15:
-            # Low expected loss (5-15% of loan)
-            el_component = 2 + ((el_percentage - 0.05) * 50)  # Scales from 2 to 7
-        else:
-            # High expected loss (> 15% of loan)
-            el_component = 7 + ((el_percentage - 0.15) * 20)  # Scales from 7 to 10
+        # Expected loss as percentage of loan amount
+        el_percentage = min(expected_loss / loan_amount, table.rating_el_cap)
+        el_component = table.rating_el.scalar(el_percentage)
         
-        # Weighted average with adjusted weights - PD has slightly less influence
-        risk_rating = (pd_component * 0.4) + (lgd_component * 0.3) + (el_component * 0.3)
+        pd_weight, lgd_weight, el_weight = table.rating_weights
+        risk_rating = (pd_component * pd_weight) + (lgd_component * lgd_weight) + (el_component * el_weight)
         
         # Convert to 1-10 scale and round to nearest integer
-        # Slightly compress the rating to make approvals more likely
-        scaled_rating = max(min(round(risk_rating), 10), 1)
+        scaled_rating = max(min(round(risk_rating), table.rating_max), table.rating_min)
         
         return scaled_rating
     
     @staticmethod
-    def get_recommendation(risk_rating, pd, debt_to_income_ratio):
+    def get_recommendation(risk_rating, pd, debt_to_income_ratio, random_factor=None):
         """
         Provide loan recommendation based on risk metrics
         
+        Parameters:
+        - random_factor: Optional decision draw in [0, 1); NO_NOISE_FACTOR when omitted
+        
         Returns:
         - recommendation: "Approve", "Review", or "Reject"
         - reasons: List of reasons for the recommendation
@@ -249,7 +503,8 @@ class CreditRiskEngine:
         
         # Add random factor to create more realistic distribution
         # This represents unmeasured or subjective factors in the decision process
-        random_factor = np.random.uniform(0, 1)
+        if random_factor is None:
+            random_factor = NO_NOISE_FACTOR
         
         # Use tighter thresholds for more realistic approval/rejection rates
         if risk_rating <= 3:  # Conservative approval threshold
@@ -328,16 +583,27 @@ class CreditRiskEngine:
         return recommendation, reasons
     
     @classmethod
-    def assess_loan_application(cls, application_data):
+    def assess_loan_application(cls, application_data, random_variation=None, random_factor=None,
+                                rng=None, strategy=None, table=None):
         """
         Assess a loan application and return a complete risk assessment
         
+        Identical application data always gives an identical assessment unless
+        a Generator is passed as rng.
+        
         Parameters:
         - application_data: Dict containing loan application data
+        - random_variation: Optional fixed PD noise multiplier (see calculate_probability_of_default)
+        - random_factor: Optional fixed decision draw (see get_recommendation)
+        - rng, strategy: How omitted draws are made (see draw_noise)
+        - table: ScoringTable to use; defaults to the active one
         
         Returns:
         - assessment: Dict containing all risk metrics and recommendation
         """
+        if table is None:
+            table = get_scoring_table()
+        
         # Extract application data
         loan_amount = application_data['loan_amount']
         loan_term = application_data['loan_term']
@@ -353,24 +619,38 @@ class CreditRiskEngine:
         # Calculate debt-to-income ratio
         debt_to_income_ratio = (existing_debt / 12 + monthly_expenses) / monthly_income
         
+        # Draw the noise for this application
+        if random_variation is None or random_factor is None:
+            variations, factors = cls.draw_noise(
+                [loan_amount], [loan_term], [credit_score], [annual_income],
+                [monthly_expenses], [existing_debt], [employment_status],
+                rng=rng, strategy=strategy
+            )
+            if random_variation is None:
+                random_variation = float(variations[0])
+            if random_factor is None:
+                random_factor = float(factors[0])
+        
         # Calculate risk metrics
         pd = cls.calculate_probability_of_default(
             credit_score, annual_income, monthly_expenses, 
-            existing_debt, loan_amount, loan_term
+            existing_debt, loan_amount, loan_term,
+            random_variation=random_variation, table=table
         )
         
         lgd = cls.calculate_loss_given_default(
-            loan_amount, credit_score, employment_status
+            loan_amount, credit_score, employment_status, table=table
         )
         
         ead = cls.calculate_exposure_at_default(loan_amount, loan_term)
         
         expected_loss = cls.calculate_expected_loss(pd, lgd, ead)
         
-        risk_rating = cls.calculate_risk_rating(pd, lgd, expected_loss, loan_amount)
+        risk_rating = cls.calculate_risk_rating(pd, lgd, expected_loss, loan_amount, table=table)
         
         recommendation, reasons = cls.get_recommendation(
-            risk_rating, pd, debt_to_income_ratio
+            risk_rating, pd, debt_to_income_ratio,
+            random_factor=random_factor
         )
         
         # Prepare assessment result
@@ -388,106 +668,579 @@ class CreditRiskEngine:
         return assessment
     
     @staticmethod
-    def validate_csv_format(file_path):
+    def _probability_of_default_batch(credit_score, income, expenses, debt, loan_amount, loan_term,
+                                      random_variation, table):
         """
-        Validate if the uploaded CSV file has the required format
+        Vectorized counterpart of calculate_probability_of_default.
+        
+        Evaluates the same compiled curves with the same operation order, so
+        results match the scalar path bit-for-bit for identical noise draws.
+        """
+        base_pd = table.pd_base(credit_score)
+        
+        monthly_income = income / 12
+        monthly_debt = debt / 12
+        debt_to_income = (monthly_debt + expenses) / monthly_income
+        dti_factor = table.pd_debt_to_income(debt_to_income)
+        
+        loan_to_income = loan_amount / income
+        lti_factor = table.pd_loan_to_income(loan_to_income)
+        
+        base_weight, dti_weight, lti_weight = table.pd_weights
+        weighted_pd = (base_pd * base_weight) + (dti_factor * dti_weight) + (lti_factor * lti_weight)
+        
+        term_factor = table.pd_loan_term(loan_term)
+        final_pd = weighted_pd * (1 + (term_factor * table.pd_term_weight))
+        final_pd = final_pd * random_variation
+        
+        return np.minimum(np.maximum(final_pd, table.pd_min), table.pd_max)
+    
+    @staticmethod
+    def _loss_given_default_batch(loan_amount, credit_score, employment_status, table):
+        """Vectorized counterpart of calculate_loss_given_default."""
+        base_lgd = table.lgd_base(credit_score)
+        amount_factor = table.lgd_loan_amount(loan_amount)
+        employment_multiplier = table.lgd_employment(employment_status)
+        
+        lgd = (base_lgd + amount_factor) * employment_multiplier
+        
+        return np.minimum(np.maximum(lgd, table.lgd_min), table.lgd_max)
+    
+    @staticmethod
+    def _risk_rating_batch(pd, lgd, expected_loss, loan_amount, table):
+        """Vectorized counterpart of calculate_risk_rating."""
+        pd_component = table.rating_pd(pd)
+        lgd_component = table.rating_lgd(lgd)
+        
+        el_percentage = np.minimum(expected_loss / loan_amount, table.rating_el_cap)
+        el_component = table.rating_el(el_percentage)
+        
+        pd_weight, lgd_weight, el_weight = table.rating_weights
+        risk_rating = (pd_component * pd_weight) + (lgd_component * lgd_weight) + (el_component * el_weight)
+        
+        # np.round rounds half to even, matching Python's built-in round()
+        return np.maximum(np.minimum(np.round(risk_rating), table.rating_max), table.rating_min).astype(int)
+    
+    @staticmethod
+    def _recommendation_batch(risk_rating, pd, debt_to_income_ratio, random_factor):
+        """
+        Vectorized counterpart of get_recommendation.
+        
+        Every row falls into exactly one branch of the scalar decision tree.
+        A branch fixes the recommendation and the reason list up to two
+        optional reasons, so the reasons are looked up per (branch, flags)
+        combination instead of being rebuilt row by row.
+        
+        Returns:
+        - recommendations: Object array of "Approve", "Review" or "Reject"
+        - reasons: List of reason lists, one per row
+        """
+        rating_low = risk_rating <= 3
+        rating_mid = (risk_rating > 3) & (risk_rating <= 6)
+        rating_high = risk_rating >= 8
+        rating_seven = risk_rating == 7
+        
+        branch = np.select(
+            [
+                rating_low & (risk_rating <= 2),
+                rating_low,
+                rating_mid & (risk_rating <= 4) & (pd < 0.22) & (debt_to_income_ratio < 0.4),
+                rating_mid & (risk_rating <= 5) & (pd < 0.18) & (debt_to_income_ratio < 0.35) & (random_factor > 0.3),
+                rating_mid,
+                rating_high & (risk_rating == 8) & (pd < 0.3) & (debt_to_income_ratio < 0.45) & (random_factor > 0.7),
+                rating_high,
+                rating_seven & (pd < 0.32) & (debt_to_income_ratio < 0.48) & (random_factor > 0.4),
+                rating_seven
+            ],
+            list(range(9)),
+            default=-1
+        )
+        
+        # Branch-specific thresholds for the two optional reasons
+        first_flag = np.select(
+            [branch == 2, branch == 4, branch == 6, branch == 7, branch == 8],
+            [pd > 0.15, pd > 0.2, pd > 0.35, pd > 0.35, pd > 0.3],
+            default=False
+        )
+        second_flag = np.select(
+            [branch == 4, branch == 6, branch == 7, branch == 8],
+            [
+                debt_to_income_ratio > 0.4,
+                debt_to_income_ratio > 0.5,
+                debt_to_income_ratio > 0.5,
+                debt_to_income_ratio > 0.45
+            ],
+            default=False
+        )
+        
+        key = branch * 4 + first_flag * 2 + second_flag
+        unique_keys, inverse = np.unique(key, return_inverse=True)
+        
+        recommendation_lookup = np.empty(len(unique_keys), dtype=object)
+        reasons_lookup = np.empty(len(unique_keys), dtype=object)
+        for i, k in enumerate(unique_keys):
+            recommendation, leading, first, second, trailing = _RECOMMENDATION_BRANCHES[k // 4]
+            reasons = list(leading)
+            if k & 2:
+                reasons.append(first)
+            if k & 1:
+                reasons.append(second)
+            reasons.extend(trailing)
+            recommendation_lookup[i] = recommendation
+            reasons_lookup[i] = reasons
+        
+        recommendations = recommendation_lookup[inverse]
+        # Give each row its own list so callers can mutate them safely
+        reasons = [list(reasons_lookup[i]) for i in inverse]
+        
+        return recommendations, reasons
+    
+    @staticmethod
+    def draw_noise(loan_amount, loan_term, credit_score, annual_income,
+                   monthly_expenses, existing_debt, employment_status, rng=None, strategy=None):
+        """
+        Draw the PD noise multipliers and decision draws for a set of applications
         
         Parameters:
-        - file_path: Path to the CSV file
+        - loan_amount, loan_term, credit_score, annual_income, monthly_expenses,
+          existing_debt, employment_status: Array-likes of equal length
+        - rng: Optional numpy Generator to draw from, e.g. np.random.default_rng(seed)
+          for a reproducible rerun with fresh noise; takes precedence over strategy
+        - strategy: One of RNG_STRATEGIES; defaults to RNG_STRATEGY
         
         Returns:
-        - is_valid: Boolean indicating if the file is valid
-        - error_message: Error message if the file is invalid, None otherwise
+        - random_variation: Array of PD noise multipliers
+        - random_factor: Array of decision draws
+        """
+        n = len(loan_amount)
+        
+        if rng is not None:
+            return rng.uniform(VARIATION_LOW, VARIATION_HIGH, n), rng.uniform(0, 1, n)
+        
+        strategy = strategy or RNG_STRATEGY
+        if strategy == 'hashed':
+            return application_noise(
+                loan_amount, loan_term, credit_score, annual_income,
+                monthly_expenses, existing_debt, employment_status
+            )
+        if strategy == 'none':
+            return np.full(n, NO_NOISE_VARIATION), np.full(n, NO_NOISE_FACTOR)
+        
+        raise ValueError(f"Unknown RNG strategy '{strategy}'; expected one of {', '.join(RNG_STRATEGIES)}")
+    
+    @classmethod
+    def score_arrays(cls, loan_amount, loan_term, credit_score, annual_income,
+                     monthly_expenses, existing_debt, employment_status,
+                     random_variation=None, random_factor=None, rng=None, strategy=None, table=None):
         """
-        required_columns = [
-            'loan_amount', 'loan_term', 'loan_purpose', 'credit_score', 'annual_income',
-            'monthly_expenses', 'existing_debt', 'employment_status'
+        Assess many loan applications at once from column arrays
+        
+        This is the vectorized equivalent of calling assess_loan_application
+        once per row. Given the same random draws, every metric matches the
+        scalar path exactly.
+        
+        Parameters:
+        - loan_amount, loan_term, credit_score, annual_income, monthly_expenses,
+          existing_debt: Array-likes of equal length
+        - employment_status: Array-like of employment status strings
+        - random_variation: Optional array of PD noise multipliers
+        - random_factor: Optional array of decision draws
+        - rng, strategy: How omitted draws are made (see draw_noise)
+        - table: ScoringTable to use; defaults to the active one
+        
+        Returns:
+        - scores: Dict of NumPy arrays keyed like the assessment dict
+        """
+        if table is None:
+            table = get_scoring_table()
+        
+        loan_amount = np.asarray(loan_amount, dtype=float)
+        loan_term = np.asarray(loan_term, dtype=int)
+        credit_score = np.asarray(credit_score, dtype=int)
+        annual_income = np.asarray(annual_income, dtype=float)
+        monthly_expenses = np.asarray(monthly_expenses, dtype=float)
+        existing_debt = np.asarray(existing_debt, dtype=float)
+        employment_status = np.asarray(employment_status, dtype=object)
+        
+        n = len(loan_amount)
+        
+        if random_variation is None or random_factor is None:
+            variations, factors = cls.draw_noise(
+                loan_amount, loan_term, credit_score, annual_income,
+                monthly_expenses, existing_debt, employment_status,
+                rng=rng, strategy=strategy
+            )
+            if random_variation is None:
+                random_variation = variations
+            if random_factor is None:
+                random_factor = factors
+        random_variation = np.asarray(random_variation, dtype=float)
+        random_factor = np.asarray(random_factor, dtype=float)
+        
+        # The scalar path raises ZeroDivisionError on these
+        non_positive_columns = [
+            name for name, values in (
+                ('loan_amount', loan_amount), ('loan_term', loan_term), ('annual_income', annual_income)
+            ) if (values <= 0).any()
         ]
+        if non_positive_columns:
+            raise ValueError(f"Non-positive values found in columns: {', '.join(non_positive_columns)}")
         
+        monthly_income = annual_income / 12
+        debt_to_income_ratio = (existing_debt / 12 + monthly_expenses) / monthly_income
+        
+        pd = cls._probability_of_default_batch(
+            credit_score, annual_income, monthly_expenses,
+            existing_debt, loan_amount, loan_term, random_variation, table
+        )
+        lgd = cls._loss_given_default_batch(loan_amount, credit_score, employment_status, table)
+        
+        default_point = loan_term / 3
+        percent_remaining = 1 - (default_point / loan_term)
+        ead = loan_amount * np.maximum(percent_remaining, 0)
+        
+        expected_loss = pd * lgd * ead
+        
+        # Never turn a NaN or infinite metric into a rating
+        if not (np.isfinite(pd).all() and np.isfinite(expected_loss).all()):
+            raise ValueError("Risk metrics are not finite for some applications")
+        
+        risk_rating = cls._risk_rating_batch(pd, lgd, expected_loss, loan_amount, table)
+        
+        recommendation, reasons = cls._recommendation_batch(
+            risk_rating, pd, debt_to_income_ratio, random_factor
+        )
+        
+        return {
+            'probability_of_default': pd,
+            'loss_given_default': lgd,
+            'exposure_at_default': ead,
+            'expected_loss': expected_loss,
+            'risk_rating': risk_rating,
+            'recommendation': recommendation,
+            'reasons': reasons,
+            'debt_to_income_ratio': debt_to_income_ratio
+        }
+    
+    @classmethod
+    def score_batch(cls, df, random_variation=None, random_factor=None, rng=None, strategy=None, table=None):
+        """
+        Assess every application in a DataFrame in one vectorized pass
+        
+        Parameters:
+        - df: DataFrame with the application columns used by assess_loan_application
+        - random_variation: Optional array of PD noise multipliers
+        - random_factor: Optional array of decision draws
+        - rng, strategy: How omitted draws are made (see draw_noise)
+        - table: ScoringTable to use; defaults to the active one
+        
+        Returns:
+        - scores: DataFrame of risk metrics aligned with df's index
+        """
+        scores = cls.score_arrays(
+            df['loan_amount'].to_numpy(),
+            df['loan_term'].to_numpy(),
+            df['credit_score'].to_numpy(),
+            df['annual_income'].to_numpy(),
+            df['monthly_expenses'].to_numpy(),
+            df['existing_debt'].to_numpy(),
+            df['employment_status'].to_numpy(),
+            random_variation=random_variation,
+            random_factor=random_factor,
+            rng=rng,
+            strategy=strategy,
+            table=table
+        )
+        
+        return pd.DataFrame(scores, index=df.index)
+    
+    @classmethod
+    def score_batch_parallel(cls, df, workers=None, seed=None, table=None):
+        """
+        Assess every application in a DataFrame across a pool of processes
+        
+        All random draws are made up front in the parent process and sliced
+        along with the rows, so the result never depends on the number of
+        workers or the order in which shards finish. Shards are merged back in
+        original row order.
+        
+        Parameters:
+        - df: DataFrame with the application columns used by assess_loan_application
+        - workers: Number of worker processes; defaults to SCORING_WORKERS.
+          Frames smaller than PARALLEL_MIN_ROWS are scored in-process.
+        - seed: Optional seed for a Generator the draws are taken from; when
+          omitted they follow RNG_STRATEGY, as in score_batch
+        - table: ScoringTable to use; defaults to the active one. Workers
+          receive it with their shard, so a reload mid-run cannot split a file
+          across table versions.
+        
+        Returns:
+        - scores: DataFrame of risk metrics aligned with df's index
+        """
+        if workers is None:
+            workers = SCORING_WORKERS
+        if table is None:
+            table = get_scoring_table()
+        
+        n = len(df)
+        rng = np.random.default_rng(seed) if seed is not None else None
+        random_variation, random_factor = cls.draw_noise(
+            *(df[column].to_numpy() for column in NOISE_INPUT_COLUMNS),
+            df['employment_status'].to_numpy(),
+            rng=rng
+        )
+        
+        if workers <= 1 or n < PARALLEL_MIN_ROWS:
+            return cls.score_batch(df, random_variation, random_factor, table=table)
+        
+        # A few shards per worker keeps the pool busy when shards finish unevenly
+        bounds = np.linspace(0, n, workers * 4 + 1).astype(int)
+        shards = [
+            (df.iloc[start:end][SCORING_COLUMNS], random_variation[start:end], random_factor[start:end], table)
+            for start, end in zip(bounds[:-1], bounds[1:]) if end > start
+        ]
+        
+        # Spawn rather than fork: callers may be running inside threaded web workers
+        with ProcessPoolExecutor(max_workers=workers, mp_context=get_context('spawn')) as executor:
+            results = list(executor.map(_score_shard, shards))
+        
+        return pd.concat(results)
+    
+    @staticmethod
+    def read_csv(file_path):
+        """
+        Parse an application CSV file into a DataFrame
+        
+        The file is read exactly once; the resulting frame is meant to be
+        shared by validation, scoring, feature statistics and anomaly detection.
+        Low-cardinality text columns are parsed as categoricals to keep memory
+        down on large files.
+        
+        Parameters:
+        - file_path: Path to the CSV file
+        
+        Returns:
+        - df: DataFrame with the raw CSV contents
+        """
+        return pd.read_csv(file_path, dtype=CSV_CATEGORICAL_DTYPES)
+    
+    @staticmethod
+    def validate_dataframe(df):
+        """
+        Validate that a parsed application DataFrame has the required format
+        
+        Numeric columns are converted to numeric dtypes in place, so a frame
+        that passes validation is ready for scoring without another parse.
+        
+        Parameters:
+        - df: DataFrame returned by read_csv
+        
+        Returns:
+        - is_valid: Boolean indicating if the data is valid
+        - error_message: Error message if the data is invalid, None otherwise
+        """
         try:
-            # Read the CSV file
-            df = pd.read_csv(file_path)
-            
             # Check if all required columns are present
-            missing_columns = [col for col in required_columns if col not in df.columns]
+            missing_columns = [col for col in CSV_REQUIRED_COLUMNS if col not in df.columns]
             
             if missing_columns:
                 return False, f"Missing required columns: {', '.join(missing_columns)}"
             
             # Check for any null values in required columns
-            null_columns = [col for col in required_columns if df[col].isnull().any()]
+            null_columns = [col for col in CSV_REQUIRED_COLUMNS if df[col].isnull().any()]
             
             if null_columns:
                 return False, f"Null values found in columns: {', '.join(null_columns)}"
             
             # Check for non-numeric values in numeric columns
-            numeric_columns = [
-                'loan_amount', 'loan_term', 'credit_score', 
-                'annual_income', 'monthly_expenses', 'existing_debt'
-            ]
-            
             non_numeric_columns = []
-            for col in numeric_columns:
+            for col in CSV_NUMERIC_COLUMNS:
                 try:
-                    pd.to_numeric(df[col])
-                except:
+                    df[col] = pd.to_numeric(df[col])
+                except (ValueError, TypeError):
                     non_numeric_columns.append(col)
             
             if non_numeric_columns:
                 return False, f"Non-numeric values found in columns: {', '.join(non_numeric_columns)}"
             
+            # Check for zero or negative values in columns the risk metrics divide by
+            non_positive_columns = [col for col in CSV_POSITIVE_COLUMNS if (df[col] <= 0).any()]
+            
+            if non_positive_columns:
+                return False, f"Non-positive values found in columns: {', '.join(non_positive_columns)}"
+            
             # Check for valid employment status values
-            valid_statuses = ['full_time', 'part_time', 'self_employed', 'unemployed', 'retired']
-            invalid_statuses = df[~df['employment_status'].isin(valid_statuses)]['employment_status'].unique()
+            invalid_statuses = df[~df['employment_status'].isin(VALID_EMPLOYMENT_STATUSES)]['employment_status'].unique()
             
             if len(invalid_statuses) > 0:
                 return False, f"Invalid employment status values: {', '.join(invalid_statuses)}"
             
             return True, None
             
+        except Exception as e:
+            return False, f"Error validating CSV data: {str(e)}"
+    
+    @classmethod
+    def validate_csv_format(cls, file_path):
+        """
+        Validate if the uploaded CSV file has the required format
+        
+        Parameters:
+        - file_path: Path to the CSV file
+        
+        Returns:
+        - is_valid: Boolean indicating if the file is valid
+        - error_message: Error message if the file is invalid, None otherwise
+        """
+        try:
+            df = cls.read_csv(file_path)
         except Exception as e:
             return False, f"Error reading CSV file: {str(e)}"
+        
+        return cls.validate_dataframe(df)
     
     @classmethod
-    def process_csv_data(cls, file_path):
+    def process_csv_data(cls, file_path, workers=None, seed=None):
         """
         Process CSV data and return risk assessments for all applications
         
         Parameters:
         - file_path: Path to the CSV file
+        - workers: Number of scoring processes (see score_batch_parallel)
+        - seed: Optional seed for fresh but reproducible random draws (see score_batch_parallel)
+        
+        Returns:
+        - assessments: List of dicts containing risk assessments
+        """
+        try:
+            df = cls.read_csv(file_path)
+        except Exception as e:
+            raise ValueError(f"Error reading CSV file: {str(e)}")
+        
+        return cls.process_dataframe(df, workers=workers, seed=seed)
+    
+    @classmethod
+    def process_dataframe(cls, df, workers=None, seed=None, cache=None):
+        """
+        Validate an already-parsed DataFrame and return risk assessments for all rows
+        
+        Parameters:
+        - df: DataFrame returned by read_csv; numeric columns are coerced in place
+        - workers: Number of scoring processes (see score_batch_parallel)
+        - seed: Optional seed for fresh but reproducible random draws (see score_batch_parallel)
+        - cache: Optional AssessmentCache serving rows scored before; unused when seeded
         
         Returns:
         - assessments: List of dicts containing risk assessments
         """
-        # Validate the CSV file
-        is_valid, error_message = cls.validate_csv_format(file_path)
+        is_valid, error_message = cls.validate_dataframe(df)
         
         if not is_valid:
             raise ValueError(error_message)
         
-        # Read the CSV file
-        df = pd.read_csv(file_path)
+        # Score the whole file in vectorized passes, sharded across processes when configured
+        if cache is not None and seed is None:
+            scores = cache.score_batch(df, workers=workers)
+        else:
+            scores = cls.score_batch_parallel(df, workers=workers, seed=seed)
+        
+        return cls.assessments_from_scores(df, scores)
+    
+    @staticmethod
+    def assessments_from_scores(df, scores):
+        """
+        Convert a validated frame and its score_batch output into assessment dicts
+        
+        Parameters:
+        - df: Validated application DataFrame
+        - scores: DataFrame returned by score_batch for df
+        
+        Returns:
+        - assessments: List of dicts shaped like assess_loan_application's output,
+          each with the original row under 'application_data'
+        """
+        timestamp = datetime.utcnow()
+        
+        application_records = pd.DataFrame({
+            'loan_amount': df['loan_amount'].astype(float),
+            'loan_term': df['loan_term'].astype(int),
+            'loan_purpose': df['loan_purpose'],
+            'credit_score': df['credit_score'].astype(int),
+            'annual_income': df['annual_income'].astype(float),
+            'monthly_expenses': df['monthly_expenses'].astype(float),
+            'existing_debt': df['existing_debt'].astype(float),
+            'employment_status': df['employment_status']
+        }).to_dict('records')
         
-        # Process each application
         assessments = []
         
-        for _, row in df.iterrows():
-            application_data = {
-                'loan_amount': float(row['loan_amount']),
-                'loan_term': int(row['loan_term']),
-                'loan_purpose': row['loan_purpose'],
-                'credit_score': int(row['credit_score']),
-                'annual_income': float(row['annual_income']),
-                'monthly_expenses': float(row['monthly_expenses']),
-                'existing_debt': float(row['existing_debt']),
-                'employment_status': row['employment_status']
-            }
-            
-            assessment = cls.assess_loan_application(application_data)
-            
-            # Add the original application data to the assessment
-            assessment['application_data'] = application_data
-            
-            assessments.append(assessment)
+        for i, application_data in enumerate(application_records):
+            assessments.append({
+                'probability_of_default': float(scores['probability_of_default'].iat[i]),
+                'loss_given_default': float(scores['loss_given_default'].iat[i]),
+                'exposure_at_default': float(scores['exposure_at_default'].iat[i]),
+                'expected_loss': float(scores['expected_loss'].iat[i]),
+                'risk_rating': int(scores['risk_rating'].iat[i]),
+                'recommendation': scores['recommendation'].iat[i],
+                'reasons': scores['reasons'].iat[i],
+                'timestamp': timestamp,
+                # Add the original application data to the assessment
+                'application_data': application_data
+            })
         
         return assessments
+    
+    @classmethod
+    def stream_csv_data(cls, file_path, handle_chunk, chunksize=DEFAULT_CHUNK_SIZE, progress=None, cache=None):
+        """
+        Score a CSV file in fixed-size chunks with flat memory use
+        
+        Each chunk is parsed, validated and scored, then handed to handle_chunk
+        (which should write it to the database or an output file) before the
+        next chunk is read. Nothing is accumulated across chunks, so memory is
+        bounded by chunksize rather than by the size of the file.
+        
+        Parameters:
+        - file_path: Path to the CSV file
+        - handle_chunk: Callable taking (chunk, scores) for each scored chunk; may
+          return the number of rows it failed to write
+        - chunksize: Number of rows read per chunk
+        - progress: Optional ScoringProgress to update; a new one is created if omitted
+        - cache: Optional AssessmentCache serving rows scored before
+        
+        Returns:
+        - progress: ScoringProgress with the final counters
+        """
+        if progress is None:
+            progress = ScoringProgress()
+        progress.total_bytes = os.path.getsize(file_path)
+        
+        with open(file_path, 'rb') as csv_file:
+            reader = pd.read_csv(csv_file, dtype=CSV_CATEGORICAL_DTYPES, chunksize=chunksize)
+            
+            for chunk in reader:
+                first_row = progress.rows_read + 1
+                progress.rows_read += len(chunk)
+                
+                is_valid, error_message = cls.validate_dataframe(chunk)
+                if not is_valid:
+                    raise ValueError(f"Rows {first_row}-{progress.rows_read}: {error_message}")
+                
+                scores = cache.score_batch(chunk, workers=1) if cache is not None else cls.score_batch(chunk)
+                failed = handle_chunk(chunk, scores) or 0
+                
+                progress.record_chunk(scores['recommendation'], failed)
+                progress.bytes_read = csv_file.tell()
+                progress.notify()
+        
+        progress.bytes_read = progress.total_bytes
+        progress.finished = True
+        progress.notify()
+        
+        return progress
+
+
+def _score_shard(shard):
+    """Score one (frame, random_variation, random_factor, table) shard in a worker process"""
+    df, random_variation, random_factor, table = shard
+    return CreditRiskEngine.score_batch(df, random_variation, random_factor, table=table)
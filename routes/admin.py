@@ -5,12 +5,22 @@ import json
 from datetime import datetime, timedelta
 from functools import wraps
 
-from flask import Blueprint, render_template, flash, redirect, url_for, request, jsonify
+from flask import Blueprint, render_template, flash, redirect, url_for, request, jsonify, abort
 from flask_login import login_required, current_user
-from sqlalchemy import func, case, desc, asc
 
 from app import db
 from models import User, LoanApplication, RiskAssessment
+from analytics import (
+    status_summary, summary_snapshot, monthly_status_counts, average_risk_by_band, approximate_application_count,
+    ADMIN_INCOME_BANDS, APPLICATION_STATUSES
+)
+from summary_tables import record_status_change, ADMIN_CREDIT_SCORE_DIMENSION
+from dashboard_cache import dashboard_cache, GLOBAL_SCOPE
+from assessment_cache import assessment_cache
+from pagination import keyset_paginate, InvalidCursor
+from model_registry import model_registry
+from model_training import schedule_retrain, training_status
+from portfolio import portfolio_summary, DEFAULT_STATUS, PORTFOLIO_SEGMENTS
 
 bp = Blueprint('admin', __name__, url_prefix='/admin')
 
@@ -44,11 +54,12 @@ def staff_required(f):
 def dashboard():
     """Administrative dashboard with loan statistics and overview"""
     # Application statistics
-    total_applications = LoanApplication.query.count()
-    pending_applications = LoanApplication.query.filter_by(status='Pending').count()
-    approved_applications = LoanApplication.query.filter_by(status='Approved').count()
-    rejected_applications = LoanApplication.query.filter_by(status='Rejected').count()
-    under_review_applications = LoanApplication.query.filter_by(status='Under Review').count()
+    summary = status_summary()
+    total_applications = summary.total
+    pending_applications = summary.pending
+    approved_applications = summary.approved
+    rejected_applications = summary.rejected
+    under_review_applications = summary.under_review
     
     # Recent applications
     recent_applications = LoanApplication.query.order_by(LoanApplication.created_at.desc()).limit(10).all()
@@ -82,7 +93,8 @@ def dashboard():
 @staff_required
 def all_applications():
     """View all loan applications in the system"""
-    page = request.args.get('page', 1, type=int)
+    after = request.args.get('after')
+    before = request.args.get('before')
     status_filter = request.args.get('status', 'all')
     sort_by = request.args.get('sort', 'created_at')
     order = request.args.get('order', 'desc')
@@ -94,20 +106,14 @@ def all_applications():
     if status_filter != 'all':
         query = query.filter(LoanApplication.status == status_filter)
     
-    # Apply sorting
-    if sort_by == 'created_at':
-        if order == 'desc':
-            query = query.order_by(LoanApplication.created_at.desc())
-        else:
-            query = query.order_by(LoanApplication.created_at.asc())
-    elif sort_by == 'loan_amount':
-        if order == 'desc':
-            query = query.order_by(LoanApplication.loan_amount.desc())
-        else:
-            query = query.order_by(LoanApplication.loan_amount.asc())
-    
-    # Paginate results
-    applications = query.paginate(page=page, per_page=20)
+    # Page through results on (sort column, id)
+    try:
+        applications = keyset_paginate(
+            query, sort_by, order, after=after, before=before, per_page=20,
+            approximate_total=approximate_application_count(status=status_filter)
+        )
+    except InvalidCursor:
+        abort(400)
     
     return render_template(
         'admin/applications.html',
@@ -153,13 +159,16 @@ def make_decision(application_id):
         return redirect(url_for('admin.application_details', application_id=application_id))
     
     # Update application status
+    old_status = application.status
     application.status = decision
     application.handled_by_id = current_user.id
     application.handled_at = datetime.utcnow()
     application.decision_notes = notes
     
     try:
+        record_status_change(application, old_status)
         db.session.commit()
+        dashboard_cache.invalidate_user(application.user_id)
         flash(f'Application {decision.lower()} successfully.', 'success')
     except Exception as e:
         db.session.rollback()
@@ -207,113 +216,125 @@ def update_user_role(user_id):
 @staff_required
 def insights():
     """View data insights and analytics"""
-    # Prepare data for charts
+    context = dashboard_cache.get_or_set(GLOBAL_SCOPE, 'admin_insights', _insights_context)
     
-    # Credit score distribution
-    credit_score_ranges = {
-        '300-579 (Poor)': 0,
-        '580-669 (Fair)': 0,
-        '670-739 (Good)': 0,
-        '740-850 (Excellent)': 0
-    }
+    return render_template('admin/insights.html', **context)
+
+def _insights_context():
+    """Chart data for the admin insights page, as plain cacheable values"""
+    # Prepare data for charts
     
-    credit_scores = db.session.query(LoanApplication.credit_score).all()
-    for score in credit_scores:
-        score = score[0]
-        if 300 <= score <= 579:
-            credit_score_ranges['300-579 (Poor)'] += 1
-        elif 580 <= score <= 669:
-            credit_score_ranges['580-669 (Fair)'] += 1
-        elif 670 <= score <= 739:
-            credit_score_ranges['670-739 (Good)'] += 1
-        elif 740 <= score <= 850:
-            credit_score_ranges['740-850 (Excellent)'] += 1
+    # Credit score distribution, from the pre-aggregated summary table
+    snapshot = summary_snapshot(dimensions=[ADMIN_CREDIT_SCORE_DIMENSION])
+    credit_score_ranges = snapshot.band_counts(ADMIN_CREDIT_SCORE_DIMENSION)
     
     # Approval rate by month
     # Get data for the past 6 months
     six_months_ago = datetime.utcnow() - timedelta(days=180)
     
-    # SQL Alchemy ORM query to get monthly approval rates
-    monthly_stats = db.session.query(
-        func.strftime('%Y-%m', LoanApplication.created_at).label('month'),
-        func.count(LoanApplication.id).label('total'),
-        func.sum(case([(LoanApplication.status == 'Approved', 1)], else_=0)).label('approved')
-    ).filter(LoanApplication.created_at >= six_months_ago).group_by('month').order_by('month').all()
-    
     months = []
     approval_rate_data = []
     
-    for stat in monthly_stats:
-        months.append(stat.month)
-        approval_rate = (stat.approved / stat.total) * 100 if stat.total > 0 else 0
+    for month, counts in monthly_status_counts(six_months_ago):
+        total = sum(counts.values())
+        months.append(month)
+        approval_rate = (counts.get('Approved', 0) / total) * 100 if total > 0 else 0
         approval_rate_data.append(approval_rate)
     
+    return {
+        'credit_score_ranges': credit_score_ranges,
+        'months': months,
+        'approval_rate_data': approval_rate_data
+    }
+
+@bp.route('/portfolio')
+@login_required
+@staff_required
+def portfolio():
+    """Expected loss, capital and concentration of the loan book"""
+    status_filter = request.args.get('status', DEFAULT_STATUS)
+    if not _valid_portfolio_status(status_filter):
+        abort(400)
+    metrics = _portfolio_metrics(status_filter)
+    
     return render_template(
-        'admin/insights.html',
-        credit_score_ranges=credit_score_ranges,
-        months=months,
-        approval_rate_data=approval_rate_data
+        'admin/portfolio.html',
+        metrics=metrics,
+        status_filter=status_filter,
+        statuses=APPLICATION_STATUSES,
+        segments=PORTFOLIO_SEGMENTS
+    )
+
+def _valid_portfolio_status(status_filter):
+    """Whether a status filter names 'all' or a known application status"""
+    return status_filter == 'all' or status_filter in APPLICATION_STATUSES
+
+def _portfolio_metrics(status_filter):
+    """Cached portfolio_summary for a validated status filter"""
+    return dashboard_cache.get_or_set(
+        GLOBAL_SCOPE, f'portfolio:{status_filter}', lambda: portfolio_summary(status_filter)
     )
 
+@bp.route('/api/portfolio')
+@login_required
+@staff_required
+def portfolio_api():
+    """API endpoint for portfolio expected loss, capital and concentration"""
+    status_filter = request.args.get('status', DEFAULT_STATUS)
+    if not _valid_portfolio_status(status_filter):
+        return jsonify({'error': f'Unknown status: {status_filter}'}), 400
+    return jsonify(_portfolio_metrics(status_filter))
+
 @bp.route('/api/approval-stats')
 @login_required
 @staff_required
 def approval_stats_api():
     """API endpoint for approval statistics"""
-    stats = {}
-    
     # Count applications by status
-    statuses = db.session.query(
-        LoanApplication.status, 
-        func.count(LoanApplication.id)
-    ).group_by(LoanApplication.status).all()
-    
-    for status, count in statuses:
-        stats[status] = count
-    
+    return jsonify(status_summary().counts)
+
+@bp.route('/api/cache-stats')
+@login_required
+@staff_required
+def cache_stats_api():
+    """API endpoint for dashboard cache hit/miss counters (this process)"""
+    return jsonify(dashboard_cache.stats_snapshot())
+
+@bp.route('/api/assessment-cache-stats')
+@login_required
+@staff_required
+def assessment_cache_stats_api():
+    """API endpoint for assessment cache hit/miss counters (this process)"""
+    return jsonify(assessment_cache.stats_snapshot())
+
+@bp.route('/api/model-registry')
+@login_required
+@staff_required
+def model_registry_api():
+    """API endpoint for the anomaly model registry counters and training status (this process)"""
+    stats = model_registry.stats_snapshot()
+    stats['training'] = training_status()
     return jsonify(stats)
 
+@bp.route('/api/model-registry/retrain', methods=['POST'])
+@login_required
+@admin_required
+def model_retrain_api():
+    """API endpoint to retrain the anomaly models on recent applications in the background"""
+    scheduled = schedule_retrain(f"Requested by {current_user.username}", force=True)
+    return jsonify({'scheduled': scheduled, 'training': training_status()}), 202 if scheduled else 409
+
 @bp.route('/api/risk-by-income')
 @login_required
 @staff_required
 def risk_by_income_api():
     """API endpoint for risk by income data"""
-    # Get income brackets and average risk ratings
-    income_risk = {}
+    # Average risk rating for every income bracket in one query
+    bracket_data = average_risk_by_band(LoanApplication.annual_income, ADMIN_INCOME_BANDS)
     
-    # Define income brackets
-    brackets = [
-        (0, 25000, 'Under $25K'),
-        (25000, 50000, '$25K-$50K'),
-        (50000, 75000, '$50K-$75K'),
-        (75000, 100000, '$75K-$100K'),
-        (100000, float('inf'), 'Over $100K')
-    ]
-    
-    # Query for applications with risk assessments
-    applications = db.session.query(
-        LoanApplication.annual_income,
-        RiskAssessment.risk_rating
-    ).join(
-        RiskAssessment, 
-        LoanApplication.id == RiskAssessment.loan_application_id
-    ).all()
-    
-    # Sort applications into brackets
-    bracket_data = {bracket[2]: [] for bracket in brackets}
-    
-    for income, risk_rating in applications:
-        for min_val, max_val, bracket_name in brackets:
-            if min_val <= income < max_val:
-                bracket_data[bracket_name].append(risk_rating)
-                break
-    
-    # Calculate average risk rating for each bracket
-    for bracket_name, ratings in bracket_data.items():
-        if ratings:
-            avg_rating = sum(ratings) / len(ratings)
-            income_risk[bracket_name] = round(avg_rating, 1)
-        else:
-            income_risk[bracket_name] = 0
+    income_risk = {
+        bracket_name: round(avg_rating, 1) if count else 0
+        for bracket_name, (avg_rating, count) in bracket_data.items()
+    }
     
     return jsonify(income_risk)
\ No newline at end of file
@@ -1,10 +1,16 @@
 from flask import (
-    Blueprint, render_template, jsonify, request
+    Blueprint, render_template, jsonify, request, current_app
 )
 from flask_login import login_required, current_user
 from sqlalchemy import func
+from werkzeug.http import is_resource_modified
 from app import db
 from models import LoanApplication, RiskAssessment
+from dashboard_cache import dashboard_cache, user_scope
+from analytics import (
+    status_summary, average_risk_by_band, insights_bundle_version, insights_chart_bundle,
+    APPLICATION_STATUSES, INSIGHTS_CREDIT_SCORE_BANDS
+)
 import numpy as np
 import pandas as pd
 
@@ -14,11 +20,33 @@ bp = Blueprint('insights', __name__)
 @login_required
 def insights():
     """Display insights dashboard"""
+    stats = dashboard_cache.get_or_set(
+        user_scope(current_user.id), 'insights', lambda: _insights_stats(current_user.id)
+    )
+    
+    # Get recent applications for timeline
+    recent_applications = LoanApplication.query.filter_by(
+        user_id=current_user.id
+    ).order_by(
+        LoanApplication.created_at.desc()
+    ).limit(5).all()
+    
+    return render_template(
+        'insights.html',
+        title='Insights',
+        recent_applications=recent_applications,
+        **stats
+    )
+
+
+def _insights_stats(user_id):
+    """Statistics shown on the insights dashboard, as plain cacheable values"""
     # Get basic statistics
-    total_applications = LoanApplication.query.filter_by(user_id=current_user.id).count()
-    approved_count = LoanApplication.query.filter_by(user_id=current_user.id, status='Approved').count()
-    rejected_count = LoanApplication.query.filter_by(user_id=current_user.id, status='Rejected').count()
-    review_count = LoanApplication.query.filter_by(user_id=current_user.id, status='Under Review').count()
+    summary = status_summary(user_id)
+    total_applications = summary.total
+    approved_count = summary.approved
+    rejected_count = summary.rejected
+    review_count = summary.under_review
     
     # Calculate approval rate
     approval_rate = (approved_count / total_applications * 100) if total_applications > 0 else 0
@@ -33,46 +61,28 @@ def insights():
         LoanApplication, 
         LoanApplication.id == RiskAssessment.loan_application_id
     ).filter(
-        LoanApplication.user_id == current_user.id
+        LoanApplication.user_id == user_id
     ).first()
     
-    # Get recent applications for timeline
-    recent_applications = LoanApplication.query.filter_by(
-        user_id=current_user.id
-    ).order_by(
-        LoanApplication.created_at.desc()
-    ).limit(5).all()
-    
-    return render_template(
-        'insights.html',
-        title='Insights',
-        total_applications=total_applications,
-        approved_count=approved_count,
-        rejected_count=rejected_count,
-        review_count=review_count,
-        approval_rate=approval_rate,
-        avg_metrics=avg_metrics,
-        recent_applications=recent_applications
-    )
+    return {
+        'total_applications': total_applications,
+        'approved_count': approved_count,
+        'rejected_count': rejected_count,
+        'review_count': review_count,
+        'approval_rate': approval_rate,
+        'avg_metrics': avg_metrics._asdict()
+    }
 
 
 @bp.route('/api/approval_stats')
 @login_required
 def approval_stats():
     """API endpoint for approval stats (for chart)"""
-    statuses = ['Approved', 'Rejected', 'Under Review', 'Pending']
-    counts = []
-    
-    for status in statuses:
-        count = LoanApplication.query.filter_by(
-            user_id=current_user.id,
-            status=status
-        ).count()
-        counts.append(count)
+    summary = status_summary(current_user.id)
     
     return jsonify({
-        'labels': statuses,
-        'data': counts
+        'labels': APPLICATION_STATUSES,
+        'data': summary.as_list()
     })
 
 
@@ -105,53 +115,60 @@ def risk_by_income():
 @login_required
 def risk_by_credit_score():
     """API endpoint for risk by credit score (for chart)"""
-    # Define credit score ranges
-    ranges = [
-        {'min': 300, 'max': 500, 'label': '300-500'},
-        {'min': 501, 'max': 600, 'label': '501-600'},
-        {'min': 601, 'max': 700, 'label': '601-700'},
-        {'min': 701, 'max': 800, 'label': '701-800'},
-        {'min': 801, 'max': 850, 'label': '801-850'}
-    ]
-    
-    # Calculate average risk rating for each range
-    range_data = []
-    
-    for r in ranges:
-        # Get applications in this credit score range
-        apps = db.session.query(
-            LoanApplication, RiskAssessment
-        ).join(
-            RiskAssessment,
-            LoanApplication.id == RiskAssessment.loan_application_id
-        ).filter(
-            LoanApplication.user_id == current_user.id,
-            LoanApplication.credit_score >= r['min'],
-            LoanApplication.credit_score <= r['max']
-        ).all()
-        
-        # Calculate average risk rating
-        total_rating = sum(risk.risk_rating for _, risk in apps)
-        avg_rating = total_rating / len(apps) if len(apps) > 0 else 0
-        
-        range_data.append({
-            'range': r['label'],
-            'avg_risk': avg_rating,
-            'count': len(apps)
-        })
+    # Average risk rating and count for every credit score range in one query
+    range_data = average_risk_by_band(
+        LoanApplication.credit_score, INSIGHTS_CREDIT_SCORE_BANDS, user_id=current_user.id
+    )
     
     return jsonify({
-        'labels': [r['label'] for r in ranges],
-        'data': [d['avg_risk'] for d in range_data],
-        'counts': [d['count'] for d in range_data]
+        'labels': list(range_data.keys()),
+        'data': [avg_risk for avg_risk, _ in range_data.values()],
+        'counts': [count for _, count in range_data.values()]
     })
 
 
+@bp.route('/api/insights/bundle')
+@login_required
+def insights_bundle():
+    """API endpoint returning every insights chart payload in one response"""
+    etag, last_modified = insights_bundle_version(current_user.id)
+    
+    # Answer revalidation requests without rebuilding the payloads
+    if not is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+        response = current_app.response_class(status=304)
+    else:
+        bundle = dashboard_cache.get_or_set(
+            user_scope(current_user.id), f'insights_bundle:{etag}', lambda: insights_chart_bundle(current_user.id)
+        )
+        response = jsonify(bundle)
+    
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    # Per-user data: browsers may keep it but must revalidate before reuse
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    
+    return response
+
+
 @bp.route('/model-comparison')
 @login_required
 def model_comparison():
     """Display model comparison page"""
+    context = dashboard_cache.get_or_set(
+        user_scope(current_user.id), 'model_comparison', lambda: _model_comparison_context(current_user.id)
+    )
     
+    return render_template(
+        'model_comparison.html',
+        title='Model Comparison',
+        **context
+    )
+
+
+def _model_comparison_context(user_id):
+    """Model list and simulated performance metrics for the model comparison page"""
     # Get all loan applications with assessments
     applications = db.session.query(
         LoanApplication, RiskAssessment
@@ -159,7 +176,7 @@ def model_comparison():
         RiskAssessment,
         LoanApplication.id == RiskAssessment.loan_application_id
     ).filter(
-        LoanApplication.user_id == current_user.id
+        LoanApplication.user_id == user_id
     ).all()
     
     # Define the models for comparison - using actual ML algorithms
@@ -326,13 +343,11 @@ def model_comparison():
                 'false_negatives': false_neg
             })
     
-    return render_template(
-        'model_comparison.html',
-        title='Model Comparison',
-        models=models,
-        model_performance=model_performance,
-        application_count=len(applications) if applications else 0
-    )
+    return {
+        'models': models,
+        'model_performance': model_performance,
+        'application_count': len(applications) if applications else 0
+    }
 
 
 @bp.route('/api/model-prediction-data')
@@ -0,0 +1,65 @@
+"""
+Routes for tracking background batch upload jobs.
+"""
+from flask import Blueprint, render_template, redirect, url_for, flash, jsonify, abort
+from flask_login import login_required, current_user
+
+from app import db
+from models import BatchJob
+from batch_jobs import load_job_result
+
+bp = Blueprint('jobs', __name__, url_prefix='/jobs')
+
+
+def _get_job_or_404(job_id):
+    """Load a job the current user is allowed to see"""
+    job = db.session.get(BatchJob, job_id)
+    if job is None:
+        abort(404)
+    if job.user_id != current_user.id and not current_user.has_staff_privileges():
+        abort(404)
+    return job
+
+
+@bp.route('/<int:job_id>')
+@login_required
+def job_status(job_id):
+    """Display a progress page that polls the job until it finishes"""
+    job = _get_job_or_404(job_id)
+
+    if job.status == 'completed':
+        return redirect(url_for('jobs.job_results', job_id=job.id))
+
+    return render_template('job_status.html', title='Processing Upload', job=job)
+
+
+@bp.route('/<int:job_id>/progress')
+@login_required
+def job_progress(job_id):
+    """API endpoint for job progress (polled by the status page)"""
+    job = _get_job_or_404(job_id)
+
+    progress = job.to_progress_dict()
+    if job.status == 'completed':
+        progress['results_url'] = url_for('jobs.job_results', job_id=job.id)
+
+    return jsonify(progress)
+
+
+@bp.route('/<int:job_id>/results')
+@login_required
+def job_results(job_id):
+    """Render the dataset analysis page from a completed job's stored output"""
+    job = _get_job_or_404(job_id)
+
+    if job.status != 'completed':
+        flash('This job has not finished yet.', 'info')
+        return redirect(url_for('jobs.job_status', job_id=job.id))
+
+    context = load_job_result(job)
+
+    return render_template(
+        'dataset_analysis.html',
+        title='Dataset Analysis and Model Training Results',
+        **context
+    )
@@ -1,20 +1,24 @@
-import os
 import csv
-import tempfile
-import pandas as pd
-import numpy as np
-from datetime import datetime
 from flask import (
     Blueprint, render_template, redirect, url_for, 
-    flash, request, current_app, jsonify
+    flash, request, current_app, jsonify, abort
 )
 from flask_login import login_required, current_user
 from sqlalchemy import func
 from app import db
 from models import User, LoanApplication, RiskAssessment
 from forms import LoanApplicationForm, CSVUploadForm
-from risk_engine import CreditRiskEngine
-from unsupervised_models import AnomalyDetector
+from assessment_cache import assessment_cache
+from batch_jobs import enqueue_upload
+from dashboard_cache import dashboard_cache, user_scope
+from pagination import keyset_paginate, InvalidCursor
+from summary_tables import (
+    record_application, RISK_CATEGORY_DIMENSION, INCOME_DIMENSION, REPORT_CREDIT_SCORE_DIMENSION
+)
+from analytics import (
+    status_summary, global_and_user_status_summary, similar_applications_summary, summary_snapshot,
+    report_scatter_series, approximate_application_count, prediction_comparison, MAX_COMPARE_APPLICATIONS
+)
 
 bp = Blueprint('loan', __name__)
 
@@ -25,8 +29,9 @@ def index():
     """Display the dashboard/homepage"""
     # Check if user has staff privileges - load all applications
     if current_user.has_staff_privileges():
-        # For staff members, show all loan applications with pagination
-        page = request.args.get('page', 1, type=int)
+        # For staff members, show all loan applications with keyset pagination
+        after = request.args.get('after')
+        before = request.args.get('before')
         status_filter = request.args.get('status', 'all')
         sort_by = request.args.get('sort', 'created_at')
         order = request.args.get('order', 'desc')
@@ -38,40 +43,30 @@ def index():
         if status_filter != 'all':
             query = query.filter(LoanApplication.status == status_filter)
         
-        # Apply sorting
-        if sort_by == 'created_at':
-            if order == 'desc':
-                query = query.order_by(LoanApplication.created_at.desc())
-            else:
-                query = query.order_by(LoanApplication.created_at.asc())
-        elif sort_by == 'loan_amount':
-            if order == 'desc':
-                query = query.order_by(LoanApplication.loan_amount.desc())
-            else:
-                query = query.order_by(LoanApplication.loan_amount.asc())
-        
         # Join with related entities for eager loading
         query = query.outerjoin(RiskAssessment).outerjoin(User, LoanApplication.handled_by_id == User.id)
         
-        # Paginate results
-        all_applications = query.paginate(page=page, per_page=15)
+        # Page through results on (sort column, id)
+        try:
+            all_applications = keyset_paginate(
+                query, sort_by, order, after=after, before=before, per_page=15,
+                approximate_total=approximate_application_count(status=status_filter)
+            )
+        except InvalidCursor:
+            abort(400)
         
         # Calculate statistics
-        total_loans = LoanApplication.query.count()
-        approved_loans = LoanApplication.query.filter_by(status='Approved').count()
-        rejected_loans = LoanApplication.query.filter_by(status='Rejected').count()
-        pending_loans = LoanApplication.query.filter_by(status='Pending').count()
-        review_loans = LoanApplication.query.filter_by(status='Under Review').count()
+        summary = status_summary()
         
         return render_template(
             'staff_index.html', 
             title='Dashboard',
             applications=all_applications,
-            total_applications=total_loans,
-            approved_applications=approved_loans,
-            rejected_applications=rejected_loans,
-            pending_applications=pending_loans,
-            review_applications=review_loans,
+            total_applications=summary.total,
+            approved_applications=summary.approved,
+            rejected_applications=summary.rejected,
+            pending_applications=summary.pending,
+            review_applications=summary.under_review,
             status_filter=status_filter,
             sort_by=sort_by,
             order=order
@@ -136,34 +131,23 @@ def index():
             # User already has enough applications
             applications = user_applications
         
-        # Calculate statistics for all applications in the system
-        total_applications = LoanApplication.query.count()
-        approved_applications = LoanApplication.query.filter_by(status='Approved').count()
-        rejected_applications = LoanApplication.query.filter_by(status='Rejected').count()
-        pending_applications = LoanApplication.query.filter_by(status='Pending').count()
-        review_applications = LoanApplication.query.filter_by(status='Under Review').count()
-        
-        # Calculate user's own statistics
-        user_total = LoanApplication.query.filter_by(user_id=current_user.id).count()
-        user_approved = LoanApplication.query.filter_by(user_id=current_user.id, status='Approved').count()
-        user_rejected = LoanApplication.query.filter_by(user_id=current_user.id, status='Rejected').count()
-        user_pending = LoanApplication.query.filter_by(user_id=current_user.id, status='Pending').count()
-        user_review = LoanApplication.query.filter_by(user_id=current_user.id, status='Under Review').count()
+        # Calculate statistics for all applications in the system and the user's own
+        summary, user_summary = global_and_user_status_summary(current_user.id)
         
         return render_template(
             'index.html', 
             title='Dashboard',
             applications=applications,
-            total_applications=total_applications,
-            approved_applications=approved_applications,
-            rejected_applications=rejected_applications,
-            pending_applications=pending_applications,
-            review_applications=review_applications,
-            user_total=user_total,
-            user_approved=user_approved,
-            user_rejected=user_rejected,
-            user_pending=user_pending,
-            user_review=user_review,
+            total_applications=summary.total,
+            approved_applications=summary.approved,
+            rejected_applications=summary.rejected,
+            pending_applications=summary.pending,
+            review_applications=summary.under_review,
+            user_total=user_summary.total,
+            user_approved=user_summary.approved,
+            user_rejected=user_summary.rejected,
+            user_pending=user_summary.pending,
+            user_review=user_summary.under_review,
             sort_by=sort_by,
             order=order
         )
@@ -208,7 +192,7 @@ def apply():
             'employment_status': application.employment_status
         }
         
-        assessment = CreditRiskEngine.assess_loan_application(application_data)
+        assessment = assessment_cache.assess(application_data)
         
         # Create risk assessment record
         risk_assessment = RiskAssessment(
@@ -232,7 +216,9 @@ def apply():
         
         # Add risk assessment to database
         db.session.add(risk_assessment)
+        record_application(application, risk_rating=risk_assessment.risk_rating)
         db.session.commit()
+        dashboard_cache.invalidate_user(current_user.id)
         
         flash('Your loan application has been submitted successfully!', 'success')
         return redirect(url_for('loan.predict', application_id=application.id))
@@ -266,89 +252,9 @@ def predict(application_id):
         .limit(5)\
         .all()
     
-    # Gather comparison data for visualization
-    # Get average risk metrics from similar applications by credit score range
-    credit_score = application.credit_score
-    # Define the range to be +/- 50 points
-    min_score = max(300, credit_score - 50)
-    max_score = min(850, credit_score + 50)
-    
-    similar_applications = LoanApplication.query.filter(
-        LoanApplication.credit_score.between(min_score, max_score),
-        LoanApplication.id != application_id  # Exclude current application
-    ).all()
-    
-    # Calculate averages for comparison if similar applications exist
-    avg_pd = 0
-    avg_lgd = 0
-    avg_ead = 0
-    avg_risk_rating = 0
-    count = 0
-    
-    for app in similar_applications:
-        if app.risk_assessment:
-            avg_pd += app.risk_assessment.probability_of_default
-            avg_lgd += app.risk_assessment.loss_given_default
-            avg_ead += app.risk_assessment.exposure_at_default
-            avg_risk_rating += app.risk_assessment.risk_rating
-            count += 1
-    
-    if count > 0:
-        avg_pd /= count
-        avg_lgd /= count
-        avg_ead /= count
-        avg_risk_rating /= count
-    
-    # Get distributions for comparison charts
-    credit_score_distribution = {}
-    pd_distribution = {"0-5%": 0, "5-10%": 0, "10-15%": 0, "15-20%": 0, "20%+": 0}
-    risk_rating_distribution = {i: 0 for i in range(1, 11)}
-    
-    for app in similar_applications:
-        # Credit score distribution (bins of 50)
-        score_bin = (app.credit_score // 50) * 50
-        score_key = f"{score_bin}-{score_bin + 49}"
-        credit_score_distribution[score_key] = credit_score_distribution.get(score_key, 0) + 1
-        
-        # Risk assessment distributions
-        if app.risk_assessment:
-            # PD distribution
-            pd = app.risk_assessment.probability_of_default * 100
-            if pd < 5:
-                pd_distribution["0-5%"] += 1
-            elif pd < 10:
-                pd_distribution["5-10%"] += 1
-            elif pd < 15:
-                pd_distribution["10-15%"] += 1
-            elif pd < 20:
-                pd_distribution["15-20%"] += 1
-            else:
-                pd_distribution["20%+"] += 1
-                
-            # Risk rating distribution
-            risk_rating = app.risk_assessment.risk_rating
-            risk_rating_distribution[risk_rating] = risk_rating_distribution.get(risk_rating, 0) + 1
-    
-    # Prepare data for loan amount distribution chart
-    amount_distribution = []
-    for app in similar_applications:
-        amount_distribution.append({
-            'x': app.loan_amount,
-            'y': app.credit_score,
-            'r': 5,  # Bubble size
-            'status': app.status
-        })
-    
-    # Prepare income vs expenses comparison data
-    income_expenses_data = []
-    for app in similar_applications:
-        monthly_income = app.annual_income / 12
-        income_expenses_data.append({
-            'x': monthly_income,
-            'y': app.monthly_expenses,
-            'r': 5,  # Bubble size
-            'status': app.status
-        })
+    # Gather comparison data for visualization from applications with a similar
+    # credit score (+/- 50 points), aggregated in SQL
+    comparison = similar_applications_summary(application)
     
     # Current application's metrics for comparison charts
     current_app_metrics = {
@@ -366,18 +272,9 @@ def predict(application_id):
         application=application,
         assessment=risk_assessment,
         recent_applications=recent_applications,
-        # Comparison data
-        avg_pd=avg_pd,
-        avg_lgd=avg_lgd,
-        avg_ead=avg_ead,
-        avg_risk_rating=avg_risk_rating,
-        credit_score_distribution=credit_score_distribution,
-        pd_distribution=pd_distribution,
-        risk_rating_distribution=risk_rating_distribution,
-        amount_distribution=amount_distribution,
-        income_expenses_data=income_expenses_data,
         current_app_metrics=current_app_metrics,
-        similar_count=count
+        # Comparison data
+        **comparison
     )
 
 
@@ -392,46 +289,14 @@ def compare_predictions():
         flash('No applications selected for comparison.', 'warning')
         return redirect(url_for('loan.history'))
     
-    # Get the applications and ensure they belong to the current user
-    applications = []
-    for app_id in application_ids:
-        application = LoanApplication.query.get(app_id)
-        if application and (application.user_id == current_user.id or current_user.has_staff_privileges()):
-            applications.append(application)
+    # Load the selected applications that belong to the current user in one query
+    owner_id = None if current_user.has_staff_privileges() else current_user.id
+    comparison_data = prediction_comparison(application_ids[:MAX_COMPARE_APPLICATIONS], owner_id)
     
-    if not applications:
+    if not comparison_data:
         flash('No valid applications found for comparison.', 'warning')
         return redirect(url_for('loan.history'))
     
-    # Prepare data for comparison
-    comparison_data = []
-    for app in applications:
-        if not app.risk_assessment:
-            continue
-            
-        app_data = {
-            'id': app.id,
-            'date': app.created_at,
-            'loan_amount': app.loan_amount,
-            'loan_term': app.loan_term,
-            'loan_purpose': app.loan_purpose,
-            'status': app.status,
-            'credit_score': app.credit_score,
-            'annual_income': app.annual_income,
-            'monthly_expenses': app.monthly_expenses,
-            'debt_to_income_ratio': round((app.existing_debt / app.annual_income * 100) if app.annual_income > 0 else 0, 2),
-            'loan_to_income_ratio': round((app.loan_amount / app.annual_income * 100) if app.annual_income > 0 else 0, 2),
-            'risk_rating': app.risk_assessment.risk_rating,
-            'probability_of_default': app.risk_assessment.probability_of_default,
-            'loss_given_default': app.risk_assessment.loss_given_default,
-            'expected_loss': app.risk_assessment.expected_loss,
-            'recommendation': app.risk_assessment.recommendation
-        }
-        comparison_data.append(app_data)
-    
-    # Sort by risk rating (ascending) then by date (descending)
-    comparison_data.sort(key=lambda x: (x['risk_rating'], -int(x['date'].timestamp())))
-    
     return render_template(
         'compare_predictions.html',
         title='Compare Predictions',
@@ -439,22 +304,75 @@ def compare_predictions():
     )
 
 
+@bp.route('/api/compare-predictions', methods=['GET', 'POST'])
+@login_required
+def compare_predictions_api():
+    """
+    Compare loan predictions as JSON
+    
+    Ids are read from repeated ?ids= parameters or, for long lists, from a
+    JSON body {"ids": [...]} posted to the same URL.
+    """
+    if request.method == 'POST':
+        payload = request.get_json(silent=True) or {}
+        application_ids = payload.get('ids', [])
+        if not isinstance(application_ids, list):
+            return jsonify({'error': 'ids must be a list of application ids'}), 400
+        try:
+            application_ids = [int(app_id) for app_id in application_ids]
+        except (TypeError, ValueError):
+            return jsonify({'error': 'ids must be a list of application ids'}), 400
+    else:
+        application_ids = request.args.getlist('ids', type=int)
+    
+    if not application_ids:
+        return jsonify({'error': 'No applications selected for comparison'}), 400
+    if len(application_ids) > MAX_COMPARE_APPLICATIONS:
+        return jsonify({'error': f'At most {MAX_COMPARE_APPLICATIONS} applications can be compared at once'}), 400
+    
+    owner_id = None if current_user.has_staff_privileges() else current_user.id
+    comparison_data = prediction_comparison(application_ids, owner_id)
+    
+    # Requested ids that are unknown, not visible to the user or not yet assessed
+    found = {app['id'] for app in comparison_data}
+    for app in comparison_data:
+        app['date'] = app['date'].isoformat()
+    
+    return jsonify({
+        'applications': comparison_data,
+        'count': len(comparison_data),
+        'missing_ids': sorted(set(application_ids) - found)
+    })
+
+
 @bp.route('/history')
 @login_required
 def history():
     """Display loan application history"""
     # Use join to eagerly load related entities
-    applications = LoanApplication.query.filter_by(user_id=current_user.id)\
+    query = LoanApplication.query.filter_by(user_id=current_user.id)\
         .outerjoin(RiskAssessment)\
-        .outerjoin(User, LoanApplication.handled_by_id == User.id)\
-        .order_by(LoanApplication.created_at.desc()).all()
+        .outerjoin(User, LoanApplication.handled_by_id == User.id)
+    
+    # Newest first, one page at a time
+    summary = status_summary(current_user.id)
+    try:
+        applications = keyset_paginate(
+            query, 'created_at', 'desc',
+            after=request.args.get('after'), before=request.args.get('before'),
+            per_page=20, approximate_total=summary.total
+        )
+    except InvalidCursor:
+        abort(400)
     
     return render_template(
         'history.html',
         title='Loan Application History',
-        applications=applications
+        applications=applications,
+        summary=summary
     )
 
+
 @bp.route('/seed-data', methods=['GET', 'POST'])
 @login_required
 def seed_data():
@@ -469,6 +387,7 @@ def seed_data():
         
         try:
             seed_sample_data()
+            dashboard_cache.invalidate_all()
             flash('Sample data has been successfully seeded into the database.', 'success')
         except Exception as e:
             flash(f'Error seeding data: {str(e)}', 'danger')
@@ -482,164 +401,100 @@ def seed_data():
 @login_required
 def reports():
     """Display loan reports and analytics"""
-    # Get all applications for the current user with eager loading of risk assessments
-    applications = LoanApplication.query.filter_by(user_id=current_user.id)\
-        .outerjoin(RiskAssessment)\
-        .options(db.contains_eager(LoanApplication.risk_assessment))\
-        .all()
+    context = dashboard_cache.get_or_set(
+        user_scope(current_user.id), 'reports', lambda: _reports_context(current_user.id)
+    )
+    
+    return render_template('reports.html', title='Loan Reports', **context)
+
+
+def _reports_context(user_id):
+    """Chart series and statistics for the reports page, as plain cacheable values"""
+    # Counts and averages come from the pre-aggregated summary tables
+    snapshot = summary_snapshot(user_id=user_id)
     
     # Statistics
-    total_applications = len(applications)
+    total_applications = snapshot.total
     
     # If no applications, return empty template
     if total_applications == 0:
-        return render_template(
-            'reports.html',
-            title='Loan Reports',
-            total_applications=0,
-            avg_loan_amount=0,
-            avg_credit_score=0,
-            approval_rate=0,
-            status_labels=['No Data'],
-            status_data=[1],
-            risk_labels=['No Data'],
-            risk_data=[1],
-            income_brackets=['No Data'],
-            income_approved=[0],
-            income_rejected=[0],
-            credit_score_labels=['No Data'],
-            credit_score_data=[0],
-            dti_approved=[],
-            dti_rejected=[],
-            loan_to_income_approved=[],
-            loan_to_income_rejected=[]
-        )
+        return {
+            'total_applications': 0,
+            'avg_loan_amount': 0,
+            'avg_credit_score': 0,
+            'approval_rate': 0,
+            'status_labels': ['No Data'],
+            'status_data': [1],
+            'risk_labels': ['No Data'],
+            'risk_data': [1],
+            'income_brackets': ['No Data'],
+            'income_approved': [0],
+            'income_rejected': [0],
+            'credit_score_labels': ['No Data'],
+            'credit_score_data': [0],
+            'dti_approved': [],
+            'dti_rejected': [],
+            'loan_to_income_approved': [],
+            'loan_to_income_rejected': []
+        }
     
     # Status breakdown
-    status_counts = {}
-    for app in applications:
-        status_counts[app.status] = status_counts.get(app.status, 0) + 1
+    status_counts = snapshot.status_counts
     
     status_labels = list(status_counts.keys())
     status_data = list(status_counts.values())
     
     # Risk category breakdown
-    risk_counts = {'Low Risk': 0, 'Medium Risk': 0, 'High Risk': 0}
-    for app in applications:
-        if app.risk_assessment:
-            if app.risk_assessment.risk_rating <= 3:
-                risk_counts['Low Risk'] += 1
-            elif app.risk_assessment.risk_rating <= 7:
-                risk_counts['Medium Risk'] += 1
-            else:
-                risk_counts['High Risk'] += 1
+    risk_counts = snapshot.band_counts(RISK_CATEGORY_DIMENSION)
     
     risk_labels = list(risk_counts.keys())
     risk_data = list(risk_counts.values())
     
     # Income brackets
-    income_brackets = ['Under $25K', '$25K-$50K', '$50K-$75K', '$75K-$100K', 'Over $100K']
-    income_approved = [0] * len(income_brackets)
-    income_rejected = [0] * len(income_brackets)
-    
-    for app in applications:
-        income = app.annual_income
-        bracket_index = 0
-        
-        if income < 25000:
-            bracket_index = 0
-        elif income < 50000:
-            bracket_index = 1
-        elif income < 75000:
-            bracket_index = 2
-        elif income < 100000:
-            bracket_index = 3
-        else:
-            bracket_index = 4
-        
-        if app.status == 'Approved':
-            income_approved[bracket_index] += 1
-        elif app.status == 'Rejected':
-            income_rejected[bracket_index] += 1
+    income_brackets = INCOME_DIMENSION.labels
+    income_approved = list(snapshot.band_counts(INCOME_DIMENSION, status='Approved').values())
+    income_rejected = list(snapshot.band_counts(INCOME_DIMENSION, status='Rejected').values())
     
     # Credit score distribution
-    credit_score_ranges = {
-        '300-549': 0,
-        '550-649': 0,
-        '650-749': 0,
-        '750-850': 0
-    }
-    
-    for app in applications:
-        score = app.credit_score
-        if 300 <= score <= 549:
-            credit_score_ranges['300-549'] += 1
-        elif 550 <= score <= 649:
-            credit_score_ranges['550-649'] += 1
-        elif 650 <= score <= 749:
-            credit_score_ranges['650-749'] += 1
-        elif 750 <= score <= 850:
-            credit_score_ranges['750-850'] += 1
+    credit_score_ranges = snapshot.band_counts(REPORT_CREDIT_SCORE_DIMENSION)
     
     credit_score_labels = list(credit_score_ranges.keys())
     credit_score_data = list(credit_score_ranges.values())
     
-    # Debt-to-Income and Credit Score scatter plot data
-    dti_approved = []
-    dti_rejected = []
-    
-    for app in applications:
-        dti_ratio = (app.existing_debt / app.annual_income * 100) if app.annual_income > 0 else 0
-        data_point = {'x': round(dti_ratio, 2), 'y': app.credit_score}
-        
-        if app.status == 'Approved':
-            dti_approved.append(data_point)
-        elif app.status == 'Rejected':
-            dti_rejected.append(data_point)
-    
-    # Loan-to-Income and Existing Debt scatter plot data
-    loan_to_income_approved = []
-    loan_to_income_rejected = []
-    
-    for app in applications:
-        lti_ratio = (app.loan_amount / app.annual_income * 100) if app.annual_income > 0 else 0
-        data_point = {'x': round(lti_ratio, 2), 'y': app.existing_debt}
-        
-        if app.status == 'Approved':
-            loan_to_income_approved.append(data_point)
-        elif app.status == 'Rejected':
-            loan_to_income_rejected.append(data_point)
+    # Debt-to-Income vs Credit Score and Loan-to-Income vs Existing Debt scatter
+    # plot data, downsampled for users with many applications
+    scatter = report_scatter_series(user_id)
+    dti_approved = scatter['dti']['Approved']
+    dti_rejected = scatter['dti']['Rejected']
+    loan_to_income_approved = scatter['loan_to_income']['Approved']
+    loan_to_income_rejected = scatter['loan_to_income']['Rejected']
     
     # Calculate aggregated metrics
-    loan_amounts = [app.loan_amount for app in applications]
-    credit_scores = [app.credit_score for app in applications]
-    approved_count = sum(1 for app in applications if app.status == 'Approved')
+    approved_count = status_counts.get('Approved', 0)
     
-    avg_loan_amount = sum(loan_amounts) / len(loan_amounts) if loan_amounts else 0
-    avg_credit_score = sum(credit_scores) / len(credit_scores) if credit_scores else 0
+    avg_loan_amount = snapshot.avg_loan_amount
+    avg_credit_score = snapshot.avg_credit_score
     approval_rate = approved_count / total_applications if total_applications > 0 else 0
     
-    return render_template(
-        'reports.html',
-        title='Loan Reports',
-        total_applications=total_applications,
-        avg_loan_amount=avg_loan_amount,
-        avg_credit_score=avg_credit_score,
-        approval_rate=approval_rate,
-        status_labels=status_labels,
-        status_data=status_data,
-        risk_labels=risk_labels,
-        risk_data=risk_data,
-        income_brackets=income_brackets,
-        income_approved=income_approved,
-        income_rejected=income_rejected,
-        credit_score_labels=credit_score_labels,
-        credit_score_data=credit_score_data,
-        dti_approved=dti_approved,
-        dti_rejected=dti_rejected,
-        loan_to_income_approved=loan_to_income_approved,
-        loan_to_income_rejected=loan_to_income_rejected
-    )
+    return {
+        'total_applications': total_applications,
+        'avg_loan_amount': avg_loan_amount,
+        'avg_credit_score': avg_credit_score,
+        'approval_rate': approval_rate,
+        'status_labels': status_labels,
+        'status_data': status_data,
+        'risk_labels': risk_labels,
+        'risk_data': risk_data,
+        'income_brackets': income_brackets,
+        'income_approved': income_approved,
+        'income_rejected': income_rejected,
+        'credit_score_labels': credit_score_labels,
+        'credit_score_data': credit_score_data,
+        'dti_approved': dti_approved,
+        'dti_rejected': dti_rejected,
+        'loan_to_income_approved': loan_to_income_approved,
+        'loan_to_income_rejected': loan_to_income_rejected
+    }
 
 
 @bp.route('/upload', methods=['GET', 'POST'])
@@ -649,320 +504,23 @@ def upload():
     form = CSVUploadForm()
     
     if form.validate_on_submit():
-        # Save the uploaded file to a temporary file
-        uploaded_file = form.csv_file.data
-        fd, temp_path = tempfile.mkstemp()
-        model_training_results = None
-        
+        # Store the file and hand it to the background job queue; scoring,
+        # persistence and model training run outside this request
         try:
-            with os.fdopen(fd, 'wb') as tmp:
-                uploaded_file.save(tmp)
-            
-            # Process the CSV file
-            try:
-                # Parse the CSV file first to validate it
-                try:
-                    import pandas as pd
-                    df = pd.read_csv(temp_path)
-                    print(f"Successfully read CSV with {len(df)} records and {len(df.columns)} columns")
-                    
-                    # Check if key required columns exist
-                    required_columns = ['loan_amount', 'loan_term', 'credit_score', 'annual_income', 'monthly_expenses', 'existing_debt', 'employment_status']
-                    missing_columns = [col for col in required_columns if col not in df.columns]
-                    if missing_columns:
-                        raise ValueError(f"CSV file is missing required columns: {', '.join(missing_columns)}")
-                    
-                except Exception as e:
-                    import traceback
-                    print(f"Error validating CSV format: {str(e)}")
-                    print(traceback.format_exc())
-                    raise ValueError(f"Invalid CSV format: {str(e)}")
-                
-                # Process the data through the risk engine
-                assessments = CreditRiskEngine.process_csv_data(temp_path)
-                
-                # Create loan applications and risk assessments for each row
-                processed_applications = []
-                
-                for assessment in assessments:
-                    app_data = assessment['application_data']
-                    
-                    application = LoanApplication(
-                        user_id=current_user.id,
-                        loan_amount=app_data['loan_amount'],
-                        loan_term=app_data['loan_term'],
-                        loan_purpose=app_data.get('loan_purpose', 'business'),  # Set a default if not provided
-                        age=30,  # Default value, not in CSV
-                        annual_income=app_data['annual_income'],
-                        monthly_expenses=app_data['monthly_expenses'],
-                        credit_score=app_data['credit_score'],
-                        existing_debt=app_data['existing_debt'],
-                        employment_status=app_data['employment_status'],
-                        employment_length=0,  # Default value, not in CSV
-                        home_ownership='rent',  # Default value, not in CSV
-                        status='Pending'
-                    )
-                    
-                    # Update application status based on recommendation
-                    if assessment['recommendation'] == 'Approve':
-                        application.status = 'Approved'
-                    elif assessment['recommendation'] == 'Reject':
-                        application.status = 'Rejected'
-                    else:
-                        application.status = 'Under Review'
-                    
-                    # Add application to database
-                    try:
-                        # Add application to database
-                        db.session.add(application)
-                        db.session.flush()  # Just to get the ID without committing
-                        
-                        risk_assessment = RiskAssessment(
-                            loan_application_id=application.id,
-                            probability_of_default=float(assessment['probability_of_default']),
-                            loss_given_default=float(assessment['loss_given_default']),
-                            exposure_at_default=float(assessment['exposure_at_default']),
-                            expected_loss=float(assessment['expected_loss']),
-                            risk_rating=int(assessment['risk_rating']),
-                            recommendation=assessment['recommendation'],
-                            reasons=', '.join(assessment['reasons'])
-                        )
-                        
-                        # Add risk assessment to database
-                        db.session.add(risk_assessment)
-                        db.session.commit()
-                    except Exception as e:
-                        # Roll back in case of error
-                        db.session.rollback()
-                        import traceback
-                        print(f"Error saving to database: {str(e)}")
-                        print(traceback.format_exc())
-                        # Continue to next record
-                    
-                    # Store processed application for summary - safely handle risk_assessment which might be undefined in case of database error
-                    app_summary = {
-                        'id': getattr(application, 'id', 0),
-                        'loan_amount': getattr(application, 'loan_amount', 0),
-                        'credit_score': getattr(application, 'credit_score', 0),
-                        'status': getattr(application, 'status', 'Unknown')
-                    }
-                    
-                    # Add risk assessment data if it exists and was successfully saved
-                    try:
-                        if 'risk_assessment' in locals() and risk_assessment is not None:
-                            app_summary.update({
-                                'risk_rating': risk_assessment.risk_rating,
-                                'probability_of_default': risk_assessment.probability_of_default,
-                                'recommendation': risk_assessment.recommendation
-                            })
-                        else:
-                            # Use data from the assessment dictionary if risk_assessment object not available
-                            app_summary.update({
-                                'risk_rating': assessment.get('risk_rating', 0),
-                                'probability_of_default': assessment.get('probability_of_default', 0),
-                                'recommendation': assessment.get('recommendation', 'Unknown')
-                            })
-                    except Exception as e:
-                        print(f"Error adding risk data to summary: {str(e)}")
-                        # Add default values if we can't get the data
-                        app_summary.update({
-                            'risk_rating': 0,
-                            'probability_of_default': 0,
-                            'recommendation': 'Unknown'
-                        })
-                    
-                    processed_applications.append(app_summary)
-                
-                # Count the number of each recommendation
-                approved = sum(1 for app in processed_applications if app['status'] == 'Approved')
-                rejected = sum(1 for app in processed_applications if app['status'] == 'Rejected')
-                review = sum(1 for app in processed_applications if app['status'] == 'Under Review')
-                
-                # Generate model training results for the uploaded dataset
-                try:
-                    import pandas as pd
-                    import numpy as np
-                    from datetime import datetime
-                    
-                    # Load the dataset for analysis
-                    df = pd.read_csv(temp_path)
-                    
-                    # Basic dataset statistics
-                    record_count = len(df)
-                    feature_count = len(df.columns)
-                    
-                    # Calculate feature statistics
-                    feature_stats = {}
-                    for col in df.columns:
-                        if col in ['loan_amount', 'credit_score', 'annual_income', 'monthly_expenses', 'existing_debt']:
-                            feature_stats[col] = {
-                                'min': float(df[col].min()),
-                                'max': float(df[col].max()),
-                                'mean': float(df[col].mean()),
-                                'median': float(df[col].median()),
-                                'std': float(df[col].std())
-                            }
-                    
-                    # Initialize variables for unsupervised learning results
-                    unsupervised_results = None
-                    anomaly_results = None
-                    
-                    # Only attempt unsupervised learning if there's enough data
-                    if len(df) >= 5:  # Minimum threshold for meaningful analysis
-                        try:
-                            # Initialize anomaly detector with a safe default contamination rate
-                            anomaly_detector = AnomalyDetector(model_dir='./models')
-                            
-                            # Train the model and get training results
-                            unsupervised_results = anomaly_detector.train(df)
-                            
-                            # Find anomalies in the dataset
-                            anomaly_results = anomaly_detector.detect_anomalies(df)
-                            
-                            # Log anomaly detection results
-                            if anomaly_results and 'anomaly_count' in anomaly_results:
-                                print(f"Anomaly detection completed: Found {anomaly_results['anomaly_count']} anomalies")
-                            else:
-                                print("Anomaly detection completed but no anomalies found or results invalid")
-                        except Exception as e:
-                            import traceback
-                            print(f"Error in anomaly detection: {str(e)}")
-                            print(traceback.format_exc())
-                            unsupervised_results = None
-                            anomaly_results = None
-                    else:
-                        print(f"Dataset too small for unsupervised learning: {len(df)} records. Minimum 5 required.")
-                    
-                    # Create complete model training results
-                    model_training_results = {
-                        'dataset_info': {
-                            'filename': uploaded_file.filename,
-                            'record_count': record_count,
-                            'feature_count': feature_count,
-                            'upload_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                        },
-                        'feature_stats': feature_stats,
-                        'training_summary': {
-                            'training_time': f"{(record_count * 0.01) + 0.5:.1f}s",
-                            'validation_method': "5-fold cross-validation",
-                            'optimization': "Grid search for hyperparameters"
-                        },
-                        'unsupervised_learning': unsupervised_results,
-                        'anomaly_detection': anomaly_results,
-                        'models': [
-                            {
-                                'name': 'Logistic Regression',
-                                'type': 'Classification',
-                                'training_time': '0.8s',
-                                'accuracy': 0.82,
-                                'precision': 0.79,
-                                'recall': 0.75,
-                                'f1': 0.77,
-                                'roc_auc': 0.81,
-                                'feature_importance': {
-                                    'credit_score': 0.35,
-                                    'annual_income': 0.25,
-                                    'existing_debt': 0.20,
-                                    'loan_amount': 0.15,
-                                    'other_features': 0.05
-                                }
-                            },
-                            {
-                                'name': 'Random Forest',
-                                'type': 'Classification',
-                                'training_time': '2.3s',
-                                'accuracy': 0.87,
-                                'precision': 0.84,
-                                'recall': 0.83,
-                                'f1': 0.83,
-                                'roc_auc': 0.90,
-                                'feature_importance': {
-                                    'credit_score': 0.30,
-                                    'annual_income': 0.25,
-                                    'existing_debt': 0.15,
-                                    'loan_amount': 0.10,
-                                    'employment_length': 0.15,
-                                    'other_features': 0.05
-                                }
-                            },
-                            {
-                                'name': 'Gradient Boosting',
-                                'type': 'Classification',
-                                'training_time': '3.1s',
-                                'accuracy': 0.86,
-                                'precision': 0.85,
-                                'recall': 0.81,
-                                'f1': 0.83,
-                                'roc_auc': 0.89,
-                                'feature_importance': {
-                                    'credit_score': 0.32,
-                                    'annual_income': 0.22,
-                                    'existing_debt': 0.18,
-                                    'loan_amount': 0.12,
-                                    'employment_length': 0.10,
-                                    'other_features': 0.06
-                                }
-                            },
-                            {
-                                'name': 'Neural Network',
-                                'type': 'Classification',
-                                'training_time': '5.7s',
-                                'accuracy': 0.84,
-                                'precision': 0.82,
-                                'recall': 0.79,
-                                'f1': 0.80,
-                                'roc_auc': 0.86,
-                                'feature_importance': {
-                                    'credit_score': 0.28,
-                                    'annual_income': 0.26,
-                                    'existing_debt': 0.17,
-                                    'loan_amount': 0.14,
-                                    'employment_length': 0.12,
-                                    'other_features': 0.03
-                                }
-                            },
-                            {
-                                'name': 'Support Vector Machine',
-                                'type': 'Classification',
-                                'training_time': '4.2s',
-                                'accuracy': 0.81,
-                                'precision': 0.78,
-                                'recall': 0.77,
-                                'f1': 0.77,
-                                'roc_auc': 0.83,
-                                'feature_importance': {
-                                    'credit_score': 0.33,
-                                    'annual_income': 0.24,
-                                    'existing_debt': 0.19,
-                                    'loan_amount': 0.13,
-                                    'employment_length': 0.11
-                                }
-                            }
-                        ],
-                        'selected_model': 'Random Forest',
-                        'selection_reason': 'Best overall performance with highest accuracy and F1 score'
-                    }
-                except Exception as e:
-                    model_training_results = None
-                    print(f"Error generating model training results: {str(e)}")
-                
-                # Render a dedicated training results template
-                return render_template(
-                    'dataset_analysis.html',
-                    title='Dataset Analysis and Model Training Results',
-                    applications=processed_applications,
-                    approved=approved,
-                    rejected=rejected,
-                    review=review,
-                    total=len(assessments),
-                    training_results=model_training_results
-                )
-                
-            except Exception as e:
-                flash(f'Error processing CSV file: {str(e)}', 'danger')
+            job = enqueue_upload(current_user.id, form.csv_file.data)
+        except Exception as e:
+            flash(f'Error processing CSV file: {str(e)}', 'danger')
+            return render_template('upload.html', title='Upload CSV Data', form=form)
+        
+        if request.accept_mimetypes.best == 'application/json':
+            return jsonify({
+                'job_id': job.id,
+                'status': job.status,
+                'progress_url': url_for('jobs.job_progress', job_id=job.id),
+                'results_url': url_for('jobs.job_results', job_id=job.id)
+            }), 202
         
-        finally:
-            # Remove the temporary file
-            os.unlink(temp_path)
+        flash('Your file has been queued for processing.', 'info')
+        return redirect(url_for('jobs.job_status', job_id=job.id))
     
     return render_template('upload.html', title='Upload CSV Data', form=form)
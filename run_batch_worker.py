@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Standalone worker for queued batch upload jobs.
+
+The web process already runs queued jobs in its own thread pool; this worker
+polls the same batch_job table so jobs keep moving when web workers are
+restarted, and can be scaled independently of gunicorn.
+
+Usage:
+    python run_batch_worker.py [--interval 5] [--once]
+"""
+import argparse
+import logging
+import time
+
+from app import app, db
+from batch_jobs import drain_queue
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def main():
+    """Poll the job queue until interrupted"""
+    parser = argparse.ArgumentParser(description='Process queued batch upload jobs')
+    parser.add_argument('--interval', type=float, default=5, help='Seconds to wait between polls of an empty queue')
+    parser.add_argument('--once', action='store_true', help='Drain the queue once and exit')
+    args = parser.parse_args()
+
+    logger.info("Batch worker started")
+
+    try:
+        while True:
+            with app.app_context():
+                processed = drain_queue()
+                db.session.remove()
+            if processed:
+                logger.info(f"Processed {processed} job(s)")
+            if args.once:
+                break
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        logger.info("Batch worker stopped")
+
+
+if __name__ == "__main__":
+    main()
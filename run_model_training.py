@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Scheduled retraining of the anomaly detection models.
+
+Uploads are scored against the current models; this job retrains them on the
+most recent applications when those have drifted from the models' training
+data (see model_training). Web workers pick up the new models through the
+model directory's CURRENT pointer.
+
+Usage:
+    python run_model_training.py [--interval 3600] [--once] [--force]
+"""
+import argparse
+import logging
+import time
+
+from app import app, db
+from model_training import retrain_models
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def main():
+    """Check for drift and retrain until interrupted"""
+    parser = argparse.ArgumentParser(description='Retrain the anomaly models when applications drift')
+    parser.add_argument('--interval', type=float, default=3600, help='Seconds to wait between checks')
+    parser.add_argument('--once', action='store_true', help='Check once and exit')
+    parser.add_argument('--force', action='store_true', help='Retrain without checking for drift')
+    args = parser.parse_args()
+
+    logger.info("Model training job started")
+
+    try:
+        while True:
+            with app.app_context():
+                outcome = retrain_models(force=args.force, reason='Requested from the command line' if args.force else None)
+                db.session.remove()
+            logger.info(f"Retrain {outcome['status']}: {outcome['reason']}")
+            if args.once:
+                break
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        logger.info("Model training job stopped")
+
+
+if __name__ == "__main__":
+    main()
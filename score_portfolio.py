@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Score a large loan portfolio CSV in fixed-size chunks.
+
+Each chunk is validated, scored and written out (to an output CSV or to the
+database) before the next one is read, so memory stays flat regardless of
+file size.
+
+Usage:
+    python score_portfolio.py portfolio.csv --output scored.csv
+    python score_portfolio.py portfolio.csv --user-id 1 [--chunk-size 50000]
+"""
+import argparse
+import logging
+import sys
+
+from risk_engine import CreditRiskEngine, ScoredCSVWriter, ScoringProgress, DEFAULT_CHUNK_SIZE
+from assessment_cache import assessment_cache
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def log_progress(progress):
+    """Log the counters after each chunk"""
+    logger.info(
+        f"{progress.percent_complete:5.1f}% - chunks: {progress.chunks}, "
+        f"rows scored: {progress.rows_scored}, rows failed: {progress.rows_failed}"
+    )
+
+
+def main():
+    """Parse arguments and run the streaming scorer"""
+    parser = argparse.ArgumentParser(description='Score a loan portfolio CSV in chunks')
+    parser.add_argument('csv_file', help='Path to the portfolio CSV file')
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--output', help='Write scored rows to this CSV file')
+    target.add_argument('--user-id', type=int, help='Persist scored rows as applications owned by this user')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help='Rows per chunk')
+    args = parser.parse_args()
+
+    progress = ScoringProgress(callback=log_progress)
+
+    try:
+        if args.output:
+            CreditRiskEngine.stream_csv_data(
+                args.csv_file, ScoredCSVWriter(args.output),
+                chunksize=args.chunk_size, progress=progress, cache=assessment_cache
+            )
+        else:
+            from app import app
+            from bulk_persistence import ChunkPersister
+
+            with app.app_context():
+                persister = ChunkPersister(args.user_id)
+                CreditRiskEngine.stream_csv_data(
+                    args.csv_file, persister,
+                    chunksize=args.chunk_size, progress=progress, cache=assessment_cache
+                )
+            for failure in persister.failures:
+                logger.warning(f"Row {failure['row']} not saved: {failure['error']}")
+    except ValueError as e:
+        logger.error(f"Scoring stopped: {str(e)}")
+        return 1
+
+    logger.info(f"Done: {progress.to_dict()}")
+    logger.info(f"Assessment cache: {assessment_cache.stats_snapshot()}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
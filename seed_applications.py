@@ -10,7 +10,8 @@ import os
 from datetime import datetime, timedelta
 from app import app, db
 from models import User, LoanApplication, RiskAssessment
-from risk_engine import CreditRiskEngine
+from assessment_cache import assessment_cache
+from summary_tables import fact_for_application, summary_deltas, apply_summary_deltas
 
 # Configuration options
 NUM_SAMPLE_USERS = 10  # Number of sample users to create
@@ -201,6 +202,7 @@ def seed_sample_data():
         
         # Process applications and create risk assessments
         staff_users = [user for user in created_users if user.is_staff]
+        summary_facts = []
         
         for application in created_applications:
             # Process the application with the risk engine
@@ -214,7 +216,7 @@ def seed_sample_data():
                 'employment_status': application.employment_status
             }
             
-            assessment = CreditRiskEngine.assess_loan_application(application_data)
+            assessment = assessment_cache.assess(application_data)
             
             # Create risk assessment record
             risk_assessment = RiskAssessment(
@@ -267,7 +269,11 @@ def seed_sample_data():
                             application.status = 'Rejected'
             
             db.session.add(risk_assessment)
+            summary_facts.append(fact_for_application(application, risk_rating=risk_assessment.risk_rating))
             
+        # Count the new applications in the dashboard summary tables
+        apply_summary_deltas(summary_deltas(summary_facts))
+        
         # Final commit with all data
         db.session.commit()
         
@@ -1,191 +1,234 @@
 // Charts JavaScript file for visualizations
 
+const INSIGHTS_BUNDLE_URL = '/api/insights/bundle';
+const INSIGHTS_BUNDLE_CACHE_KEY = 'insightsBundle';
+
 // Function to initialize all charts on the insights page
 function initializeCharts() {
+    const hasApprovalChart = document.getElementById('approvalChart');
+    const hasRiskByIncomeChart = document.getElementById('riskByIncomeChart');
+    const hasRiskByCreditScoreChart = document.getElementById('riskByCreditScoreChart');
+    
     // Check if we're on the insights page
-    if (document.getElementById('approvalChart')) {
-        loadApprovalChart();
+    if (!hasApprovalChart && !hasRiskByIncomeChart && !hasRiskByCreditScoreChart) {
+        return;
     }
     
-    if (document.getElementById('riskByIncomeChart')) {
-        loadRiskByIncomeChart();
+    loadInsightsBundle()
+        .then(bundle => {
+            if (hasApprovalChart) {
+                renderApprovalChart(bundle.approval_stats);
+            }
+            
+            if (hasRiskByIncomeChart) {
+                renderRiskByIncomeChart(bundle.risk_by_income);
+            }
+            
+            if (hasRiskByCreditScoreChart) {
+                renderRiskByCreditScoreChart(bundle.risk_by_credit_score);
+            }
+        })
+        .catch(error => console.error('Error loading insights data:', error));
+}
+
+// Read the last bundle kept for this tab, if any
+function readCachedBundle() {
+    try {
+        return JSON.parse(sessionStorage.getItem(INSIGHTS_BUNDLE_CACHE_KEY));
+    } catch (error) {
+        return null;
     }
+}
+
+// Fetch all insights chart data in one request, revalidating the copy from
+// the previous visit with its ETag and reusing it on 304 Not Modified
+function loadInsightsBundle() {
+    const cached = readCachedBundle();
+    const headers = {};
     
-    if (document.getElementById('riskByCreditScoreChart')) {
-        loadRiskByCreditScoreChart();
+    if (cached && cached.etag) {
+        headers['If-None-Match'] = cached.etag;
     }
+    
+    return fetch(INSIGHTS_BUNDLE_URL, { headers: headers, cache: 'no-store' })
+        .then(response => {
+            if (response.status === 304 && cached) {
+                return cached.data;
+            }
+            
+            if (!response.ok) {
+                throw new Error(`Unexpected response status ${response.status}`);
+            }
+            
+            return response.json().then(data => {
+                try {
+                    sessionStorage.setItem(INSIGHTS_BUNDLE_CACHE_KEY, JSON.stringify({
+                        etag: response.headers.get('ETag'),
+                        data: data
+                    }));
+                } catch (error) {
+                    // Storage full or disabled; the charts still render
+                }
+                return data;
+            });
+        });
 }
 
-// Load approval statistics chart
-function loadApprovalChart() {
-    fetch('/api/approval_stats')
-        .then(response => response.json())
-        .then(data => {
-            const ctx = document.getElementById('approvalChart').getContext('2d');
-            new Chart(ctx, {
-                type: 'pie',
-                data: {
-                    labels: data.labels,
-                    datasets: [{
-                        data: data.data,
-                        backgroundColor: [
-                            'rgba(75, 192, 192, 0.7)',
-                            'rgba(255, 99, 132, 0.7)',
-                            'rgba(255, 205, 86, 0.7)',
-                            'rgba(201, 203, 207, 0.7)'
-                        ],
-                        borderColor: [
-                            'rgb(75, 192, 192)',
-                            'rgb(255, 99, 132)',
-                            'rgb(255, 205, 86)',
-                            'rgb(201, 203, 207)'
-                        ],
-                        borderWidth: 1
-                    }]
+// Render approval statistics chart
+function renderApprovalChart(data) {
+    const ctx = document.getElementById('approvalChart').getContext('2d');
+    new Chart(ctx, {
+        type: 'pie',
+        data: {
+            labels: data.labels,
+            datasets: [{
+                data: data.data,
+                backgroundColor: [
+                    'rgba(75, 192, 192, 0.7)',
+                    'rgba(255, 99, 132, 0.7)',
+                    'rgba(255, 205, 86, 0.7)',
+                    'rgba(201, 203, 207, 0.7)'
+                ],
+                borderColor: [
+                    'rgb(75, 192, 192)',
+                    'rgb(255, 99, 132)',
+                    'rgb(255, 205, 86)',
+                    'rgb(201, 203, 207)'
+                ],
+                borderWidth: 1
+            }]
+        },
+        options: {
+            responsive: true,
+            plugins: {
+                legend: {
+                    position: 'bottom',
                 },
-                options: {
-                    responsive: true,
-                    plugins: {
-                        legend: {
-                            position: 'bottom',
-                        },
-                        title: {
-                            display: true,
-                            text: 'Application Status Distribution'
-                        }
-                    }
+                title: {
+                    display: true,
+                    text: 'Application Status Distribution'
                 }
-            });
-        })
-        .catch(error => console.error('Error loading approval stats:', error));
+            }
+        }
+    });
 }
 
-// Load risk by income chart
-function loadRiskByIncomeChart() {
-    fetch('/api/risk_by_income')
-        .then(response => response.json())
-        .then(data => {
-            // Process data for scatter plot
-            const chartData = data.map(item => ({
-                x: item.income,
-                y: item.risk_rating
-            }));
-            
-            const ctx = document.getElementById('riskByIncomeChart').getContext('2d');
-            new Chart(ctx, {
-                type: 'scatter',
-                data: {
-                    datasets: [{
-                        label: 'Risk Rating vs. Annual Income',
-                        data: chartData,
-                        backgroundColor: 'rgba(54, 162, 235, 0.7)',
-                        borderColor: 'rgba(54, 162, 235, 1)',
-                        borderWidth: 1,
-                        pointRadius: 6,
-                        pointHoverRadius: 8
-                    }]
-                },
-                options: {
-                    responsive: true,
-                    scales: {
-                        x: {
-                            title: {
-                                display: true,
-                                text: 'Annual Income ($)'
-                            },
-                            ticks: {
-                                // Format income as currency
-                                callback: function(value) {
-                                    return '$' + value.toLocaleString();
-                                }
-                            }
-                        },
-                        y: {
-                            title: {
-                                display: true,
-                                text: 'Risk Rating (1-10)'
-                            },
-                            min: 0,
-                            max: 10,
-                            ticks: {
-                                stepSize: 1
-                            }
+// Render risk by income chart
+function renderRiskByIncomeChart(data) {
+    // Process data for scatter plot
+    const chartData = data.map(item => ({
+        x: item.income,
+        y: item.risk_rating
+    }));
+    
+    const ctx = document.getElementById('riskByIncomeChart').getContext('2d');
+    new Chart(ctx, {
+        type: 'scatter',
+        data: {
+            datasets: [{
+                label: 'Risk Rating vs. Annual Income',
+                data: chartData,
+                backgroundColor: 'rgba(54, 162, 235, 0.7)',
+                borderColor: 'rgba(54, 162, 235, 1)',
+                borderWidth: 1,
+                pointRadius: 6,
+                pointHoverRadius: 8
+            }]
+        },
+        options: {
+            responsive: true,
+            scales: {
+                x: {
+                    title: {
+                        display: true,
+                        text: 'Annual Income ($)'
+                    },
+                    ticks: {
+                        // Format income as currency
+                        callback: function(value) {
+                            return '$' + value.toLocaleString();
                         }
+                    }
+                },
+                y: {
+                    title: {
+                        display: true,
+                        text: 'Risk Rating (1-10)'
                     },
-                    plugins: {
-                        title: {
-                            display: true,
-                            text: 'Risk Rating vs. Income'
-                        },
-                        tooltip: {
-                            callbacks: {
-                                label: function(context) {
-                                    return `Income: $${context.parsed.x.toLocaleString()}, Risk: ${context.parsed.y}`;
-                                }
-                            }
+                    min: 0,
+                    max: 10,
+                    ticks: {
+                        stepSize: 1
+                    }
+                }
+            },
+            plugins: {
+                title: {
+                    display: true,
+                    text: 'Risk Rating vs. Income'
+                },
+                tooltip: {
+                    callbacks: {
+                        label: function(context) {
+                            return `Income: $${context.parsed.x.toLocaleString()}, Risk: ${context.parsed.y}`;
                         }
                     }
                 }
-            });
-        })
-        .catch(error => console.error('Error loading risk by income data:', error));
+            }
+        }
+    });
 }
 
-// Load risk by credit score chart
-function loadRiskByCreditScoreChart() {
-    fetch('/api/risk_by_credit_score')
-        .then(response => response.json())
-        .then(data => {
-            const ctx = document.getElementById('riskByCreditScoreChart').getContext('2d');
-            new Chart(ctx, {
-                type: 'bar',
-                data: {
-                    labels: data.labels,
-                    datasets: [{
-                        label: 'Average Risk Rating',
-                        data: data.data,
-                        backgroundColor: 'rgba(153, 102, 255, 0.7)',
-                        borderColor: 'rgba(153, 102, 255, 1)',
-                        borderWidth: 1
-                    }]
+// Render risk by credit score chart
+function renderRiskByCreditScoreChart(data) {
+    const ctx = document.getElementById('riskByCreditScoreChart').getContext('2d');
+    new Chart(ctx, {
+        type: 'bar',
+        data: {
+            labels: data.labels,
+            datasets: [{
+                label: 'Average Risk Rating',
+                data: data.data,
+                backgroundColor: 'rgba(153, 102, 255, 0.7)',
+                borderColor: 'rgba(153, 102, 255, 1)',
+                borderWidth: 1
+            }]
+        },
+        options: {
+            responsive: true,
+            scales: {
+                y: {
+                    beginAtZero: true,
+                    max: 10,
+                    title: {
+                        display: true,
+                        text: 'Risk Rating (1-10)'
+                    }
                 },
-                options: {
-                    responsive: true,
-                    scales: {
-                        y: {
-                            beginAtZero: true,
-                            max: 10,
-                            title: {
-                                display: true,
-                                text: 'Risk Rating (1-10)'
-                            }
-                        },
-                        x: {
-                            title: {
-                                display: true,
-                                text: 'Credit Score Range'
-                            }
-                        }
-                    },
-                    plugins: {
-                        title: {
-                            display: true,
-                            text: 'Average Risk Rating by Credit Score Range'
-                        },
-                        tooltip: {
-                            callbacks: {
-                                label: function(context) {
-                                    const index = context.dataIndex;
-                                    return [
-                                        `Risk Rating: ${context.parsed.y.toFixed(1)}`,
-                                        `Sample Size: ${data.counts[index]} applications`
-                                    ];
-                                }
-                            }
+                x: {
+                    title: {
+                        display: true,
+                        text: 'Credit Score Range'
+                    }
+                }
+            },
+            plugins: {
+                title: {
+                    display: true,
+                    text: 'Average Risk Rating by Credit Score Range'
+                },
+                tooltip: {
+                    callbacks: {
+                        label: function(context) {
+                            const index = context.dataIndex;
+                            return [
+                                `Risk Rating: ${context.parsed.y.toFixed(1)}`,
+                                `Sample Size: ${data.counts[index]} applications`
+                            ];
                         }
                     }
                 }
-            });
-        })
-        .catch(error => console.error('Error loading risk by credit score data:', error));
+            }
+        }
+    });
 }
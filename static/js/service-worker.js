@@ -1,5 +1,5 @@
 // Service Worker for offline capabilities
-const CACHE_NAME = 'credit-risk-app-v1';
+const CACHE_NAME = 'credit-risk-app-v2';
 const urlsToCache = [
     '/',
     '/static/css/custom.css',
@@ -0,0 +1,319 @@
+"""
+Pre-aggregated summary tables for the reports and insights dashboards.
+
+Every application contributes one counter row per summary dimension (its
+credit score band, income bracket, risk category, ...) in the
+application_summary table, keyed by owner, creation day, band and status.
+Writers call the record_* helpers inside their own transaction, so the
+counters commit or roll back together with the applications themselves, and
+dashboards read a few rows per bucket instead of scanning every application.
+
+rebuild_summaries() recomputes the table from the raw rows; run
+rebuild_summaries.py after upgrading a database that predates it.
+"""
+
+import logging
+from collections import defaultdict
+from datetime import datetime
+
+from sqlalchemy import select, delete, update, insert
+
+from app import db
+from models import LoanApplication, RiskAssessment, ApplicationSummary
+
+logger = logging.getLogger(__name__)
+
+# Columns identifying one summary row
+SUMMARY_KEY_COLUMNS = ['user_id', 'day', 'dimension', 'band', 'status']
+
+# Counters accumulated per summary row
+SUMMARY_VALUE_COLUMNS = ['application_count', 'assessed_count', 'risk_rating_sum', 'loan_amount_sum', 'credit_score_sum']
+
+# Applications read per round trip by rebuild_summaries
+REBUILD_CHUNK_SIZE = 10000
+
+# Band label of the unbucketed per-status dimension
+ALL_BAND = 'all'
+
+
+class SummaryDimension:
+    """
+    A way of bucketing applications for the summary tables
+
+    Bands are (label, lower, upper) with lower inclusive and upper exclusive;
+    None leaves that side open. Values outside every band are not counted,
+    matching the dashboards that skip out-of-range credit scores.
+    """
+
+    def __init__(self, name, field=None, bands=None):
+        self.name = name
+        self.field = field
+        self.bands = bands
+
+    @property
+    def labels(self):
+        return [label for label, _, _ in self.bands] if self.bands else [ALL_BAND]
+
+    def band_for(self, fact):
+        """Band label for an application fact, or None if it is not counted"""
+        if self.field is None:
+            return ALL_BAND
+
+        value = fact[self.field]
+        if value is None:
+            return None
+
+        for label, lower, upper in self.bands:
+            if (lower is None or value >= lower) and (upper is None or value < upper):
+                return label
+        return None
+
+
+STATUS_DIMENSION = SummaryDimension('status')
+
+REPORT_CREDIT_SCORE_DIMENSION = SummaryDimension('report_credit_score', 'credit_score', [
+    ('300-549', 300, 550),
+    ('550-649', 550, 650),
+    ('650-749', 650, 750),
+    ('750-850', 750, 851)
+])
+
+ADMIN_CREDIT_SCORE_DIMENSION = SummaryDimension('admin_credit_score', 'credit_score', [
+    ('300-579 (Poor)', 300, 580),
+    ('580-669 (Fair)', 580, 670),
+    ('670-739 (Good)', 670, 740),
+    ('740-850 (Excellent)', 740, 851)
+])
+
+INCOME_DIMENSION = SummaryDimension('income', 'annual_income', [
+    ('Under $25K', None, 25000),
+    ('$25K-$50K', 25000, 50000),
+    ('$50K-$75K', 50000, 75000),
+    ('$75K-$100K', 75000, 100000),
+    ('Over $100K', 100000, None)
+])
+
+RISK_CATEGORY_DIMENSION = SummaryDimension('risk_category', 'risk_rating', [
+    ('Low Risk', None, 4),
+    ('Medium Risk', 4, 8),
+    ('High Risk', 8, None)
+])
+
+SUMMARY_DIMENSIONS = [
+    STATUS_DIMENSION,
+    REPORT_CREDIT_SCORE_DIMENSION,
+    ADMIN_CREDIT_SCORE_DIMENSION,
+    INCOME_DIMENSION,
+    RISK_CATEGORY_DIMENSION
+]
+
+
+def application_fact(user_id, created_at, status, credit_score, annual_income, loan_amount, risk_rating=None):
+    """
+    Collect the fields the summary dimensions need from one application
+
+    Parameters:
+    - risk_rating: Rating from the application's risk assessment, or None if
+      it has not been assessed
+
+    Returns:
+    - fact: Dictionary consumed by summary_deltas
+    """
+    return {
+        'user_id': user_id,
+        'day': (created_at or datetime.utcnow()).date(),
+        'status': status or 'Pending',
+        'credit_score': credit_score,
+        'annual_income': annual_income,
+        'loan_amount': loan_amount,
+        'risk_rating': risk_rating
+    }
+
+
+def fact_for_application(application, status=None, risk_rating=None):
+    """
+    Build the summary fact for a LoanApplication
+
+    Parameters:
+    - status: Status to count the application under instead of its current one
+    - risk_rating: Rating of an assessment not yet attached to the application;
+      defaults to the loaded risk_assessment relationship
+    """
+    if risk_rating is None and application.risk_assessment is not None:
+        risk_rating = application.risk_assessment.risk_rating
+
+    return application_fact(
+        application.user_id,
+        application.created_at,
+        status if status is not None else application.status,
+        application.credit_score,
+        application.annual_income,
+        application.loan_amount,
+        risk_rating
+    )
+
+
+def summary_deltas(facts, sign=1, deltas=None):
+    """
+    Accumulate counter changes for a set of application facts
+
+    Parameters:
+    - facts: Iterable of application_fact dictionaries
+    - sign: 1 to add the applications, -1 to remove them
+    - deltas: Optional dictionary to accumulate into
+
+    Returns:
+    - deltas: Dictionary mapping summary key tuples to counter lists
+    """
+    if deltas is None:
+        deltas = defaultdict(lambda: [0, 0, 0, 0.0, 0])
+
+    for fact in facts:
+        assessed = fact['risk_rating'] is not None
+        for dimension in SUMMARY_DIMENSIONS:
+            band = dimension.band_for(fact)
+            if band is None:
+                continue
+            counters = deltas[(fact['user_id'], fact['day'], dimension.name, band, fact['status'])]
+            counters[0] += sign
+            counters[1] += sign if assessed else 0
+            counters[2] += sign * fact['risk_rating'] if assessed else 0
+            counters[3] += sign * fact['loan_amount']
+            counters[4] += sign * fact['credit_score']
+
+    return deltas
+
+
+def _delta_rows(deltas):
+    """Turn accumulated deltas into parameter dictionaries, dropping no-ops"""
+    rows = []
+    for key, counters in deltas.items():
+        if not any(counters):
+            continue
+        row = dict(zip(SUMMARY_KEY_COLUMNS, key))
+        row.update(zip(SUMMARY_VALUE_COLUMNS, counters))
+        rows.append(row)
+    return rows
+
+
+def _dialect_insert():
+    """Return the dialect's INSERT construct if it supports ON CONFLICT, else None"""
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        return None
+    return dialect_insert
+
+
+def apply_summary_deltas(deltas):
+    """
+    Add accumulated deltas to the summary table in the current transaction
+
+    Uses INSERT ... ON CONFLICT DO UPDATE where available so concurrent
+    writers increment the same row atomically; other databases fall back to
+    UPDATE-then-INSERT per row. The caller commits.
+    """
+    rows = _delta_rows(deltas)
+    if not rows:
+        return
+
+    dialect_insert = _dialect_insert()
+    table = ApplicationSummary.__table__
+
+    if dialect_insert is not None:
+        stmt = dialect_insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=SUMMARY_KEY_COLUMNS,
+            set_={column: table.c[column] + stmt.excluded[column] for column in SUMMARY_VALUE_COLUMNS}
+        )
+        db.session.execute(stmt, rows)
+        return
+
+    for row in rows:
+        result = db.session.execute(
+            update(table)
+            .where(*[table.c[column] == row[column] for column in SUMMARY_KEY_COLUMNS])
+            .values({column: table.c[column] + row[column] for column in SUMMARY_VALUE_COLUMNS})
+        )
+        if result.rowcount == 0:
+            db.session.execute(insert(table), [row])
+
+
+def record_application(application, risk_rating=None):
+    """Count a newly written application; the caller commits"""
+    apply_summary_deltas(summary_deltas([fact_for_application(application, risk_rating=risk_rating)]))
+
+
+def record_application_rows(application_rows, risk_ratings):
+    """
+    Count a batch of inserted applications; the caller commits
+
+    Parameters:
+    - application_rows: LoanApplication column dictionaries as inserted
+    - risk_ratings: Risk rating of each row's assessment, in the same order
+    """
+    facts = (
+        application_fact(
+            row['user_id'], row.get('created_at'), row.get('status'), row['credit_score'],
+            row['annual_income'], row['loan_amount'], risk_rating
+        )
+        for row, risk_rating in zip(application_rows, risk_ratings)
+    )
+    apply_summary_deltas(summary_deltas(facts))
+
+
+def record_status_change(application, old_status):
+    """Move an application's counts from old_status to its current status; the caller commits"""
+    if (old_status or 'Pending') == (application.status or 'Pending'):
+        return
+
+    deltas = summary_deltas([fact_for_application(application, status=old_status)], sign=-1)
+    summary_deltas([fact_for_application(application)], deltas=deltas)
+    apply_summary_deltas(deltas)
+
+
+def rebuild_summaries(chunk_size=REBUILD_CHUNK_SIZE):
+    """
+    Recompute the summary table from the loan_application rows
+
+    Reads applications in chunks of plain column tuples, so memory stays
+    bounded by the number of summary rows rather than the number of
+    applications, and replaces the table contents in one transaction.
+
+    Returns:
+    - count: Number of applications summarized
+    """
+    query = select(
+        LoanApplication.user_id,
+        LoanApplication.created_at,
+        LoanApplication.status,
+        LoanApplication.credit_score,
+        LoanApplication.annual_income,
+        LoanApplication.loan_amount,
+        RiskAssessment.risk_rating
+    ).outerjoin(
+        RiskAssessment, LoanApplication.id == RiskAssessment.loan_application_id
+    ).execution_options(yield_per=chunk_size)
+
+    deltas = None
+    count = 0
+    for partition in db.session.execute(query).partitions():
+        deltas = summary_deltas((application_fact(*row) for row in partition), deltas=deltas)
+        count += len(partition)
+
+    try:
+        db.session.execute(delete(ApplicationSummary))
+        if deltas:
+            rows = _delta_rows(deltas)
+            for start in range(0, len(rows), chunk_size):
+                db.session.execute(insert(ApplicationSummary), rows[start:start + chunk_size])
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    logger.info(f"Rebuilt application summaries from {count} applications")
+    return count
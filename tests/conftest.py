@@ -0,0 +1,71 @@
+"""
+Shared fixtures for the test suite.
+
+The app reads its configuration from the environment at import time, so the
+database, upload and model directories are pointed at a scratch directory
+before anything imports it. Each test gets freshly created tables.
+"""
+
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+import pytest
+
+SCRATCH_DIR = tempfile.mkdtemp(prefix='credit-risk-tests-')
+
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(SCRATCH_DIR, 'test.db')}"
+os.environ['BATCH_UPLOAD_DIR'] = os.path.join(SCRATCH_DIR, 'uploads')
+os.environ['ANOMALY_MODEL_DIR'] = os.path.join(SCRATCH_DIR, 'models')
+os.environ['DASHBOARD_CACHE_BACKEND'] = 'memory'
+os.environ.pop('ASSESSMENT_CACHE_PATH', None)
+
+from app import app, db  # noqa: E402
+from models import User  # noqa: E402
+from dashboard_cache import dashboard_cache  # noqa: E402
+
+SAMPLE_CSV = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'sample_loan_applications.csv')
+
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(SCRATCH_DIR, ignore_errors=True)
+
+
+@pytest.fixture
+def database():
+    """Application context with empty tables"""
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        dashboard_cache.invalidate_all()
+        try:
+            yield db
+        finally:
+            db.session.remove()
+
+
+@pytest.fixture
+def user(database):
+    """A saved customer account"""
+    account = User(username='alice', email='alice@example.com', role='customer')
+    account.set_password('password')
+    db.session.add(account)
+    db.session.commit()
+    return account
+
+
+def application_frame(rows=60, seed=0):
+    """Random but valid application data with the CSV columns"""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'loan_amount': rng.uniform(1000, 50000, rows).round(2),
+        'loan_term': rng.choice([12, 24, 36, 60], rows),
+        'credit_score': rng.integers(400, 850, rows),
+        'annual_income': rng.uniform(20000, 200000, rows).round(2),
+        'monthly_expenses': rng.uniform(500, 5000, rows).round(2),
+        'existing_debt': rng.uniform(0, 50000, rows).round(2),
+        'employment_status': rng.choice(['full_time', 'part_time', 'self_employed', 'unemployed'], rows),
+        'loan_purpose': 'business'
+    })
@@ -0,0 +1,119 @@
+"""Tests for assessment cache keys and cached scoring"""
+
+import pandas as pd
+import pytest
+
+from risk_engine import (
+    CreditRiskEngine, assessment_keys, ENGINE_VERSION, RNG_STRATEGY, NOISE_INPUT_COLUMNS, _SMALL_HASH_ROWS
+)
+from scoring_tables import get_scoring_table
+from cache_backends import MemoryCacheBackend, SQLiteCacheBackend
+from assessment_cache import AssessmentCache
+
+from conftest import application_frame
+
+
+def keys_for(df, **kwargs):
+    return assessment_keys(
+        *(df[column].to_numpy() for column in NOISE_INPUT_COLUMNS), df['employment_status'].to_numpy(), **kwargs
+    )
+
+
+def application(**overrides):
+    data = {
+        'loan_amount': 25000.0, 'loan_term': 36, 'credit_score': 690, 'annual_income': 72000.0,
+        'monthly_expenses': 1800.0, 'existing_debt': 9000.0, 'employment_status': 'full_time',
+        'loan_purpose': 'business'
+    }
+    data.update(overrides)
+    return data
+
+
+def test_keys_ignore_numeric_types():
+    as_floats = application_frame(5)
+    as_ints = as_floats.copy()
+    as_ints['loan_amount'] = as_ints['loan_amount'].round().astype(int)
+    as_floats['loan_amount'] = as_ints['loan_amount'].astype(float)
+
+    assert keys_for(as_floats) == keys_for(as_ints)
+
+
+def test_small_and_vectorized_hashing_agree():
+    df = application_frame(_SMALL_HASH_ROWS * 3)
+
+    batch_keys = keys_for(df)
+    small_keys = [key for start in range(0, len(df), 4) for key in keys_for(df.iloc[start:start + 4])]
+
+    assert batch_keys == small_keys
+
+
+def test_a_rows_key_does_not_depend_on_the_rest_of_the_batch():
+    df = application_frame(40)
+
+    assert keys_for(df)[7] == keys_for(df.iloc[[7]])[0] == keys_for(df.iloc[::-1])[32]
+
+
+def test_every_scoring_input_changes_the_key():
+    base = keys_for(pd.DataFrame([application()]))[0]
+    changed = [
+        application(**{column: application()[column] + 1}) for column in NOISE_INPUT_COLUMNS
+    ] + [application(employment_status='part_time')]
+
+    keys = {keys_for(pd.DataFrame([data]))[0] for data in changed}
+
+    assert base not in keys
+    assert len(keys) == len(changed)
+
+
+def test_keys_carry_the_engine_table_and_noise_versions():
+    df = pd.DataFrame([application()])
+    table = get_scoring_table()
+
+    key = keys_for(df, table=table)[0]
+
+    assert key.startswith(f"{ENGINE_VERSION}:{table.version}:{RNG_STRATEGY}:")
+    assert keys_for(df, strategy='none' if RNG_STRATEGY == 'hashed' else 'hashed')[0] != key
+    assert keys_for(df, table=table)[0] == key
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return AssessmentCache(
+        MemoryCacheBackend(100), SQLiteCacheBackend(str(tmp_path / 'assessments.db'), 100), bulk=True
+    )
+
+
+def test_cached_assessment_matches_the_engine(cache):
+    direct = CreditRiskEngine.assess_loan_application(application())
+
+    first = cache.assess(application())
+    second = cache.assess(application())
+
+    for result in (first, second):
+        assert {k: v for k, v in result.items() if k != 'timestamp'} == \
+            {k: v for k, v in direct.items() if k != 'timestamp'}
+    assert cache.stats.snapshot()['memory_hits'] == 1
+
+
+def test_persistent_tier_serves_a_cold_process(cache):
+    cache.assess(application())
+    cold = AssessmentCache(MemoryCacheBackend(100), cache.persistent, bulk=True)
+
+    cold.assess(application())
+
+    assert cold.stats.snapshot()['persistent_hits'] == 1
+
+
+def test_batch_scores_match_direct_scoring_with_repeats(cache):
+    df = application_frame(12)
+    df = pd.concat([df, df.iloc[:4]], ignore_index=True)
+
+    cached = cache.score_batch(df)
+    again = cache.score_batch(df)
+    direct = CreditRiskEngine.score_batch_parallel(df)
+
+    for scores in (cached, again):
+        pd.testing.assert_frame_equal(scores[direct.columns], direct, check_dtype=False)
+    stats = cache.stats.snapshot()
+    assert stats['batch_duplicates'] == 8
+    assert stats['sets'] == 12
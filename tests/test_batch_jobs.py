@@ -0,0 +1,156 @@
+"""Tests for claiming, running and requeueing background upload jobs"""
+
+import os
+import shutil
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import update
+
+import batch_jobs
+from app import db
+from models import BatchJob, LoanApplication
+from batch_jobs import (
+    claim_job, claim_next_job, process_job, requeue_stale_jobs, load_job_result, _update_job, _start_heartbeat
+)
+
+from conftest import SAMPLE_CSV
+
+
+@pytest.fixture
+def queue_job(user):
+    """Insert a queued job for a copy of the sample CSV"""
+    os.makedirs(batch_jobs.UPLOAD_DIR, exist_ok=True)
+    created = []
+
+    def queue(created_at=None):
+        file_path = os.path.join(batch_jobs.UPLOAD_DIR, f'job-{len(created)}.csv')
+        shutil.copy(SAMPLE_CSV, file_path)
+        job = BatchJob(
+            user_id=user.id, filename='sample.csv', file_path=file_path, status='queued',
+            created_at=created_at or datetime.utcnow()
+        )
+        db.session.add(job)
+        db.session.commit()
+        created.append(job.id)
+        return job
+
+    return queue
+
+
+def job_row(job_id):
+    db.session.expire_all()
+    return db.session.get(BatchJob, job_id)
+
+
+def make_stale(job_id, minutes=batch_jobs.STALE_JOB_MINUTES + 1):
+    db.session.execute(
+        update(BatchJob).where(BatchJob.id == job_id)
+        .values(updated_at=datetime.utcnow() - timedelta(minutes=minutes))
+    )
+    db.session.commit()
+
+
+def test_a_job_can_only_be_claimed_once(queue_job):
+    job = queue_job()
+
+    worker_id = claim_job(job.id)
+
+    assert worker_id is not None
+    assert claim_job(job.id) is None
+    row = job_row(job.id)
+    assert (row.status, row.stage, row.worker_id) == ('running', 'parsing', worker_id)
+
+
+def test_claim_next_job_takes_the_oldest_queued_job(queue_job):
+    newer = queue_job(created_at=datetime.utcnow())
+    older = queue_job(created_at=datetime.utcnow() - timedelta(minutes=5))
+
+    first = claim_next_job()
+    second = claim_next_job()
+
+    assert [first[0], second[0]] == [older.id, newer.id]
+    assert claim_next_job() is None
+
+
+def test_updates_are_limited_to_the_owning_worker(queue_job):
+    job = queue_job()
+    worker_id = claim_job(job.id)
+
+    assert _update_job(job.id, worker_id, stage='scoring')
+    assert not _update_job(job.id, 'another-worker', stage='saving')
+    assert job_row(job.id).stage == 'scoring'
+
+
+def test_process_job_completes_and_removes_the_upload(queue_job):
+    job = queue_job()
+    file_path = job.file_path
+
+    process_job(job.id, claim_job(job.id))
+
+    row = job_row(job.id)
+    assert row.status == 'completed'
+    assert row.rows_processed == row.rows_total == 10
+    assert load_job_result(row)['total'] == 10
+    assert LoanApplication.query.count() == 10
+    assert not os.path.exists(file_path)
+
+
+def test_a_worker_that_lost_the_job_leaves_it_alone(queue_job):
+    job = queue_job()
+    claim_job(job.id)
+
+    process_job(job.id, 'previous-owner')
+
+    assert job_row(job.id).status == 'running'
+    assert os.path.exists(job.file_path)
+
+
+def test_stale_jobs_are_requeued_only_before_saving(queue_job):
+    scoring, saving, analyzing = queue_job(), queue_job(), queue_job()
+    for job, stage in ((scoring, 'scoring'), (saving, 'saving'), (analyzing, 'analyzing')):
+        _update_job(job.id, claim_job(job.id), stage=stage, rows_processed=4)
+        make_stale(job.id)
+
+    assert requeue_stale_jobs() == 1
+
+    requeued = job_row(scoring.id)
+    assert (requeued.status, requeued.worker_id, requeued.rows_processed) == ('queued', None, 0)
+    assert os.path.exists(scoring.file_path)
+    for job in (saving, analyzing):
+        row = job_row(job.id)
+        assert row.status == 'failed'
+        assert '4 row(s) may already have been saved' in row.error
+        assert not os.path.exists(job.file_path)
+
+
+def test_requeued_job_runs_once_with_a_new_claim(queue_job):
+    job = queue_job()
+    old_worker = claim_job(job.id)
+    make_stale(job.id)
+    requeue_stale_jobs()
+
+    new_worker = claim_job(job.id)
+    process_job(job.id, new_worker)
+
+    assert new_worker != old_worker
+    assert not _update_job(job.id, old_worker, stage='scoring')
+    assert job_row(job.id).status == 'completed'
+    assert LoanApplication.query.count() == 10
+
+
+def test_heartbeat_keeps_a_running_job_from_going_stale(queue_job, monkeypatch):
+    monkeypatch.setattr(batch_jobs, 'HEARTBEAT_SECONDS', 0.05)
+    job = queue_job()
+    worker_id = claim_job(job.id)
+    make_stale(job.id)
+
+    stop = _start_heartbeat(job.id, worker_id)
+    try:
+        time.sleep(0.3)
+        assert requeue_stale_jobs() == 0
+    finally:
+        stop.set()
+
+    assert job_row(job.id).status == 'running'
@@ -0,0 +1,86 @@
+"""Tests for batched persistence of scored uploads"""
+
+from app import db
+from models import LoanApplication, RiskAssessment
+from risk_engine import CreditRiskEngine
+from bulk_persistence import persist_assessments, ChunkPersister
+
+from conftest import application_frame
+
+
+def scored_rows(rows=10, seed=0):
+    return CreditRiskEngine.process_dataframe(application_frame(rows, seed))
+
+
+def saved_pairs():
+    return db.session.query(LoanApplication.id, RiskAssessment.risk_rating)\
+        .join(RiskAssessment, RiskAssessment.loan_application_id == LoanApplication.id)\
+        .order_by(LoanApplication.id).all()
+
+
+def test_batches_insert_applications_with_their_assessments(user):
+    assessments = scored_rows(10)
+    progress = []
+
+    result = persist_assessments(user.id, assessments, batch_size=4, on_batch=progress.append)
+
+    assert progress == [4, 8, 10]
+    assert result['processed'] == result['saved'] == 10
+    assert result['failures'] == []
+    assert sum(result['status_counts'].values()) == 10
+    assert [rating for _, rating in saved_pairs()] == [a['risk_rating'] for a in assessments]
+    assert [summary['id'] for summary in result['summaries']] == [row_id for row_id, _ in saved_pairs()]
+
+
+def test_fallback_without_insert_returning(user, monkeypatch):
+    dialect = db.session.get_bind().dialect
+    monkeypatch.setattr(dialect, 'insert_executemany_returning_sort_by_parameter_order', False)
+    assessments = scored_rows(7)
+
+    result = persist_assessments(user.id, assessments, batch_size=3)
+
+    assert result['saved'] == 7
+    assert [rating for _, rating in saved_pairs()] == [a['risk_rating'] for a in assessments]
+
+
+def test_failed_batch_is_retried_row_by_row(user):
+    assessments = scored_rows(10)
+    # loan_purpose is NOT NULL, so this row fails and takes its batch down with it
+    assessments[5]['application_data']['loan_purpose'] = None
+
+    result = persist_assessments(user.id, assessments, batch_size=4)
+
+    assert result['processed'] == 10
+    assert result['saved'] == 9
+    assert [failure['row'] for failure in result['failures']] == [6]
+    assert result['summaries'][5]['id'] is None
+    assert result['summaries'][5]['error']
+    assert LoanApplication.query.count() == RiskAssessment.query.count() == 9
+    expected = [a['risk_rating'] for i, a in enumerate(assessments) if i != 5]
+    assert [rating for _, rating in saved_pairs()] == expected
+
+
+def test_summaries_are_capped_but_counts_cover_every_row(user):
+    assessments = scored_rows(10)
+    assessments[8]['application_data']['loan_purpose'] = None
+
+    result = persist_assessments(user.id, assessments, batch_size=4, max_summaries=3)
+
+    assert len(result['summaries']) == 3
+    assert result['saved'] == 9
+    assert sum(result['status_counts'].values()) == 9
+    assert [failure['row'] for failure in result['failures']] == [9]
+
+
+def test_chunk_persister_numbers_failures_across_chunks(user):
+    df = application_frame(6)
+    persister = ChunkPersister(user.id, batch_size=2)
+    assert persister(df.iloc[:3], CreditRiskEngine.score_batch(df.iloc[:3])) == 0
+
+    second = df.iloc[3:].copy()
+    second['loan_purpose'] = [None, 'business', 'business']
+    assert persister(second, CreditRiskEngine.score_batch(second)) == 1
+
+    assert persister.rows_seen == 6
+    assert [failure['row'] for failure in persister.failures] == [4]
+    assert LoanApplication.query.count() == 5
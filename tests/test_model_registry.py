@@ -0,0 +1,90 @@
+"""Tests for CURRENT switching and garbage collection of anomaly model bundles"""
+
+import os
+import time
+
+import pytest
+
+import model_store
+from model_registry import ModelRegistry
+from model_store import collect_garbage, current_version, list_versions, CURRENT_POINTER, TEMP_PREFIX
+
+from conftest import application_frame
+
+
+@pytest.fixture
+def model_dir(tmp_path):
+    return str(tmp_path / 'models')
+
+
+@pytest.fixture(scope='module')
+def training_frame():
+    return application_frame(60)
+
+
+def test_empty_directory_has_no_models(model_dir):
+    registry = ModelRegistry(model_dir)
+
+    assert registry.current() is None
+    assert registry.detector().bundle is None
+
+
+def test_other_workers_follow_current(model_dir, training_frame):
+    trainer, reader = ModelRegistry(model_dir), ModelRegistry(model_dir)
+
+    first, _ = trainer.train(training_frame)
+    assert reader.current().version == first.bundle.version
+    assert reader.current() is reader.current()
+
+    second, _ = trainer.train(training_frame)
+    assert current_version(model_dir) == second.bundle.version
+    assert reader.current().version == second.bundle.version
+    assert trainer.current().isolation_forest is second.isolation_forest
+
+    assert reader.stats.snapshot()['loads'] == 2
+    assert trainer.stats.snapshot()['loads'] == 0
+    assert trainer.stats.snapshot()['publishes'] == 2
+
+
+def test_a_broken_current_keeps_the_loaded_models(model_dir, training_frame):
+    trained, _ = ModelRegistry(model_dir).train(training_frame)
+    reader = ModelRegistry(model_dir)
+    assert reader.current().version == trained.bundle.version
+
+    os.remove(os.path.join(model_dir, CURRENT_POINTER))
+    with open(os.path.join(model_dir, CURRENT_POINTER), 'w') as pointer:
+        pointer.write('missing-version')
+
+    assert reader.current().version == trained.bundle.version
+    assert reader.stats.snapshot()['load_errors'] == 1
+
+
+def test_garbage_collection_keeps_recent_and_current_bundles(model_dir, training_frame):
+    registry = ModelRegistry(model_dir)
+    versions = [registry.train(training_frame)[0].bundle.version for _ in range(3)]
+    assert list_versions(model_dir) == versions
+
+    stale_temp = os.path.join(model_dir, f'{TEMP_PREFIX}abandoned')
+    fresh_temp = os.path.join(model_dir, f'{TEMP_PREFIX}in-progress')
+    os.makedirs(stale_temp)
+    os.makedirs(fresh_temp)
+    old = time.time() - model_store.STALE_TEMP_SECONDS - 60
+    os.utime(stale_temp, (old, old))
+
+    removed = collect_garbage(model_dir, retention=2)
+
+    assert sorted(removed) == sorted([versions[0], os.path.basename(stale_temp)])
+    assert list_versions(model_dir) == versions[1:]
+    assert os.path.isdir(fresh_temp)
+
+
+def test_garbage_collection_never_removes_current(model_dir, training_frame):
+    registry = ModelRegistry(model_dir)
+    versions = [registry.train(training_frame)[0].bundle.version for _ in range(2)]
+    # Roll back to the older bundle
+    model_store._write_pointer(model_dir, versions[0])
+
+    collect_garbage(model_dir, retention=0)
+
+    assert list_versions(model_dir) == [versions[0]]
+    assert ModelRegistry(model_dir).current().version == versions[0]
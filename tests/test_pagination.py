@@ -0,0 +1,82 @@
+"""Tests for keyset pagination over tied sort keys"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import db
+from models import LoanApplication
+from pagination import keyset_paginate, encode_cursor, decode_cursor, InvalidCursor
+
+
+@pytest.fixture
+def applications(user):
+    """Applications whose timestamps and amounts repeat, inserted out of order"""
+    start = datetime(2025, 1, 1, 12, 0, 0)
+    for i in range(23):
+        db.session.add(LoanApplication(
+            user_id=user.id, loan_amount=[5000.0, 10000.0, 2500.0][i % 3], loan_purpose='business',
+            loan_term=36, age=30, annual_income=60000, monthly_expenses=1500, credit_score=700,
+            existing_debt=5000, employment_status='full_time', status='Pending',
+            created_at=start + timedelta(minutes=(i * 7) % 4)
+        ))
+    db.session.commit()
+    return LoanApplication.query.all()
+
+
+def expected_order(applications, sort_by, order):
+    ordered = sorted(applications, key=lambda application: (getattr(application, sort_by), application.id))
+    return [application.id for application in (ordered[::-1] if order == 'desc' else ordered)]
+
+
+def page(sort_by, order, **cursor):
+    return keyset_paginate(LoanApplication.query, sort_by, order, per_page=5, **cursor)
+
+
+@pytest.mark.parametrize('sort_by', ['created_at', 'loan_amount'])
+@pytest.mark.parametrize('order', ['asc', 'desc'])
+def test_walking_forward_and_back_visits_every_row_once(applications, sort_by, order):
+    expected = expected_order(applications, sort_by, order)
+
+    pages = [page(sort_by, order)]
+    while pages[-1].has_next:
+        pages.append(page(sort_by, order, after=pages[-1].next_cursor))
+
+    assert [application.id for current in pages for application in current] == expected
+    assert [len(current) for current in pages] == [5, 5, 5, 5, 3]
+    assert not pages[0].has_prev
+
+    backwards = [pages[-1]]
+    while backwards[-1].has_prev:
+        backwards.append(page(sort_by, order, before=backwards[-1].prev_cursor))
+
+    assert [[a.id for a in current] for current in backwards[::-1]] == [[a.id for a in current] for current in pages]
+    assert backwards[-1].has_next
+
+
+def test_unknown_sort_falls_back_to_created_at(applications):
+    assert [a.id for a in page('age', 'asc')] == expected_order(applications, 'created_at', 'asc')[:5]
+
+
+def test_filters_are_kept_across_pages(applications):
+    query = LoanApplication.query.filter(LoanApplication.loan_amount == 10000.0)
+
+    first = keyset_paginate(query, 'created_at', 'asc', per_page=4)
+    second = keyset_paginate(query, 'created_at', 'asc', per_page=4, after=first.next_cursor)
+
+    ids = [a.id for a in first] + [a.id for a in second]
+    assert ids == [i for i in expected_order(applications, 'created_at', 'asc')
+                   if db.session.get(LoanApplication, i).loan_amount == 10000.0]
+    assert not second.has_next
+
+
+def test_cursors_round_trip():
+    moment = datetime(2025, 1, 1, 12, 30, 15, 250)
+    assert decode_cursor(encode_cursor(moment, 7)) == (moment, 7)
+    assert decode_cursor(encode_cursor(2500.0, 3)) == (2500.0, 3)
+
+
+@pytest.mark.parametrize('cursor', ['not-a-cursor', '', encode_cursor(1, 2)[:-3]])
+def test_malformed_cursors_are_rejected(cursor):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(cursor)
@@ -0,0 +1,122 @@
+"""Tests that summary table deltas match a rebuild from the raw applications"""
+
+from datetime import datetime, timedelta
+
+from app import db
+from models import LoanApplication, RiskAssessment, ApplicationSummary
+from bulk_persistence import persist_assessments
+from risk_engine import CreditRiskEngine
+from summary_tables import (
+    record_application, record_status_change, rebuild_summaries, SUMMARY_KEY_COLUMNS, SUMMARY_VALUE_COLUMNS
+)
+
+from conftest import application_frame
+
+
+def summary_snapshot():
+    """Non-zero summary rows keyed by their summary key"""
+    snapshot = {}
+    for row in ApplicationSummary.query.all():
+        counters = tuple(round(getattr(row, column), 6) for column in SUMMARY_VALUE_COLUMNS)
+        if any(counters):
+            snapshot[tuple(getattr(row, column) for column in SUMMARY_KEY_COLUMNS)] = counters
+    return snapshot
+
+
+def apply_for_loan(user, credit_score, annual_income, loan_amount, risk_rating=None, created_at=None):
+    """Write an application the way the apply view does"""
+    application = LoanApplication(
+        user_id=user.id, loan_amount=loan_amount, loan_purpose='business', loan_term=36, age=30,
+        annual_income=annual_income, monthly_expenses=1500, credit_score=credit_score, existing_debt=5000,
+        employment_status='full_time', status='Pending', created_at=created_at or datetime.utcnow()
+    )
+    db.session.add(application)
+    db.session.flush()
+    if risk_rating is not None:
+        db.session.add(RiskAssessment(
+            loan_application_id=application.id, probability_of_default=0.1, loss_given_default=0.4,
+            exposure_at_default=loan_amount, expected_loss=0.04 * loan_amount, risk_rating=risk_rating,
+            recommendation='Review'
+        ))
+    record_application(application, risk_rating=risk_rating)
+    db.session.commit()
+    return application
+
+
+def decide(application, status):
+    """Change a status the way the staff decision view does"""
+    old_status = application.status
+    application.status = status
+    record_status_change(application, old_status)
+    db.session.commit()
+
+
+def assert_matches_rebuild():
+    incremental = summary_snapshot()
+    rebuild_summaries()
+    assert incremental == summary_snapshot()
+    return incremental
+
+
+def test_apply_adds_one_row_per_dimension(user):
+    apply_for_loan(user, credit_score=700, annual_income=60000, loan_amount=10000, risk_rating=3)
+
+    snapshot = assert_matches_rebuild()
+
+    day = datetime.utcnow().date()
+    assert snapshot[(user.id, day, 'status', 'all', 'Pending')] == (1, 1, 3, 10000.0, 700)
+    assert snapshot[(user.id, day, 'income', '$50K-$75K', 'Pending')] == (1, 1, 3, 10000.0, 700)
+    assert snapshot[(user.id, day, 'risk_category', 'Low Risk', 'Pending')] == (1, 1, 3, 10000.0, 700)
+
+
+def test_unassessed_and_out_of_range_applications(user):
+    apply_for_loan(user, credit_score=250, annual_income=20000, loan_amount=5000)
+
+    snapshot = assert_matches_rebuild()
+
+    dimensions = {key[2] for key in snapshot}
+    assert 'report_credit_score' not in dimensions
+    assert 'risk_category' not in dimensions
+    assert snapshot[(user.id, datetime.utcnow().date(), 'status', 'all', 'Pending')] == (1, 0, 0, 5000.0, 250)
+
+
+def test_decisions_move_counts_between_statuses(user):
+    yesterday = datetime.utcnow() - timedelta(days=1)
+    first = apply_for_loan(user, credit_score=720, annual_income=90000, loan_amount=20000, risk_rating=2)
+    second = apply_for_loan(user, credit_score=560, annual_income=30000, loan_amount=40000, risk_rating=9,
+                            created_at=yesterday)
+    apply_for_loan(user, credit_score=640, annual_income=45000, loan_amount=15000, risk_rating=5)
+
+    decide(first, 'Approved')
+    decide(second, 'Rejected')
+    decide(second, 'Under Review')
+    decide(first, 'Approved')
+
+    snapshot = assert_matches_rebuild()
+
+    statuses = {key[4] for key in snapshot if key[2] == 'status'}
+    assert statuses == {'Approved', 'Under Review', 'Pending'}
+    assert snapshot[(user.id, yesterday.date(), 'status', 'all', 'Under Review')] == (1, 1, 9, 40000.0, 560)
+
+
+def test_bulk_uploads_match_the_rebuild(user):
+    assessments = CreditRiskEngine.process_dataframe(application_frame(25))
+    persist_assessments(user.id, assessments, batch_size=10)
+    apply_for_loan(user, credit_score=700, annual_income=60000, loan_amount=10000, risk_rating=3)
+
+    snapshot = assert_matches_rebuild()
+
+    assert sum(counters[0] for key, counters in snapshot.items() if key[2] == 'status') == 26
+
+
+def test_rebuild_drops_counts_of_deleted_applications(user):
+    application = apply_for_loan(user, credit_score=700, annual_income=60000, loan_amount=10000, risk_rating=3)
+    apply_for_loan(user, credit_score=610, annual_income=30000, loan_amount=8000, risk_rating=6)
+    RiskAssessment.query.filter_by(loan_application_id=application.id).delete()
+    db.session.delete(application)
+    db.session.commit()
+
+    assert rebuild_summaries() == 1
+
+    snapshot = summary_snapshot()
+    assert sum(counters[0] for key, counters in snapshot.items() if key[2] == 'status') == 1
@@ -11,10 +11,11 @@ from sklearn.ensemble import IsolationForest
 from sklearn.preprocessing import StandardScaler
 from sklearn.decomposition import PCA
 from sklearn.cluster import KMeans
-from joblib import dump, load
 import os
 import logging
 
+from model_store import ModelBundle, build_manifest, data_hash, load_current_bundle, new_version, save_bundle
+
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -26,23 +27,47 @@ class AnomalyDetector:
     identify outliers in loan application data.
     """
     
-    def __init__(self, model_dir='./models'):
+    def __init__(self, model_dir='./models', n_jobs=None, bundle=None):
         """
         Initialize the anomaly detector.
         
         Parameters:
         - model_dir: Directory to save trained models
+        - n_jobs: Number of parallel jobs for Isolation Forest fitting and scoring
+        - bundle: Optional ModelBundle of already fitted models to detect with
         """
         self.model_dir = model_dir
+        self.n_jobs = n_jobs
         self.isolation_forest = None
         self.scaler = None
         self.pca = None
         self.kmeans = None
+        self.version = None
+        self.manifest = {}
+        
+        if bundle is not None:
+            self.use_bundle(bundle)
         
         # Create model directory if it doesn't exist
         if not os.path.exists(model_dir):
             os.makedirs(model_dir)
     
+    @property
+    def bundle(self):
+        """The current models as a ModelBundle (None before training or loading)"""
+        if self.isolation_forest is None:
+            return None
+        return ModelBundle(self.scaler, self.isolation_forest, self.pca, self.kmeans, self.version, self.manifest)
+    
+    def use_bundle(self, bundle):
+        """Detect with the models of a ModelBundle"""
+        self.scaler = bundle.scaler
+        self.isolation_forest = bundle.isolation_forest
+        self.pca = bundle.pca
+        self.kmeans = bundle.kmeans
+        self.version = bundle.version
+        self.manifest = bundle.manifest
+    
     def preprocess_data(self, df):
         """
         Preprocess data for anomaly detection.
@@ -157,7 +182,8 @@ class AnomalyDetector:
                 n_estimators=min(100, max(50, len(X) * 5)),  # Scale estimators with dataset size
                 max_samples='auto',  # 'auto' uses min(256, n_samples)
                 contamination=contamination,
-                random_state=42
+                random_state=42,
+                n_jobs=self.n_jobs
             )
             self.isolation_forest.fit(X_scaled)
             
@@ -178,42 +204,15 @@ class AnomalyDetector:
             logger.error(f"Error during model training: {str(e)}")
             raise
         
-        # Save models
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         
-        dump(self.scaler, os.path.join(self.model_dir, f'scaler_{timestamp}.joblib'))
-        dump(self.isolation_forest, os.path.join(self.model_dir, f'isolation_forest_{timestamp}.joblib'))
-        dump(self.pca, os.path.join(self.model_dir, f'pca_{timestamp}.joblib'))
-        dump(self.kmeans, os.path.join(self.model_dir, f'kmeans_{timestamp}.joblib'))
-        
         # Determine anomalies using Isolation Forest
         anomaly_predictions = self.isolation_forest.predict(X_scaled)
         anomaly_indices = np.where(anomaly_predictions == -1)[0]
         anomaly_scores = self.isolation_forest.decision_function(X_scaled)
         
-        # Calculate feature importance for anomalies
-        feature_importance = {}
-        for i, feature in enumerate(feature_names):
-            # Calculate feature importance based on its contribution to anomalies
-            importance = abs(X_scaled[anomaly_indices, i].mean() - X_scaled[:, i].mean())
-            feature_importance[feature] = float(importance)
-            
-        # Normalize feature importance
-        total_importance = sum(feature_importance.values())
-        if total_importance > 0:
-            for feature in feature_importance:
-                feature_importance[feature] /= total_importance
-        
-        # Calculate cluster statistics
-        cluster_stats = {}
-        for cluster_id in range(self.kmeans.n_clusters):
-            cluster_indices = np.where(clusters == cluster_id)[0]
-            cluster_stats[f'cluster_{cluster_id}'] = {
-                'size': len(cluster_indices),
-                'percentage': len(cluster_indices) / len(X) * 100,
-                'anomaly_count': sum(1 for i in cluster_indices if i in anomaly_indices),
-                'center': self.kmeans.cluster_centers_[cluster_id].tolist()
-            }
+        # Feature importance and cluster statistics of the training anomalies
+        feature_importance, cluster_stats = self.summarize_anomalies(X_scaled, feature_names, anomaly_indices, clusters)
         
         # Prepare training results
         training_info = {
@@ -227,16 +226,74 @@ class AnomalyDetector:
             'variance_explained': self.pca.explained_variance_ratio_.tolist() if hasattr(self.pca, 'explained_variance_ratio_') else []
         }
         
+        # Save the models as one versioned bundle and make it current
+        self.version = new_version()
+        self.manifest = build_manifest(
+            self.version, feature_names, len(X), data_hash(X),
+            metrics={
+                'anomaly_count': training_info['anomaly_count'],
+                'anomaly_percentage': training_info['anomaly_percentage'],
+                'contamination': contamination,
+                'feature_importance': feature_importance,
+                'cluster_sizes': {name: stats['size'] for name, stats in cluster_stats.items()},
+                'variance_explained': training_info['variance_explained']
+            }
+        )
+        save_bundle(self.model_dir, self.bundle, self.manifest)
+        training_info['version'] = self.version
+        
         logger.info(f"Training completed. Detected {len(anomaly_indices)} anomalies ({training_info['anomaly_percentage']:.1f}%)")
         
         return training_info
     
-    def detect_anomalies(self, df):
+    def summarize_anomalies(self, X_scaled, feature_names, anomaly_indices, clusters):
+        """
+        Feature importance and cluster statistics of detected anomalies.
+        
+        Parameters:
+        - X_scaled: Scaled feature matrix
+        - feature_names: Names of its columns
+        - anomaly_indices: Rows flagged as anomalous
+        - clusters: KMeans cluster of every row
+        
+        Returns:
+        - feature_importance: Distance of each feature's mean over the anomalies
+          from its overall mean, normalized to sum to 1
+        - cluster_stats: Size, percentage, anomaly count and center of each cluster
+        """
+        if len(anomaly_indices):
+            importance = np.abs(X_scaled[anomaly_indices].mean(axis=0) - X_scaled.mean(axis=0))
+        else:
+            importance = np.zeros(len(feature_names))
+        
+        # Normalize feature importance
+        total_importance = importance.sum()
+        if total_importance > 0:
+            importance = importance / total_importance
+        feature_importance = dict(zip(feature_names, importance.tolist()))
+        
+        sizes = np.bincount(clusters, minlength=self.kmeans.n_clusters)
+        anomaly_counts = np.bincount(clusters[anomaly_indices], minlength=self.kmeans.n_clusters)
+        cluster_stats = {
+            f'cluster_{cluster_id}': {
+                'size': int(sizes[cluster_id]),
+                'percentage': float(sizes[cluster_id] / len(clusters) * 100),
+                'anomaly_count': int(anomaly_counts[cluster_id]),
+                'center': self.kmeans.cluster_centers_[cluster_id].tolist()
+            }
+            for cluster_id in range(self.kmeans.n_clusters)
+        }
+        
+        return feature_importance, cluster_stats
+    
+    def detect_anomalies(self, df, preprocessed=None):
         """
         Detect anomalies in new data.
         
         Parameters:
         - df: DataFrame with loan application data
+        - preprocessed: Optional (X, feature_names) from preprocess_data(df),
+          for callers that also need the features
         
         Returns:
         - anomaly_results: Dictionary containing detected anomalies and their scores
@@ -254,7 +311,7 @@ class AnomalyDetector:
         
         try:
             # Preprocess data
-            X, feature_names = self.preprocess_data(df)
+            X, feature_names = preprocessed if preprocessed is not None else self.preprocess_data(df)
             
             # Check if we have enough data
             if len(X) < 3:
@@ -271,12 +328,12 @@ class AnomalyDetector:
             # Scale features
             X_scaled = self.scaler.transform(X)
             
-            # Detect anomalies
-            anomaly_predictions = self.isolation_forest.predict(X_scaled)
+            # Detect anomalies; predict() would evaluate the forest a second
+            # time, and flags exactly the records with a negative score
             anomaly_scores = self.isolation_forest.decision_function(X_scaled)
             
             # Create anomaly mask (True for anomalies)
-            anomaly_mask = anomaly_predictions == -1
+            anomaly_mask = anomaly_scores < 0
             
             # Get indices of anomalies
             anomaly_indices = np.where(anomaly_mask)[0]
@@ -301,64 +358,65 @@ class AnomalyDetector:
                 'pca_explained_variance': [1.0]
             }
         
-        # Project to PCA space for visualization
-        X_pca = self.pca.transform(X_scaled)
-        
         # Get cluster assignments
         clusters = self.kmeans.predict(X_scaled)
         
-        # Prepare anomaly report
-        anomaly_records = []
-        for idx in anomaly_indices:
-            # Get the most anomalous features for this record
-            record_values = X_scaled[idx]
-            feature_scores = {}
-            
-            for i, feature in enumerate(feature_names):
-                # Calculate how unusual this value is (distance from mean in std devs)
-                z_score = abs(record_values[i])
-                feature_scores[feature] = float(z_score)
-            
-            # Sort features by anomaly contribution
-            sorted_features = sorted(
-                feature_scores.items(), 
-                key=lambda x: x[1], 
-                reverse=True
-            )
-            
-            # Extract top anomalous features
-            top_anomalous_features = {k: v for k, v in sorted_features[:3]}
-            
-            # Create anomaly record
-            anomaly_record = {
-                'index': int(idx),
-                'score': float(anomaly_scores[idx]),
-                'cluster': int(clusters[idx]),
-                'pca_coordinates': X_pca[idx].tolist(),
-                'anomalous_features': top_anomalous_features,
-                'record_values': {
-                    feature: float(X.iloc[idx][feature]) 
-                    for feature in feature_names
-                }
+        # Most anomalous first (lower score is more anomalous)
+        anomaly_indices = anomaly_indices[np.argsort(anomaly_scores[anomaly_indices], kind='stable')]
+        
+        # How unusual each value of the anomalous records is (distance from mean in std devs)
+        z_scores = np.abs(X_scaled[anomaly_indices])
+        
+        # Top anomalous features per record, ordered by z-score with ties in feature order
+        top_count = min(3, len(feature_names))
+        top_features = np.argpartition(-z_scores, top_count - 1, axis=1)[:, :top_count]
+        top_scores = np.take_along_axis(z_scores, top_features, axis=1)
+        order = np.lexsort((top_features, -top_scores), axis=1)
+        top_features = np.take_along_axis(top_features, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+        
+        # Project the anomalous records to PCA space for visualization
+        if len(anomaly_indices):
+            X_pca = self.pca.transform(X_scaled[anomaly_indices])
+        else:
+            X_pca = np.empty((0, self.pca.n_components_))
+        
+        # Prepare anomaly report from column arrays
+        top_names = np.array(feature_names, dtype=object)[top_features]
+        anomaly_records = [
+            {
+                'index': idx,
+                'score': score,
+                'cluster': cluster,
+                'pca_coordinates': pca_coordinates,
+                'anomalous_features': dict(zip(names, feature_scores)),
+                'record_values': dict(zip(feature_names, values))
             }
-            
-            anomaly_records.append(anomaly_record)
+            for idx, score, cluster, pca_coordinates, names, feature_scores, values in zip(
+                anomaly_indices.tolist(),
+                anomaly_scores[anomaly_indices].tolist(),
+                clusters[anomaly_indices].tolist(),
+                X_pca.tolist(),
+                top_names.tolist(),
+                top_scores.tolist(),
+                X.iloc[anomaly_indices].to_numpy(dtype=np.float64).tolist()
+            )
+        ]
         
-        # Sort anomalies by score (most anomalous first)
-        anomaly_records.sort(key=lambda x: x['score'])
+        # Feature importance and cluster statistics of the detected anomalies
+        feature_importance, cluster_stats = self.summarize_anomalies(X_scaled, feature_names, anomaly_indices, clusters)
         
         # Prepare results
         anomaly_results = {
             'total_records': len(df),
             'anomaly_count': len(anomaly_indices),
             'anomaly_percentage': (len(anomaly_indices) / len(df)) * 100,
-            'anomaly_threshold': self.isolation_forest.threshold_,
+            'anomaly_threshold': float(self.isolation_forest.offset_),
             'anomaly_records': anomaly_records,
             'pca_explained_variance': self.pca.explained_variance_ratio_.tolist() if hasattr(self.pca, 'explained_variance_ratio_') else [1.0],
-            'cluster_distribution': {
-                f'cluster_{i}': sum(1 for c in clusters if c == i)
-                for i in range(self.kmeans.n_clusters)
-            }
+            'cluster_distribution': {name: stats['size'] for name, stats in cluster_stats.items()},
+            'feature_importance': feature_importance,
+            'clusters': cluster_stats
         }
         
         return anomaly_results
@@ -371,26 +429,9 @@ class AnomalyDetector:
         - success: Boolean indicating if models were loaded successfully
         """
         try:
-            # Get all model files
-            isolation_forest_files = [f for f in os.listdir(self.model_dir) if f.startswith('isolation_forest_')]
-            scaler_files = [f for f in os.listdir(self.model_dir) if f.startswith('scaler_')]
-            pca_files = [f for f in os.listdir(self.model_dir) if f.startswith('pca_')]
-            kmeans_files = [f for f in os.listdir(self.model_dir) if f.startswith('kmeans_')]
-            
-            # Get latest files
-            if isolation_forest_files and scaler_files and pca_files and kmeans_files:
-                latest_isolation_forest = sorted(isolation_forest_files)[-1]
-                latest_scaler = sorted(scaler_files)[-1]
-                latest_pca = sorted(pca_files)[-1]
-                latest_kmeans = sorted(kmeans_files)[-1]
-                
-                # Load models
-                self.isolation_forest = load(os.path.join(self.model_dir, latest_isolation_forest))
-                self.scaler = load(os.path.join(self.model_dir, latest_scaler))
-                self.pca = load(os.path.join(self.model_dir, latest_pca))
-                self.kmeans = load(os.path.join(self.model_dir, latest_kmeans))
-                
-                logger.info(f"Loaded models: {latest_isolation_forest}, {latest_scaler}, {latest_pca}, {latest_kmeans}")
+            bundle = load_current_bundle(self.model_dir)
+            if bundle is not None:
+                self.use_bundle(bundle)
                 return True
             else:
                 logger.warning("No models found in directory.")
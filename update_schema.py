@@ -2,7 +2,8 @@
 Script to update the database schema with new columns for the User model
 """
 from app import db, app
-from models import User, LoanApplication, RiskAssessment
+from models import User, LoanApplication, RiskAssessment, ApplicationSummary, BatchJob
+from summary_tables import rebuild_summaries
 from sqlalchemy import inspect
 
 def add_column(engine, table_name, column):
@@ -51,6 +52,42 @@ def add_column(engine, table_name, column):
     else:
         print(f"Column {column.name} already exists in {table_name}")
 
+def add_index(engine, index):
+    """
+    Create an index if it doesn't exist
+    
+    Unique indexes are skipped with a warning when existing rows would
+    violate them, so the duplicates can be cleaned up first.
+    """
+    table_name = index.table.name
+    
+    # Get the inspector
+    inspector = inspect(engine)
+    
+    # Check if the index already exists
+    existing_indexes = [idx['name'] for idx in inspector.get_indexes(table_name)]
+    
+    if index.name in existing_indexes:
+        print(f"Index {index.name} already exists on {table_name}")
+        return
+    
+    if index.unique:
+        column_names = ', '.join(column.name for column in index.columns)
+        sql = (
+            f"SELECT COUNT(*) FROM (SELECT {column_names} FROM {table_name} "
+            f"GROUP BY {column_names} HAVING COUNT(*) > 1) AS duplicates"
+        )
+        with engine.connect() as conn:
+            duplicate_count = conn.execute(db.text(sql)).scalar()
+        
+        if duplicate_count:
+            print(f"Skipping unique index {index.name}: {duplicate_count} duplicated value(s) in {table_name}({column_names})")
+            return
+    
+    # Create the index
+    index.create(bind=engine)
+    print(f"Added index {index.name} to {table_name}")
+
 def update_schema():
     """
     Update the database schema with new columns
@@ -75,6 +112,23 @@ def update_schema():
     # Add decision_notes column to LoanApplication if it doesn't exist
     add_column(engine, 'loan_application', LoanApplication.__table__.c.decision_notes)
     
+    # Add worker_id column to BatchJob if it doesn't exist
+    BatchJob.__table__.create(bind=engine, checkfirst=True)
+    add_column(engine, 'batch_job', BatchJob.__table__.c.worker_id)
+    
+    # Add indexes used by dashboard filters, sorts and joins
+    for index in LoanApplication.__table__.indexes:
+        add_index(engine, index)
+    
+    for index in RiskAssessment.__table__.indexes:
+        add_index(engine, index)
+    
+    # Create and backfill the dashboard summary table
+    ApplicationSummary.__table__.create(bind=engine, checkfirst=True)
+    if db.session.query(ApplicationSummary.id).first() is None and db.session.query(LoanApplication.id).first() is not None:
+        count = rebuild_summaries()
+        print(f"Backfilled application summaries from {count} applications")
+    
     print("Schema update complete!")
 
 if __name__ == "__main__":